@@ -144,6 +144,154 @@ async def get_all_quotes(symbols: str = Query(None)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+HISTORY_LIMIT = 100
+
+# Weekly and monthly candles are rolled up from the daily ones
+ROLLUP_UNITS = {Timeframe.oneWeek: "week", Timeframe.oneMonth: "month"}
+
+
+# Archived days read per requested candle
+ARCHIVE_DAYS_PER_CANDLE = {Timeframe.oneDay: 1, Timeframe.oneWeek: 7, Timeframe.oneMonth: 31}
+
+
+def _period_start(timestamp: datetime, unit: str) -> datetime:
+    """Start of the ISO week or month containing `timestamp`, like date_trunc."""
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+async def _query_candles(db: AsyncSession, symbol: str, timeframe: Timeframe) -> List[dict]:
+    """Newest finished candles from the candles table, oldest first."""
+    from sqlalchemy import text
+
+    if timeframe in ROLLUP_UNITS:
+        query = text("""
+            SELECT
+                date_trunc(:unit, timestamp AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS timestamp,
+                (array_agg(open ORDER BY timestamp ASC))[1] AS open,
+                MAX(high) AS high,
+                MIN(low) AS low,
+                (array_agg(close ORDER BY timestamp DESC))[1] AS close,
+                SUM(volume) AS volume
+            FROM candles
+            WHERE symbol = :symbol AND timeframe = '1D'
+            GROUP BY 1
+            ORDER BY 1 DESC
+            LIMIT :limit
+        """)
+        params = {"symbol": symbol, "unit": ROLLUP_UNITS[timeframe], "limit": HISTORY_LIMIT}
+    else:
+        query = text("""
+            SELECT timestamp, open, high, low, close, volume
+            FROM candles
+            WHERE symbol = :symbol AND timeframe = :timeframe
+            ORDER BY timestamp DESC
+            LIMIT :limit
+        """)
+        params = {"symbol": symbol, "timeframe": timeframe.value, "limit": HISTORY_LIMIT}
+
+    result = await db.execute(query, params)
+    return [
+        {
+            "timestamp": row.timestamp,
+            "open": row.open,
+            "high": row.high,
+            "low": row.low,
+            "close": row.close,
+            "volume": row.volume,
+        }
+        for row in reversed(result.fetchall())
+    ]
+
+
+def _rollup(daily: List[dict], unit: str) -> List[dict]:
+    """Combines consecutive daily candles into weekly or monthly ones."""
+    candles = []
+    for day in daily:
+        start = _period_start(day["timestamp"], unit)
+        if candles and candles[-1]["timestamp"] == start:
+            last = candles[-1]
+            last["high"] = max(last["high"], day["high"])
+            last["low"] = min(last["low"], day["low"])
+            last["close"] = day["close"]
+            last["volume"] += day["volume"]
+        else:
+            candles.append(dict(day, timestamp=start))
+    return candles
+
+
+def _archived_candles(symbol: str, timeframe: Timeframe, count: int, before) -> List[dict]:
+    """Up to `count` candles older than `before` from the memory-mapped tick archive."""
+    from db.tick_archive import TickArchive
+
+    daily = TickArchive().daily_candles(symbol, count * ARCHIVE_DAYS_PER_CANDLE[timeframe], before)
+    unit = ROLLUP_UNITS.get(timeframe)
+    candles = _rollup(daily, unit) if unit else daily
+    if before is not None:
+        candles = [candle for candle in candles if candle["timestamp"] < before]
+    return candles[-count:]
+
+
+async def _load_candles(db: AsyncSession, redis_client, symbol: str, timeframe: Timeframe) -> List[dict]:
+    """
+    Finished candles, oldest first, followed by the open one. The last
+    HISTORY_LIMIT closed candles are usually served from Redis alone; daily
+    and longer timeframes reach back into the tick archive.
+    """
+    from simulation.candles import closed_candles_key, open_candles_key
+
+    unit = ROLLUP_UNITS.get(timeframe)
+    source = "1D" if unit else timeframe.value
+
+    candles = []
+    if not unit:
+        raw_closed = await redis_client.lrange(closed_candles_key(symbol, source), 0, HISTORY_LIMIT - 1)
+        candles = [json.loads(raw) for raw in reversed(raw_closed)]
+    if len(candles) < HISTORY_LIMIT:
+        try:
+            stored = await _query_candles(db, symbol, timeframe)
+        except Exception as e:
+            logger.error(f"Error reading candles from database: {e}")
+            stored = []
+        if len(stored) > len(candles):
+            candles = stored
+    for candle in candles:
+        if isinstance(candle["timestamp"], str):
+            candle["timestamp"] = datetime.fromisoformat(candle["timestamp"])
+
+    # Older daily history lives in the tick archive once its partitions are dropped
+    if timeframe in ARCHIVE_DAYS_PER_CANDLE and len(candles) < HISTORY_LIMIT:
+        import asyncio
+        before = candles[0]["timestamp"] if candles else None
+        try:
+            archived = await asyncio.to_thread(
+                _archived_candles, symbol, timeframe, HISTORY_LIMIT - len(candles), before
+            )
+            candles = archived + candles
+        except Exception as e:
+            logger.error(f"Error reading candles from tick archive: {e}")
+
+    raw_open = await redis_client.hget(open_candles_key(source), symbol)
+    if raw_open:
+        current = json.loads(raw_open)
+        current["timestamp"] = datetime.fromisoformat(current["timestamp"])
+        if unit:
+            current["timestamp"] = _period_start(current["timestamp"], unit)
+        last = candles[-1] if candles else None
+        if last and last["timestamp"] == current["timestamp"]:
+            # Today's open daily candle extends the current week or month
+            last["high"] = max(last["high"], current["high"])
+            last["low"] = min(last["low"], current["low"])
+            last["close"] = current["close"]
+            last["volume"] += current["volume"]
+        elif last is None or current["timestamp"] > last["timestamp"]:
+            candles.append(current)
+
+    return candles[-HISTORY_LIMIT:]
+
+
 @router.get("/history/{symbol}", response_model=List[Candle])
 async def get_history(
     symbol: str, 
@@ -151,82 +299,16 @@ async def get_history(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Returns historical candlestick data for charting.
+    Returns historical candlestick data for charting: the finished candles
+    materialized by the simulator plus the currently open one.
     """
-    # In a full Timescale implementation, this would query the continuous aggregate view.
-    # Alternatively, you can just query price_ticks via time_bucket directly if the view isn't there:
-    
-    seconds = 14400
-    if timeframe == Timeframe.oneMinute:
-        seconds = 60
-    elif timeframe == Timeframe.fiveMinute:
-        seconds = 300
-    elif timeframe == Timeframe.fifteenMinute:
-        seconds = 900
-    elif timeframe == Timeframe.oneHour:
-        seconds = 3600
-    elif timeframe == Timeframe.oneDay:
-        seconds = 86400
-    elif timeframe == Timeframe.oneWeek:
-        seconds = 604800
-    
     import random
-    from sqlalchemy import text
     try:
-        query = text(f"""
-            WITH bucketed_ticks AS (
-                SELECT 
-                    to_timestamp(floor(extract(epoch from timestamp) / {seconds}) * {seconds}) AT TIME ZONE 'UTC' AS bucket,
-                    price,
-                    volume,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY floor(extract(epoch from timestamp) / {seconds}) 
-                        ORDER BY timestamp ASC
-                    ) as row_asc,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY floor(extract(epoch from timestamp) / {seconds}) 
-                        ORDER BY timestamp DESC
-                    ) as row_desc
-                FROM price_ticks
-                WHERE symbol = :symbol
-            ),
-            aggregated AS (
-                SELECT 
-                    bucket,
-                    MAX(price) AS high,
-                    MIN(price) AS low,
-                    SUM(volume) AS volume,
-                    MAX(CASE WHEN row_asc = 1 THEN price END) AS open,
-                    MAX(CASE WHEN row_desc = 1 THEN price END) AS close
-                FROM bucketed_ticks
-                GROUP BY bucket
-            )
-            SELECT bucket, open, high, low, close, volume
-            FROM aggregated
-            ORDER BY bucket DESC
-            LIMIT 100
-        """)
-        
-        result = await db.execute(query, {"symbol": symbol})
-        rows = result.fetchall()
-        
-        if len(rows) >= 10:
-            candles = []
-            for row in rows:
-                if row.bucket is None:
-                    continue
-                candles.append({
-                    "timestamp": row.bucket.isoformat(),
-                    "open": row.open,
-                    "high": row.high,
-                    "low": row.low,
-                    "close": row.close,
-                    "volume": row.volume
-                })
-            return list(reversed(candles)) # Return chronological
+        candles = await _load_candles(db, get_redis_client(), symbol, timeframe)
+        if len(candles) >= 10:
+            return candles
     except Exception as e:
         logger.error(f"Error reading history from database: {e}")
-        pass
 
     # Quick mock instrument fetching to get the base price
     base_price = 100.0
@@ -0,0 +1,497 @@
+"""
+In-process fan-out of the market feed to WebSocket clients.
+
+Each API process runs a single Redis subscriber. Every upstream tick is
+decoded once and encoded at most once per wire format, then handed to the
+local connections, each of which conflates it into its latest tick per
+symbol and is flushed by its own sender task at the rate the client
+negotiated. Redis load therefore stays constant however many clients are
+connected, and a slow client only ever holds up itself; clients that keep
+falling behind are downgraded to a lower rate and finally disconnected.
+
+Clients either take the whole feed (the default, for older app builds) or
+subscribe to symbols. The process also keeps the latest tick of every symbol,
+so clients get the current quotes of what they watch as soon as they connect
+or subscribe, without a Redis call. For that it listens to
+`market:ticks:global` from startup and routes symbol subscribers from it.
+With STREAM_QUOTE_CACHE=false it instead only subscribes to
+`market:ticks:global` while some client takes the whole feed and to
+`market:ticks:{symbol}` while some client watches that symbol, and clients
+wait for the next tick.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+
+from simulation import wire_format
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_TICKS_CHANNEL = "market:ticks:global"
+SYMBOL_TICKS_PREFIX = "market:ticks:"
+# Flushes per second a client may negotiate with `maxRate`; the default is the maximum
+STREAM_MAX_RATE = float(os.getenv("STREAM_MAX_RATE", "10"))
+STREAM_MIN_RATE = float(os.getenv("STREAM_MIN_RATE", "0.2"))
+# Consecutive flushes slower than the client's interval before its rate is halved
+STREAM_SLOW_FLUSHES = int(os.getenv("STREAM_SLOW_FLUSHES", "3"))
+# A flush still not written after this long disconnects the client
+STREAM_SEND_TIMEOUT_SECONDS = float(os.getenv("STREAM_SEND_TIMEOUT_SECONDS", "10"))
+# Distinct batch frames kept for reuse across clients
+BATCH_FRAME_CACHE_SIZE = 64
+# Most symbols one client may subscribe to
+STREAM_MAX_SUBSCRIPTIONS = int(os.getenv("STREAM_MAX_SUBSCRIPTIONS", "500"))
+# Keep the latest tick per symbol to send on connect and subscribe
+STREAM_QUOTE_CACHE = os.getenv("STREAM_QUOTE_CACHE", "true").lower() == "true"
+# Pause before resubscribing after the Redis connection failed
+STREAM_RECONNECT_SECONDS = float(os.getenv("STREAM_RECONNECT_SECONDS", "1"))
+
+# Close code for slow consumers: "Try Again Later"
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class SubscriptionError(ValueError):
+    """A client subscription request that cannot be honoured."""
+
+
+def clamp_rate(rate) -> float:
+    """A requested `maxRate` within the server limits."""
+    try:
+        rate = float(rate)
+    except (TypeError, ValueError):
+        raise SubscriptionError("maxRate must be a number")
+    if rate != rate:  # NaN
+        raise SubscriptionError("maxRate must be a number")
+    return min(max(rate, STREAM_MIN_RATE), STREAM_MAX_RATE)
+
+
+class TickUpdate:
+    """One upstream tick, decoded once and encoded lazily once per wire format."""
+
+    __slots__ = ("symbol", "tick", "_json_frame", "_records")
+
+    def __init__(self, tick: dict, json_frame: str = None, record: bytes = None, table_id: int = None):
+        self.symbol = tick["symbol"]
+        self.tick = tick
+        self._json_frame = json_frame
+        self._records = {} if record is None else {table_id: record}
+
+    def json_frame(self) -> str:
+        if self._json_frame is None:
+            self._json_frame = json.dumps(self.tick)
+        return self._json_frame
+
+    def record(self, table: wire_format.SymbolTable) -> bytes:
+        """The packed binary record of the tick against `table`, empty for unknown symbols."""
+        record = self._records.get(table.table_id)
+        if record is None:
+            record = wire_format.encode_tick_dicts(table, [self.tick])[wire_format.HEADER_DTYPE.itemsize:]
+            self._records[table.table_id] = record
+        return record
+
+
+def encode_batch(updates: List[TickUpdate]) -> str:
+    """All updates of a flush as one compact, columnar JSON frame."""
+    ticks = [update.tick for update in updates]
+    return json.dumps(
+        {
+            "type": "batch",
+            "timestamp": max(tick["timestamp"] for tick in ticks),
+            "symbols": [tick["symbol"] for tick in ticks],
+            "prices": [tick["price"] for tick in ticks],
+            "bids": [tick["bid"] for tick in ticks],
+            "asks": [tick["ask"] for tick in ticks],
+            "changePercents": [tick.get("changePercent") for tick in ticks],
+        },
+        separators=(",", ":"),
+    )
+
+
+class ClientConnection:
+    """
+    A connected WebSocket and its sender task. Updates are conflated to the
+    latest tick per symbol and flushed at most `max_rate` times per second, so
+    a client's backlog never exceeds one tick per symbol. `symbols` is None
+    while the client takes the whole feed.
+    """
+
+    def __init__(self, websocket: WebSocket, wire: str, table: wire_format.SymbolTable = None,
+                 max_rate: float = STREAM_MAX_RATE):
+        self.websocket = websocket
+        self.wire = wire
+        self.table = table
+        self.max_rate = clamp_rate(max_rate)
+        self.symbols: Optional[Set[str]] = None
+        self.pending: Dict[str, TickUpdate] = {}
+        self.conflated = 0
+        self.downgrades = 0
+        self._wake = asyncio.Event()
+        self._slow_flushes = 0
+        self.sender: Optional[asyncio.Task] = None
+        # Replies to client requests go out between tick frames, never inside one
+        self.send_lock = asyncio.Lock()
+
+    def offer(self, updates: Iterable[TickUpdate]) -> None:
+        """Keeps the latest update per symbol until the next flush; never blocks."""
+        pending = self.pending
+        for update in updates:
+            if update.symbol in pending:
+                self.conflated += 1
+                del pending[update.symbol]  # Re-inserted last, in arrival order
+            pending[update.symbol] = update
+        self._wake.set()
+
+    async def send_json(self, payload: dict) -> None:
+        async with self.send_lock:
+            await self.websocket.send_text(json.dumps(payload))
+
+    async def send(self, updates: List[TickUpdate], manager: "ConnectionManager") -> None:
+        async with self.send_lock:
+            await self._send(updates, manager)
+
+    async def _send(self, updates: List[TickUpdate], manager: "ConnectionManager") -> None:
+        if self.wire == "binary":
+            current = await manager.symbol_table()
+            if current is not None and (self.table is None or current.table_id != self.table.table_id):
+                self.table = current
+                await self.websocket.send_text(current.to_json())
+            records = [record for record in (update.record(self.table) for update in updates) if record]
+            if records:
+                await self.websocket.send_bytes(wire_format.encode_record_blobs(self.table, records))
+        elif self.wire == "batch":
+            if updates:
+                await self.websocket.send_text(manager.batch_frame(updates))
+        else:
+            for update in updates:
+                await self.websocket.send_text(update.json_frame())
+
+    async def run(self, manager: "ConnectionManager") -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await self._wake.wait()
+                self._wake.clear()
+                updates = list(self.pending.values())
+                self.pending.clear()
+
+                started = loop.time()
+                try:
+                    await asyncio.wait_for(self.send(updates, manager), STREAM_SEND_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
+                    await manager.drop_slow_consumer(self)
+                    return
+                elapsed = loop.time() - started
+
+                interval = 1 / self.max_rate
+                if elapsed > interval:
+                    self._slow_flushes += 1
+                    if self._slow_flushes >= STREAM_SLOW_FLUSHES:
+                        self._slow_flushes = 0
+                        if self.max_rate <= STREAM_MIN_RATE:
+                            await manager.drop_slow_consumer(self)
+                            return
+                        await self.downgrade()
+                else:
+                    self._slow_flushes = 0
+                await asyncio.sleep(max(0.0, 1 / self.max_rate - elapsed))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await manager.disconnect(self)  # Client went away mid-send
+
+    async def downgrade(self) -> None:
+        """Halves the flush rate of a client that cannot keep up and tells it so."""
+        self.max_rate = max(STREAM_MIN_RATE, self.max_rate / 2)
+        self.downgrades += 1
+        await self.send_json({"type": "system", "action": "downgraded", "maxRate": self.max_rate})
+
+
+class ConnectionManager:
+    """
+    The WebSocket clients of this process, indexed by the symbols they watch,
+    and the one Redis subscriber that feeds them.
+    """
+
+    def __init__(self, redis_client=None, max_subscriptions: int = STREAM_MAX_SUBSCRIPTIONS,
+                 quote_cache: bool = STREAM_QUOTE_CACHE):
+        self._redis = redis_client
+        self.max_subscriptions = max_subscriptions
+        self.quote_cache = quote_cache
+        # Latest update per symbol, current as long as the subscriber runs
+        self.quotes: Dict[str, TickUpdate] = {}
+        self.active_connections: Set[ClientConnection] = set()
+        # Clients taking the whole feed, and the watchers of each symbol
+        self.firehose: Set[ClientConnection] = set()
+        self.subscribers: Dict[str, Set[ClientConnection]] = {}
+        self.messages = 0
+        self.slow_consumers = 0
+        self._table: Optional[wire_format.SymbolTable] = None
+        # Batch frames by the updates they hold; clients flushing the same tick share one
+        self._batch_frames: Dict[tuple, str] = {}
+        self._subscriber: Optional[asyncio.Task] = None
+        self._pubsub = None
+        self._upstream: Set[str] = set()
+        self._upstream_lock = asyncio.Lock()
+        self._wanted = asyncio.Event()
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from db.redis_client import get_redis_client
+
+            self._redis = get_redis_client()
+        return self._redis
+
+    async def symbol_table(self, table_id: int = None) -> Optional[wire_format.SymbolTable]:
+        """
+        Cached symbol table for binary ticks, reloaded from Redis when a message
+        references a table this process has not seen yet.
+        """
+        if self._table is None or (table_id is not None and self._table.table_id != table_id):
+            self._table = await wire_format.load_symbol_table(self.redis)
+        return self._table
+
+    def batch_frame(self, updates: List[TickUpdate]) -> str:
+        key = tuple(updates)  # Keeps the updates alive, so identity is a safe key
+        frame = self._batch_frames.get(key)
+        if frame is None:
+            if len(self._batch_frames) >= BATCH_FRAME_CACHE_SIZE:
+                self._batch_frames.clear()
+            frame = self._batch_frames[key] = encode_batch(updates)
+        return frame
+
+    async def decode(self, data: bytes) -> List[TickUpdate]:
+        """
+        Decodes an upstream message (JSON or binary, single tick or batched)
+        into tick updates, keeping the upstream encoding where it can be reused.
+        """
+        if wire_format.is_binary(data):
+            table = await self.symbol_table(wire_format.read_table_id(data))
+            records = wire_format.decode_records(data, table)
+            blob, size = records.tobytes(), wire_format.TICK_DTYPE.itemsize
+            return [
+                TickUpdate(tick, record=blob[i * size:(i + 1) * size], table_id=table.table_id)
+                for i, tick in enumerate(wire_format.records_to_dicts(records, table))
+            ]
+        payload = json.loads(data)
+        if payload.get("type") == "ticks":
+            return [TickUpdate(tick) for tick in payload["ticks"]]
+        return [TickUpdate(payload, json_frame=data.decode("utf-8"))]
+
+    def start(self) -> None:
+        if self._subscriber is None or self._subscriber.done():
+            self._subscriber = asyncio.create_task(self._subscribe())
+
+    async def stop(self) -> None:
+        for client in list(self.active_connections):
+            await self.disconnect(client)
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            await asyncio.gather(self._subscriber, return_exceptions=True)
+            self._subscriber = None
+
+    async def connect(self, websocket: WebSocket, wire: str = "json", table=None,
+                      max_rate: float = STREAM_MAX_RATE) -> ClientConnection:
+        """
+        Registers an accepted websocket on the whole feed; its sender starts at
+        once with the cached quotes.
+        """
+        client = ClientConnection(websocket, wire, table, max_rate)
+        client.sender = asyncio.create_task(client.run(self))
+        self.active_connections.add(client)
+        self.firehose.add(client)
+        self.send_snapshot(client)
+        self.start()
+        await self._sync_upstream()
+        return client
+
+    async def disconnect(self, client: ClientConnection) -> None:
+        if client not in self.active_connections:
+            return
+        self.active_connections.discard(client)
+        self.firehose.discard(client)
+        self._unindex(client, client.symbols or ())
+        if client.sender is not None and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        await self._sync_upstream()
+
+    async def drop_slow_consumer(self, client: ClientConnection) -> None:
+        """Disconnects a client that stays too far behind even at the lowest rate."""
+        self.slow_consumers += 1
+        logger.warning(f"Disconnecting slow market stream consumer at {client.max_rate}/s")
+        await self.disconnect(client)
+        try:
+            await client.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    async def subscribe(self, client: ClientConnection, symbols: Iterable[str]) -> Set[str]:
+        """
+        Adds `symbols` to what `client` watches; "*" switches it back to the
+        whole feed. The first subscription takes a client off the whole feed.
+        The cached quotes of the symbols are sent right away. Returns the
+        symbols now watched (None for the whole feed).
+        """
+        symbols = set(symbols)
+        if "*" in symbols:
+            self._unindex(client, client.symbols or ())
+            client.symbols = None
+            self.firehose.add(client)
+            self.send_snapshot(client)
+        else:
+            await self._validate(symbols)
+            current = client.symbols or set()
+            if len(current | symbols) > self.max_subscriptions:
+                raise SubscriptionError(f"At most {self.max_subscriptions} symbols per connection")
+            client.symbols = current | symbols
+            self.firehose.discard(client)
+            for symbol in symbols:
+                self.subscribers.setdefault(symbol, set()).add(client)
+            self.send_snapshot(client, symbols)
+        await self._sync_upstream()
+        return client.symbols
+
+    def send_snapshot(self, client: ClientConnection, symbols: Iterable[str] = None) -> None:
+        """Queues the cached quotes of `symbols` (all if None) ahead of the client's next ticks."""
+        if symbols is None:
+            client.offer(self.quotes.values())
+        else:
+            client.offer(self.quotes[symbol] for symbol in symbols if symbol in self.quotes)
+
+    async def unsubscribe(self, client: ClientConnection, symbols: Iterable[str]) -> Set[str]:
+        """
+        Removes `symbols` from what `client` watches ("*" for all). A client on
+        the whole feed can only leave it with "*"; single symbols cannot be
+        taken out of it. Returns the symbols left.
+        """
+        symbols = set(symbols)
+        if "*" in symbols:
+            symbols = set(client.symbols or ())
+        elif client.symbols is None:
+            raise SubscriptionError("Subscribed to the whole feed; unsubscribe from '*' or subscribe to symbols first")
+        self._unindex(client, symbols)
+        client.symbols = (client.symbols or set()) - symbols
+        self.firehose.discard(client)
+        await self._sync_upstream()
+        return client.symbols
+
+    async def _validate(self, symbols: Set[str]) -> None:
+        if not all(isinstance(symbol, str) and symbol for symbol in symbols):
+            raise SubscriptionError("Symbols must be non-empty strings")
+        table = await self.symbol_table()
+        if table is not None:
+            unknown = sorted(symbol for symbol in symbols if symbol not in table.ids)
+            if unknown:
+                raise SubscriptionError(f"Unknown symbols: {', '.join(unknown)}")
+
+    def _unindex(self, client: ClientConnection, symbols: Iterable[str]) -> None:
+        for symbol in symbols:
+            watchers = self.subscribers.get(symbol)
+            if watchers is not None:
+                watchers.discard(client)
+                if not watchers:
+                    del self.subscribers[symbol]
+
+    def wanted_channels(self) -> Set[str]:
+        if self.quote_cache:
+            return {GLOBAL_TICKS_CHANNEL}  # Every symbol, watched or not, keeps the cache current
+        channels = {SYMBOL_TICKS_PREFIX + symbol for symbol in self.subscribers}
+        if self.firehose:
+            channels.add(GLOBAL_TICKS_CHANNEL)
+        return channels
+
+    async def _sync_upstream(self) -> None:
+        """Brings the upstream subscriptions in line with what local clients want."""
+        async with self._upstream_lock:
+            wanted = self.wanted_channels()
+            if wanted:
+                self._wanted.set()
+            if self._pubsub is None:
+                return  # Subscribed in full once the subscriber (re)connects
+            added, removed = wanted - self._upstream, self._upstream - wanted
+            if added:
+                await self._pubsub.subscribe(*added)
+            if removed:
+                await self._pubsub.unsubscribe(*removed)
+            self._upstream = wanted
+
+    async def broadcast(self, data: bytes, channel: str = GLOBAL_TICKS_CHANNEL) -> None:
+        """Decodes an upstream message once and hands it to every client that wants it."""
+        # With the quote cache the global channel also feeds the symbol subscribers
+        routed = self.quote_cache and channel == GLOBAL_TICKS_CHANNEL
+        if channel == GLOBAL_TICKS_CHANNEL:
+            clients = self.firehose
+        else:
+            clients = self.subscribers.get(channel[len(SYMBOL_TICKS_PREFIX):])
+        if not clients and not routed:
+            return
+        updates = await self.decode(data)
+        self.messages += 1
+        for client in list(clients or ()):
+            client.offer(updates)
+        if not routed:
+            return
+
+        watched: Dict[ClientConnection, List[TickUpdate]] = {}
+        for update in updates:
+            self.quotes[update.symbol] = update
+            for client in self.subscribers.get(update.symbol, ()):
+                watched.setdefault(client, []).append(update)
+        for client, client_updates in watched.items():
+            client.offer(client_updates)
+
+    async def _subscribe(self) -> None:
+        while True:
+            # Idle without a Redis connection while no client wants anything
+            self._wanted.clear()
+            if not self.wanted_channels():
+                await self._wanted.wait()
+
+            pubsub = self.redis.pubsub()
+            try:
+                async with self._upstream_lock:
+                    self._pubsub, self._upstream = pubsub, set()
+                await self._sync_upstream()
+                while self._upstream:
+                    # Blocking read: a read timeout would swallow cancellation.
+                    # Unsubscribe confirmations wake it up once nothing is wanted.
+                    message = await pubsub.get_message(timeout=None)
+                    if message is None or message["type"] != "message":
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode("utf-8")
+                    try:
+                        await self.broadcast(message["data"], channel)
+                    except Exception as e:
+                        logger.error(f"Error fanning out market message: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Market stream subscriber failed, resubscribing: {e}")
+                await asyncio.sleep(STREAM_RECONNECT_SECONDS)
+            finally:
+                async with self._upstream_lock:
+                    self._pubsub, self._upstream = None, set()
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.active_connections),
+            "firehose": len(self.firehose),
+            "symbols": len(self.subscribers),
+            "messages": self.messages,
+            "conflated": sum(client.conflated for client in self.active_connections),
+            "downgrades": sum(client.downgrades for client in self.active_connections),
+            "slow_consumers": self.slow_consumers,
+            "quotes": len(self.quotes),
+        }
+
+
+manager = ConnectionManager()
@@ -1,76 +1,117 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import json
-import asyncio
-from typing import Set
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+
+from api.websockets.hub import STREAM_MAX_RATE, SubscriptionError, clamp_rate, manager
 
 router = APIRouter()
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+# Close code for a connection request that cannot be honoured
+POLICY_VIOLATION_CLOSE_CODE = 1008
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.add(websocket)
+def requested_symbols(request: dict) -> list:
+    """Symbols of a subscription request: `symbols` (a list) or a single `symbol`."""
+    symbols = request.get("symbols")
+    if symbols is None:
+        symbols = [request["symbol"]] if "symbol" in request else []
+    if not isinstance(symbols, list) or not symbols:
+        raise SubscriptionError("Expected 'symbol' or a non-empty 'symbols' list")
+    if not all(isinstance(symbol, str) and symbol for symbol in symbols):
+        raise SubscriptionError("Symbols must be non-empty strings")
+    return symbols
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
+async def handle_request(client, request: dict) -> dict:
+    """Applies one client request and returns the reply to send."""
+    action = request.get("action")
+    if action in ("subscribe", "subscribe_many"):
+        symbols = await manager.subscribe(client, requested_symbols(request))
+    elif action == "unsubscribe":
+        symbols = await manager.unsubscribe(client, requested_symbols(request))
+    elif action == "set_rate":
+        client.max_rate = clamp_rate(request.get("maxRate"))
+        return {"type": "system", "action": action, "maxRate": client.max_rate}
+    elif action == "ping":
+        return {"type": "system", "action": "pong"}
+    else:
+        raise SubscriptionError(f"Unknown action '{action}'")
+    return {"type": "system", "action": action, "symbols": "*" if symbols is None else sorted(symbols)}
 
-    async def broadcast(self, message: str):
-        for connection in list(self.active_connections):
-            try:
-                await connection.send_text(message)
-            except Exception:
-                self.disconnect(connection)
+@router.websocket("/stream")
+async def websocket_endpoint(
+    websocket: WebSocket,
+    wire: str = Query("json", alias="format"),
+    max_rate: float = Query(STREAM_MAX_RATE, alias="maxRate"),
+):
+    """
+    WebSocket endpoint for real-time market data streaming.
+    Clients are fed from this process's single Redis subscriber
+    (see api/websockets/hub.py). They receive every tick until they send
 
-manager = ConnectionManager()
+        {"action": "subscribe", "symbol": "AAPL"}
+        {"action": "subscribe_many", "symbols": ["AAPL", "MSFT"]}
+        {"action": "unsubscribe", "symbols": ["AAPL"]}
 
-import os
-import redis.asyncio as redis
+    after which they only receive ticks of the symbols they subscribed to
+    ("*" restores the whole feed; single symbols cannot be unsubscribed
+    while on it). Each request is answered with a system
+    message listing the current subscriptions. On connect and on every
+    subscription the current quotes of the watched symbols are sent at once,
+    as ticks in the negotiated format, so clients need not fetch
+    `/market/quotes` first.
 
-# Using the redis interface
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    Updates are conflated to the latest tick per symbol and flushed at most
+    `maxRate` times per second, negotiated with `?maxRate=` or
+    {"action": "set_rate", "maxRate": 2} within the server limits. Clients
+    that cannot keep up get a "downgraded" system message with a lower rate
+    and are disconnected (code 1013) if they still fall behind.
 
-from db.redis_client import get_redis_client
+    JSON text frames, one per tick, are the default. With `?format=batch`
+    every flush is a single columnar frame:
 
-@router.websocket("/stream")
-async def websocket_endpoint(websocket: WebSocket):
-    """
-    WebSocket endpoint for real-time market data streaming.
-    Clients connect and receive the global feed from Redis.
+        {"type": "batch", "timestamp": ..., "symbols": [...], "prices": [...],
+         "bids": [...], "asks": [...], "changePercents": [...]}
+
+    Clients connecting with `?format=binary` get the symbol table as JSON
+    first, then one binary frame per flush (see simulation/wire_format.py).
     """
-    await manager.connect(websocket)
-    redis_client = get_redis_client()
-    pubsub = redis_client.pubsub()
-    
-    # Subscribe to the global market ticks channel
-    await pubsub.subscribe("market:ticks:global")
-    
+    await websocket.accept()
+    try:
+        max_rate = clamp_rate(max_rate)
+    except SubscriptionError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=POLICY_VIOLATION_CLOSE_CODE)
+        return
+
+    table = None
+    if wire == "binary":
+        table = await manager.symbol_table()
+        if table is None:
+            wire = "json"  # Simulator has not published its symbol table yet
+
+    client = None
     try:
-        # Acknowledge connection
-        await websocket.send_json({"type": "system", "message": "Connected to Market Stream"})
-        
-        # Async generator to read messages from redis pubsub and forward them
-        async def redis_listener():
-            async for message in pubsub.listen():
-                if message['type'] == 'message':
-                    data = message['data'].decode('utf-8')
-                    try:
-                        await websocket.send_text(data)
-                    except Exception:
-                        break
-
-        # Start the listener task
-        listener_task = asyncio.create_task(redis_listener())
-        
+        # Acknowledge connection with the negotiated format and rate
+        await websocket.send_json(
+            {"type": "system", "message": "Connected to Market Stream", "format": wire, "maxRate": max_rate}
+        )
+        if table is not None:
+            await websocket.send_text(table.to_json())
+
+        client = await manager.connect(websocket, wire, table, max_rate)
+
         while True:
-            # Wait for client messages (e.g., {"action": "subscribe", "symbol": "AAPL"})
-            # To handle unsubs or heartbeat
             data = await websocket.receive_text()
-            pass
-                
+            try:
+                request = json.loads(data)
+                if not isinstance(request, dict):
+                    raise SubscriptionError("Expected a JSON object")
+                reply = await handle_request(client, request)
+            except (ValueError, KeyError) as e:
+                reply = {"type": "error", "message": str(e)}
+            await client.send_json(reply)
+
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        listener_task.cancel()
-        await pubsub.unsubscribe("market:ticks:global")
-        await pubsub.close()
+        pass
+    finally:
+        if client is not None:
+            await manager.disconnect(client)
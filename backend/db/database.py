@@ -136,9 +136,21 @@ DEFAULT_INSTRUCTORS = [
 
 
 async def init_db():
+    from db import models  # noqa: F401 - registers every table on Base.metadata
+    from db.partitions import (
+        convert_legacy_price_ticks,
+        maintain_tick_partitions,
+        migrate_legacy_price_ticks,
+    )
+
     # Recreate all database tables cleanly in a fresh transaction block
     async with engine.begin() as conn:
+        has_legacy_ticks = await convert_legacy_price_ticks(conn)
         await conn.run_sync(Base.metadata.create_all)
+        # price_ticks is partitioned by time; a tick needs a partition to land in
+        await maintain_tick_partitions(conn)
+        if has_legacy_ticks:
+            await migrate_legacy_price_ticks(conn)
 
     # Seed default instruments if empty
     from db.models import DbInstrument
@@ -22,10 +22,11 @@ class DbInstrument(Base):
 
 class DbPriceTick(Base):
     """
-    To be converted to a TimescaleDB Hypertable.
+    Range-partitioned by timestamp; partitions are managed by db.partitions.
     Uses a composite primary key (symbol, timestamp) to avoid auto-incrementing ID overhead.
     """
     __tablename__ = "price_ticks"
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
     
     symbol = Column(String(50), ForeignKey("instruments.symbol", ondelete="RESTRICT"), primary_key=True)
     timestamp = Column(DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc))
@@ -34,6 +35,22 @@ class DbPriceTick(Base):
     ask = Column(Float, nullable=False)
     volume = Column(Float, nullable=False)
 
+class DbCandle(Base):
+    """
+    Finished candles materialized by the simulator for every chart timeframe.
+    The composite primary key doubles as the index for the newest-first history read.
+    """
+    __tablename__ = "candles"
+
+    symbol = Column(String(50), ForeignKey("instruments.symbol", ondelete="RESTRICT"), primary_key=True)
+    timeframe = Column(String(8), primary_key=True)  # e.g., '1m', '4h', '1D'
+    timestamp = Column(DateTime(timezone=True), primary_key=True)  # Bucket start
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Float, nullable=False)
+
 class DbNewsEvent(Base):
     """
     Uses PostgreSQL native ARRAY to handle multiple affected instruments in 1st Normal Form.
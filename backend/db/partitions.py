@@ -0,0 +1,175 @@
+"""
+Range partitioning of `price_ticks` by time.
+
+The table is declared `PARTITION BY RANGE (timestamp)` with one partition per
+hour (or per day). Retention drops whole partitions, which takes constant
+time and leaves nothing for vacuum, instead of deleting rows; their ticks are
+rolled into the columnar archive first (see db.tick_archive). Partitions are
+created ahead of time because a tick without a matching partition is
+rejected.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+PARENT_TABLE = "price_ticks"
+
+# Partition width: "hour" or "day"
+PRICE_TICK_PARTITION = os.getenv("PRICE_TICK_PARTITION", "hour")
+PRICE_TICK_RETENTION_HOURS = int(os.getenv("PRICE_TICK_RETENTION_HOURS", "24"))
+# Future partitions kept ready so the tick writer never hits a missing range
+PRICE_TICK_PARTITIONS_AHEAD = int(os.getenv("PRICE_TICK_PARTITIONS_AHEAD", "6"))
+
+_NAME_FORMATS = {"hour": "%Y%m%d%H", "day": "%Y%m%d"}
+_WIDTHS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+
+def partition_start(timestamp: datetime, unit: str = PRICE_TICK_PARTITION) -> datetime:
+    """Start of the partition holding `timestamp`."""
+    timestamp = timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0) if unit == "day" else timestamp
+
+
+def partition_name(start: datetime, unit: str = PRICE_TICK_PARTITION) -> str:
+    return f"{PARENT_TABLE}_p{start.strftime(_NAME_FORMATS[unit])}"
+
+
+def parse_partition_name(name: str) -> Tuple[datetime, str]:
+    """(start, unit) of a partition created by `partition_name`."""
+    suffix = name[len(PARENT_TABLE) + 2:]
+    for unit, fmt in _NAME_FORMATS.items():
+        if len(suffix) == len(datetime(2000, 1, 1).strftime(fmt)):
+            return datetime.strptime(suffix, fmt).replace(tzinfo=timezone.utc), unit
+    raise ValueError(f"Not a {PARENT_TABLE} partition: {name}")
+
+
+def wanted_partitions(now: datetime, unit: str = PRICE_TICK_PARTITION) -> List[datetime]:
+    """Partition starts from the retention horizon up to PRICE_TICK_PARTITIONS_AHEAD ahead."""
+    width = _WIDTHS[unit]
+    start = partition_start(now - timedelta(hours=PRICE_TICK_RETENTION_HOURS), unit)
+    end = partition_start(now, unit) + width * PRICE_TICK_PARTITIONS_AHEAD
+    starts = []
+    while start <= end:
+        starts.append(start)
+        start += width
+    return starts
+
+
+def is_expired(name: str, now: datetime) -> bool:
+    """Whether every row a partition can hold is older than the retention period."""
+    start, unit = parse_partition_name(name)
+    return start + _WIDTHS[unit] <= now - timedelta(hours=PRICE_TICK_RETENTION_HOURS)
+
+
+async def list_partitions(conn) -> List[str]:
+    result = await conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+    """), {"parent": PARENT_TABLE})
+    return [row[0] for row in result.fetchall()]
+
+
+async def _create(conn, starts: List[datetime], unit: str) -> int:
+    existing = set(await list_partitions(conn))
+    created = 0
+    for start in starts:
+        name = partition_name(start, unit)
+        if name in existing:
+            continue
+        end = start + _WIDTHS[unit]
+        await conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        created += 1
+    return created
+
+
+async def create_partitions(conn, now: datetime, unit: str = PRICE_TICK_PARTITION) -> int:
+    """Creates the missing partitions of `wanted_partitions`. Returns how many were created."""
+    return await _create(conn, wanted_partitions(now, unit), unit)
+
+
+async def create_partitions_between(conn, start: datetime, end: datetime, unit: str = PRICE_TICK_PARTITION) -> int:
+    """
+    Creates the partitions covering [start, end), e.g. before backfilling
+    history. Those past retention are archived and dropped by the next
+    maintenance run.
+    """
+    starts = []
+    current = partition_start(start, unit)
+    while current < end:
+        starts.append(current)
+        current += _WIDTHS[unit]
+    return await _create(conn, starts, unit)
+
+
+async def drop_expired_partitions(conn, now: datetime, archive: bool = False) -> int:
+    """
+    Drops partitions past the retention period, after rolling their rows into
+    the tick archive if `archive` is set. A partition whose archiving fails is
+    kept for the next run. Returns how many were dropped.
+    """
+    from db.tick_archive import archive_partition
+
+    dropped = 0
+    for name in sorted(await list_partitions(conn)):
+        try:
+            expired = is_expired(name, now)
+        except ValueError:
+            continue  # Not one of ours
+        if not expired:
+            continue
+        if archive:
+            try:
+                await archive_partition(conn, name)
+            except Exception as e:
+                print(f"Error archiving partition {name}, keeping it: {e}")
+                continue
+        await conn.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+        dropped += 1
+    return dropped
+
+
+async def maintain_tick_partitions(conn, now: datetime = None) -> None:
+    """Pre-creates upcoming partitions and archives and drops expired ones."""
+    from db.tick_archive import TICK_ARCHIVE_ENABLED
+
+    now = now or datetime.now(timezone.utc)
+    created = await create_partitions(conn, now)
+    dropped = await drop_expired_partitions(conn, now, archive=TICK_ARCHIVE_ENABLED)
+    if created or dropped:
+        print(f"price_ticks partitions: {created} created, {dropped} dropped")
+
+
+async def convert_legacy_price_ticks(conn) -> bool:
+    """
+    Renames a pre-existing, unpartitioned price_ticks table out of the way so
+    the partitioned one can be created. Returns True if there was one; its
+    recent rows are moved over by `migrate_legacy_price_ticks`.
+    """
+    result = await conn.execute(text(
+        "SELECT relkind FROM pg_class WHERE relname = :parent AND relkind IN ('r', 'p')"
+    ), {"parent": PARENT_TABLE})
+    if result.scalar() != "r":
+        return False
+    await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {PARENT_TABLE}_legacy"))
+    await conn.execute(text(f"ALTER INDEX IF EXISTS {PARENT_TABLE}_pkey RENAME TO {PARENT_TABLE}_legacy_pkey"))
+    return True
+
+
+async def migrate_legacy_price_ticks(conn, now: datetime = None) -> None:
+    """Copies the rows still within retention from the legacy table and drops it."""
+    now = now or datetime.now(timezone.utc)
+    horizon = partition_start(now - timedelta(hours=PRICE_TICK_RETENTION_HOURS))
+    await conn.execute(text(
+        f"INSERT INTO {PARENT_TABLE} SELECT symbol, timestamp, price, bid, ask, volume "
+        f"FROM {PARENT_TABLE}_legacy WHERE timestamp >= :horizon AND timestamp <= :now "
+        "ON CONFLICT DO NOTHING"
+    ), {"horizon": horizon, "now": now})
+    await conn.execute(text(f"DROP TABLE {PARENT_TABLE}_legacy"))
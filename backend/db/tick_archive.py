@@ -0,0 +1,187 @@
+"""
+Columnar on-disk archive of price ticks.
+
+Before an expired `price_ticks` partition is dropped its rows are rolled into
+one `.npy` file per symbol and UTC day:
+
+    {TICK_ARCHIVE_DIR}/{quoted symbol}/{YYYY-MM-DD}.npy
+
+Each file is a structured array of ARCHIVE_DTYPE sorted by timestamp. Files
+are stored uncompressed so readers can memory-map them and slice time ranges
+without copying; a symbol-day at a 3s tick is about 1 MB.
+"""
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+from sqlalchemy import text
+
+TICK_ARCHIVE_DIR = os.getenv("TICK_ARCHIVE_DIR", "archive/ticks")
+# Archive expired partitions before dropping them
+TICK_ARCHIVE_ENABLED = os.getenv("TICK_ARCHIVE_ENABLED", "true").lower() == "true"
+# Rows fetched per round trip while archiving a partition
+TICK_ARCHIVE_FETCH_ROWS = int(os.getenv("TICK_ARCHIVE_FETCH_ROWS", "10000"))
+
+ARCHIVE_DTYPE = np.dtype(
+    [
+        ("timestamp_ms", "<i8"),
+        ("price", "<f8"),
+        ("bid", "<f8"),
+        ("ask", "<f8"),
+        ("volume", "<f8"),
+    ]
+)
+
+MS_PER_DAY = 86_400_000
+
+
+def _epoch_day(day: date) -> int:
+    return (day - date(1970, 1, 1)).days
+
+
+class TickArchive:
+    """Reads and writes the per symbol-day tick files under `root`."""
+
+    def __init__(self, root: str = TICK_ARCHIVE_DIR):
+        self.root = root
+
+    def symbol_dir(self, symbol: str) -> str:
+        # Symbols contain spaces and '&'
+        return os.path.join(self.root, quote(symbol, safe=""))
+
+    def path(self, symbol: str, day: date) -> str:
+        return os.path.join(self.symbol_dir(symbol), f"{day.isoformat()}.npy")
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(unquote(name) for name in os.listdir(self.root))
+
+    def days(self, symbol: str) -> List[date]:
+        """Archived days of `symbol`, oldest first."""
+        directory = self.symbol_dir(symbol)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            date.fromisoformat(name[:-4]) for name in os.listdir(directory) if name.endswith(".npy")
+        )
+
+    def load_day(self, symbol: str, day: date) -> Optional[np.ndarray]:
+        """Memory-mapped, read-only records of one symbol-day."""
+        try:
+            return np.load(self.path(symbol, day), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+
+    def write_day(self, symbol: str, day: date, records: np.ndarray) -> None:
+        """Merges `records` into the symbol-day file, keeping it sorted and free of duplicates."""
+        existing = self.load_day(symbol, day)
+        if existing is not None and len(existing):
+            records = np.concatenate([np.asarray(existing), records])
+        order = np.argsort(records["timestamp_ms"], kind="stable")
+        records = records[order]
+        keep = np.ones(len(records), dtype=bool)
+        keep[1:] = records["timestamp_ms"][1:] != records["timestamp_ms"][:-1]
+        records = records[keep]
+
+        os.makedirs(self.symbol_dir(symbol), exist_ok=True)
+        target = self.path(symbol, day)
+        tmp = f"{target}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, records)
+        os.replace(tmp, target)  # Readers never see a partial file
+
+    def write(self, symbol: str, records: np.ndarray) -> None:
+        """Writes time-sorted or unsorted records of one symbol, split by UTC day."""
+        if not len(records):
+            return
+        days = records["timestamp_ms"] // MS_PER_DAY
+        for epoch_day in np.unique(days).tolist():
+            day = date(1970, 1, 1) + timedelta(days=epoch_day)
+            self.write_day(symbol, day, records[days == epoch_day])
+
+    def ticks(self, symbol: str, start: datetime, end: datetime) -> Iterator[np.ndarray]:
+        """Zero-copy slices of the records in [start, end), one per archived day."""
+        start_ms = int(start.timestamp() * 1000)
+        end_ms = int(end.timestamp() * 1000)
+        for day in self.days(symbol):
+            day_start = _epoch_day(day) * MS_PER_DAY
+            if day_start + MS_PER_DAY <= start_ms or day_start >= end_ms:
+                continue
+            records = self.load_day(symbol, day)
+            timestamps = records["timestamp_ms"]
+            lo, hi = np.searchsorted(timestamps, [start_ms, end_ms])
+            if hi > lo:
+                yield records[lo:hi]
+
+    def daily_candles(self, symbol: str, limit: int, before: Optional[datetime] = None) -> List[dict]:
+        """OHLCV of the last `limit` archived days before `before`, oldest first."""
+        days = self.days(symbol)
+        if before is not None:
+            days = [day for day in days if day < before.astimezone(timezone.utc).date()]
+        candles = []
+        for day in days[-limit:]:
+            records = self.load_day(symbol, day)
+            if records is None or not len(records):
+                continue
+            prices = records["price"]
+            candles.append(
+                {
+                    "timestamp": datetime(day.year, day.month, day.day, tzinfo=timezone.utc),
+                    "open": float(prices[0]),
+                    "high": float(prices.max()),
+                    "low": float(prices.min()),
+                    "close": float(prices[-1]),
+                    "volume": float(records["volume"].sum()),
+                }
+            )
+        return candles
+
+
+def rows_to_records(rows) -> np.ndarray:
+    """(timestamp, price, bid, ask, volume) rows into archive records."""
+    records = np.empty(len(rows), dtype=ARCHIVE_DTYPE)
+    if len(rows):
+        timestamps, prices, bids, asks, volumes = zip(*rows)
+        records["timestamp_ms"] = [int(ts.timestamp() * 1000) for ts in timestamps]
+        records["price"] = prices
+        records["bid"] = bids
+        records["ask"] = asks
+        records["volume"] = volumes
+    return records
+
+
+def _write_rows(archive: TickArchive, symbol: str, rows) -> None:
+    archive.write(symbol, rows_to_records(rows))
+
+
+async def archive_partition(
+    conn, name: str, archive: TickArchive = None, fetch_rows: int = TICK_ARCHIVE_FETCH_ROWS
+) -> int:
+    """
+    Rolls the rows of one price_ticks partition into the archive. Rows are
+    streamed through a server-side cursor in symbol order and written one
+    symbol at a time, so memory is bounded by a symbol's rows rather than the
+    partition's. Returns the row count.
+    """
+    import asyncio
+
+    archive = archive or TickArchive()
+    result = await conn.stream(text(
+        f'SELECT symbol, timestamp, price, bid, ask, volume FROM "{name}" ORDER BY symbol, timestamp'
+    ))
+    count = 0
+    symbol, symbol_rows = None, []
+    async for rows in result.partitions(fetch_rows):
+        for row_symbol, *values in rows:
+            if row_symbol != symbol:
+                if symbol_rows:
+                    await asyncio.to_thread(_write_rows, archive, symbol, symbol_rows)
+                symbol, symbol_rows = row_symbol, []
+            symbol_rows.append(values)
+        count += len(rows)
+    if symbol_rows:
+        await asyncio.to_thread(_write_rows, archive, symbol, symbol_rows)
+    return count
@@ -1,8 +1,10 @@
 import logging
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import market, portfolio, orders, learning, challenges, social, notifications
 from api.websockets import stream
+from api.websockets import hub as stream_hub
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -32,13 +34,21 @@ app.include_router(social.router, prefix="/api/v1/social", tags=["social"])
 app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["notifications"])
 app.include_router(stream.router, prefix="/ws/market", tags=["stream"])
 
+# Embedded simulator runner, cancelled on shutdown so buffered ticks are flushed
+simulator_task = None
+
 @app.on_event("startup")
 async def startup_event():
+    global simulator_task
     from db.database import init_db
-    from simulation.tasks import simulate_tick_loop
+    from simulation.runner import run_simulator
     # Create all DB tables (including new trading tables) if they don't exist
     await init_db()
     
+    # Warm the market stream's quote cache before the first client connects
+    if stream_hub.manager.quote_cache:
+        stream_hub.manager.start()
+
     # Start Cron for Daily Challenges
     from cron_runner import start_cron
     try:
@@ -46,13 +56,19 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to start challenge cron: {e}")
 
-    # Trigger background simulation loop
+    # Trigger background simulation loop. With several workers every one of them
+    # competes for the simulator lease and only the leader runs the tick loop;
+    # set EMBEDDED_SIMULATOR=false when `python -m simulation.runner` runs separately.
+    if os.getenv("EMBEDDED_SIMULATOR", "true").lower() != "true":
+        logger.info("Market Service Starting Up... Simulation Engine runs externally.")
+        return
+
     logger.info("Market Service Starting Up... Triggering Simulation Engine.")
     try:
         import asyncio
         # Run as a background task in the main thread's asyncio loop to share connection pool safely
-        asyncio.create_task(simulate_tick_loop())
-        logger.info("Started simulate_tick_loop as an asyncio background task!")
+        simulator_task = asyncio.create_task(run_simulator())
+        logger.info("Started simulator runner as an asyncio background task!")
     except Exception as e:
         logger.error(f"Failed to start simulation task: {e}")
 
@@ -60,10 +76,15 @@ async def startup_event():
 async def shutdown_event():
     # Cleanup connections
     logger.info("Market Service Shutting Down...")
+    await stream_hub.manager.stop()
+    if simulator_task is not None:
+        import asyncio
+        simulator_task.cancel()
+        await asyncio.gather(simulator_task, return_exceptions=True)
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "service": "market_service"}
+    return {"status": "ok", "service": "market_service", "stream": stream_hub.manager.stats()}
 
 @app.get("/")
 @app.head("/")
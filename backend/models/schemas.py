@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List
 from enum import Enum
 
@@ -55,6 +55,8 @@ class MarketSnapshot(BaseModel):
     changePercent: float
     volume: float
     timestamp: datetime
+    vwap: Optional[float] = None
+    sessionDate: Optional[date] = None
     fiftyTwoWeekHigh: Optional[float] = None
     fiftyTwoWeekLow: Optional[float] = None
     marketCap: Optional[float] = None
@@ -0,0 +1,307 @@
+"""
+Streaming multi-timeframe candles.
+
+The simulator folds every tick into the open 1m/5m/15m/1h/4h/1D bucket of its
+instrument as it is published. Buckets are aligned to UTC epoch multiples of
+their length. Once a bucket has ended it is pushed onto a capped Redis list
+and handed to a `CandleWriter`, which upserts it into the `candles` table in
+the background, so `/history` reads finished candles plus the single open
+bucket instead of aggregating `price_ticks`.
+
+Redis keys:
+    market:candles:open:{timeframe}       hash of symbol -> open candle JSON
+    market:candles:{symbol}:{timeframe}   list of closed candle JSON, newest first
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+CANDLE_TIMEFRAMES = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "4h": 14400,
+    "1D": 86400,
+}
+
+# Closed candles kept per symbol and timeframe in Redis
+CANDLE_CACHE_SIZE = 100
+# Seconds between background upserts of closed candles
+CANDLE_WRITE_INTERVAL_SECONDS = float(os.getenv("CANDLE_WRITE_INTERVAL_SECONDS", "5"))
+# Closed candles held in memory at most; candles beyond it are dropped
+CANDLE_WRITE_MAX_CANDLES = int(os.getenv("CANDLE_WRITE_MAX_CANDLES", "100000"))
+# Consecutive failed upserts after which the buffered candles are given up
+CANDLE_WRITE_MAX_ATTEMPTS = int(os.getenv("CANDLE_WRITE_MAX_ATTEMPTS", "5"))
+
+
+def open_candles_key(timeframe: str) -> str:
+    return f"market:candles:open:{timeframe}"
+
+
+def closed_candles_key(symbol: str, timeframe: str) -> str:
+    return f"market:candles:{symbol}:{timeframe}"
+
+
+class CandleAggregator:
+    """
+    Open candle of every instrument for every timeframe, as
+    (timeframe, instrument) arrays updated with vectorized operations per tick.
+    """
+
+    def __init__(self, symbols: List[str], timeframes: Dict[str, int] = CANDLE_TIMEFRAMES):
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.seconds = np.array(list(timeframes.values()), dtype=np.int64)
+
+        shape = (len(self.timeframes), len(self.symbols))
+        self.start = np.full(shape, -1, dtype=np.int64)  # Bucket start in epoch seconds, -1 if none
+        self.open = np.zeros(shape)
+        self.high = np.zeros(shape)
+        self.low = np.zeros(shape)
+        self.close = np.zeros(shape)
+        self.volume = np.zeros(shape)
+
+    def update(self, indices: np.ndarray, prices: np.ndarray, volumes: np.ndarray, now: datetime) -> List[dict]:
+        """
+        Folds one tick for the instruments at `indices` into their open
+        candles. Returns the candles of every instrument whose bucket ended
+        before `now`, including instruments that did not tick.
+        """
+        buckets = self.buckets(now)
+        closed = self.expire(buckets)
+
+        for k, bucket in enumerate(buckets.tolist()):
+            new = self.start[k, indices] < 0
+            if new.any():
+                fresh, first = indices[new], prices[new]
+                self.start[k, fresh] = bucket
+                self.open[k, fresh] = first
+                self.high[k, fresh] = first
+                self.low[k, fresh] = first
+                self.volume[k, fresh] = 0.0
+
+            self.high[k, indices] = np.maximum(self.high[k, indices], prices)
+            self.low[k, indices] = np.minimum(self.low[k, indices], prices)
+            self.close[k, indices] = prices
+            self.volume[k, indices] += volumes
+        return closed
+
+    def buckets(self, now: datetime) -> np.ndarray:
+        """Start of the current bucket of every timeframe."""
+        return int(now.timestamp()) // self.seconds * self.seconds
+
+    def close_ended(self, now: datetime) -> List[dict]:
+        """Closes the candles whose bucket ended before `now`, whether or not anything ticked since."""
+        return self.expire(self.buckets(now))
+
+    def expire(self, buckets: np.ndarray) -> List[dict]:
+        """Closes every open candle older than the current bucket of its timeframe."""
+        ended = (self.start >= 0) & (self.start < buckets[:, None])
+        closed = [self.candle(k, i) for k, i in zip(*np.nonzero(ended))]
+        self.start[ended] = -1
+        return closed
+
+    def candle(self, k: int, i: int) -> dict:
+        return {
+            "symbol": self.symbols[i],
+            "timeframe": self.timeframes[k],
+            "timestamp": datetime.fromtimestamp(int(self.start[k, i]), tz=timezone.utc).isoformat(),
+            "open": float(self.open[k, i]),
+            "high": float(self.high[k, i]),
+            "low": float(self.low[k, i]),
+            "close": float(self.close[k, i]),
+            "volume": float(self.volume[k, i]),
+        }
+
+    def open_candles(self, indices: np.ndarray) -> Dict[str, Dict[str, str]]:
+        """timeframe -> {symbol: candle JSON} for the open candles of `indices`."""
+        return {
+            timeframe: {
+                self.symbols[i]: json.dumps(self.candle(k, i))
+                for i in indices.tolist()
+                if self.start[k, i] >= 0
+            }
+            for k, timeframe in enumerate(self.timeframes)
+        }
+
+    def restore(self, candles: List[dict]) -> None:
+        """Resume open candles previously published by another simulator."""
+        index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        for candle in candles:
+            try:
+                k = self.timeframes.index(candle["timeframe"])
+                i = index[candle["symbol"]]
+                start = int(datetime.fromisoformat(candle["timestamp"]).timestamp())
+                values = [float(candle[field]) for field in ("open", "high", "low", "close", "volume")]
+            except (KeyError, TypeError, ValueError):
+                continue
+            self.start[k, i] = start
+            self.open[k, i], self.high[k, i], self.low[k, i], self.close[k, i], self.volume[k, i] = values
+
+
+def queue_candle_writes(pipe, aggregator: CandleAggregator, indices: np.ndarray, closed: List[dict]) -> None:
+    """Adds the Redis writes for the open candles of `indices` and for `closed` to `pipe`."""
+    for timeframe, candles in aggregator.open_candles(indices).items():
+        if candles:
+            pipe.hset(open_candles_key(timeframe), mapping=candles)
+    for candle in closed:
+        key = closed_candles_key(candle["symbol"], candle["timeframe"])
+        pipe.lpush(key, json.dumps(candle))
+        pipe.ltrim(key, 0, CANDLE_CACHE_SIZE - 1)
+
+
+async def publish_ended_candles(r, aggregator: CandleAggregator, now: datetime) -> List[dict]:
+    """
+    Closes the buckets that ended by `now` without a tick to close them, such
+    as the last bucket of a session, and moves them from the open hashes to the
+    closed lists. Returns the closed candles.
+    """
+    closed = aggregator.close_ended(now)
+    if not closed:
+        return closed
+    try:
+        pipe = r.pipeline(transaction=False)
+        for candle in closed:
+            pipe.hdel(open_candles_key(candle["timeframe"]), candle["symbol"])
+        queue_candle_writes(pipe, aggregator, np.array([], dtype=np.int64), closed)
+        await pipe.execute()
+    except Exception as e:
+        print(f"Error publishing closed candles: {e}")
+    return closed
+
+
+async def load_open_candles(r, symbols: List[str]) -> List[dict]:
+    """Open candles of `symbols` as last published to Redis."""
+    try:
+        pipe = r.pipeline(transaction=False)
+        for timeframe in CANDLE_TIMEFRAMES:
+            pipe.hmget(open_candles_key(timeframe), symbols)
+        results = await pipe.execute()
+    except Exception as e:
+        print(f"Error loading open candles: {e}")
+        return []
+    return [json.loads(raw) for values in results for raw in values if raw]
+
+
+async def save_candles(candles: List[dict]) -> None:
+    """Upserts closed candles into the candles table."""
+    from db.database import AsyncSessionLocal
+    from db.models import DbCandle
+    from sqlalchemy.dialects.postgresql import insert
+
+    if not candles:
+        return
+    rows = [
+        dict(candle, timestamp=datetime.fromisoformat(candle["timestamp"]))
+        for candle in candles
+    ]
+    stmt = insert(DbCandle).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DbCandle.symbol, DbCandle.timeframe, DbCandle.timestamp],
+        set_={
+            column: stmt.excluded[column]
+            for column in ("open", "high", "low", "close", "volume")
+        },
+    )
+    async with AsyncSessionLocal() as session:
+        await session.execute(stmt)
+        await session.commit()
+
+
+class CandleWriter:
+    """
+    Write-behind buffer for closed candles, upserted by a background task
+    every `interval` seconds. Candles are keyed by symbol, timeframe and
+    start, so a later version of a candle replaces a buffered one. Failed
+    upserts are retried like those of `TickWriter`: only after connection
+    errors and timeouts, and at most `max_attempts` times in a row.
+    """
+
+    def __init__(
+        self,
+        interval: float = CANDLE_WRITE_INTERVAL_SECONDS,
+        max_candles: int = CANDLE_WRITE_MAX_CANDLES,
+        max_attempts: int = CANDLE_WRITE_MAX_ATTEMPTS,
+        save=save_candles,
+    ):
+        self.interval = interval
+        self.max_candles = max_candles
+        self.max_attempts = max_attempts
+        self.save = save
+
+        self.pending: Dict[tuple, dict] = {}
+        self.written = 0
+        self.dropped = 0
+        self.failed_writes = 0
+        self._attempts = 0  # Consecutive failed upserts
+
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, candles: List[dict]) -> None:
+        """Queue closed candles for the next upsert. Never blocks."""
+        for candle in candles:
+            key = (candle["symbol"], candle["timeframe"], candle["timestamp"])
+            if key not in self.pending and len(self.pending) >= self.max_candles:
+                self.dropped += 1
+                continue
+            self.pending[key] = candle
+
+    async def flush(self) -> None:
+        """Upsert everything buffered so far."""
+        from simulation.persistence import is_transient
+
+        async with self._flush_lock:
+            pending, self.pending = self.pending, {}
+            if not pending:
+                return
+            try:
+                await self.save(list(pending.values()))
+            except Exception as e:
+                self.failed_writes += 1
+                self._attempts += 1
+                print(f"Error saving {len(pending)} candles to DB: {e}")
+                if not is_transient(e) or self._attempts >= self.max_attempts:
+                    self._attempts = 0
+                    self.dropped += len(pending)
+                    print(f"Discarded {len(pending)} candles that could not be saved")
+                    return
+                # Candles closed meanwhile are newer than the failed ones
+                for key, candle in pending.items():
+                    if key not in self.pending and len(self.pending) < self.max_candles:
+                        self.pending[key] = candle
+                    elif key not in self.pending:
+                        self.dropped += 1
+                return
+            self._attempts = 0
+            self.written += len(pending)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stops the background task and upserts the remaining candles."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failedWrites": self.failed_writes,
+        }
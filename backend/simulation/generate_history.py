@@ -0,0 +1,258 @@
+"""
+Offline history generator.
+
+    python -m simulation.generate_history --start 2025-01-01 --end 2026-01-01 \\
+        --interval 15 --seed 42 --output archive
+
+Runs the vectorized price engine and the news engine headless, as fast as
+possible, over a simulated date range and writes the ticks either into the
+columnar tick archive (`--output archive`, the default) or into `price_ticks`
+via COPY (`--output postgres`). By default only instruments whose market is in
+session tick, as in the live loop. Each step advances the engine by
+`--interval` seconds of trading time.
+
+The output is deterministic for a given seed: every random draw (shocks,
+jumps, news and volumes) comes from generators seeded from it. Ticks are
+produced one UTC day at a time, so memory stays bounded for any range.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, datetime, timezone
+from typing import Iterator, List, NamedTuple
+
+import numpy as np
+
+from simulation.news_engine import NewsEngine, MarketContext, build_sector_index
+from simulation.news_impact import NewsImpactModel
+
+TRADING_SECONDS_PER_YEAR = 252 * 390 * 60
+
+# Session boundaries of all simulated markets fall on quarter hours
+_SESSION_GRANULARITY_SECONDS = 900
+
+
+class DayBlock(NamedTuple):
+    """Ticks of one UTC day; rows are time steps, columns instruments."""
+
+    timestamps_ms: np.ndarray
+    prices: np.ndarray
+    volumes: np.ndarray
+    active: np.ndarray
+
+
+def build_universe() -> List[dict]:
+    """The simulated instruments with the sector and market of their seeded defaults."""
+    from db.database import DEFAULT_INSTRUMENTS
+    from simulation.tasks import MOCK_INSTRUMENTS
+
+    metadata = {inst["symbol"]: (inst["sector"], inst["market"]) for inst in DEFAULT_INSTRUMENTS}
+    universe = []
+    for inst in MOCK_INSTRUMENTS:
+        sector, market = metadata.get(inst["symbol"], ("unknown", "unknown"))
+        universe.append(dict(inst, sector=sector, market=market))
+    return universe
+
+
+class HistoryGenerator:
+    """Steps the engines over [start, end) and yields one `DayBlock` per UTC day."""
+
+    def __init__(
+        self,
+        instruments: List[dict],
+        start: datetime,
+        end: datetime,
+        interval: float = 15.0,
+        seed: int = 0,
+        model: str = "gbm",
+        market_hours: bool = True,
+    ):
+        from simulation.market_hours import MarketCalendar
+        from simulation.price_engine import CorrelationEngine, ShockBuffer, VectorizedPriceEngine
+
+        self.instruments = instruments
+        self.symbols = [inst["symbol"] for inst in instruments]
+        self.start = start
+        self.end = end
+        self.interval = interval
+        self.market_hours = market_hours
+
+        seeds = np.random.SeedSequence(seed).generate_state(3)
+        correlation = CorrelationEngine()
+        correlation.update(
+            self.symbols,
+            [inst["sector"] for inst in instruments],
+            [inst["market"] for inst in instruments],
+        )
+        self.engine = VectorizedPriceEngine(
+            symbols=self.symbols,
+            initial_prices=[inst["price"] for inst in instruments],
+            drifts=[inst["drift"] for inst in instruments],
+            volatilities=[inst["volatility"] for inst in instruments],
+            model=model,
+            dt=interval / TRADING_SECONDS_PER_YEAR,
+            seed=int(seeds[0]),
+        )
+        self.shocks = ShockBuffer(len(self.engine), correlation=correlation, seed=int(seeds[1]))
+        self.volume_rng = np.random.default_rng(int(seeds[2]))
+        self.calendar = MarketCalendar([inst["market"] for inst in instruments])
+
+        self.news_engine = NewsEngine(
+            sector_index=build_sector_index({inst["symbol"]: (inst["sector"], inst["market"]) for inst in instruments}),
+            rng=random.Random(seed),
+        )
+        self.context = MarketContext(sentiment="neutral")
+        self.news_impact = NewsImpactModel(self.symbols)
+        self.news_events = 0
+
+    def close(self) -> None:
+        self.shocks.close()
+
+    def days(self) -> Iterator[DayBlock]:
+        from simulation.tasks import apply_news_shock
+
+        interval_ms = int(self.interval * 1000)
+        start_ms = int(self.start.timestamp() * 1000)
+        end_ms = int(self.end.timestamp() * 1000)
+        n = len(self.engine)
+        all_open = np.ones(n, dtype=bool)
+
+        day_start_ms = start_ms
+        while day_start_ms < end_ms:
+            day_end_ms = min((day_start_ms // 86_400_000 + 1) * 86_400_000, end_ms)
+            timestamps = np.arange(day_start_ms, day_end_ms, interval_ms, dtype=np.int64)
+            prices = np.zeros((len(timestamps), n))
+            active = np.zeros((len(timestamps), n), dtype=bool)
+
+            session_bucket, open_mask = None, all_open
+            for s, ts in enumerate(timestamps.tolist()):
+                now = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+                if self.market_hours and ts // 1000 // _SESSION_GRANULARITY_SECONDS != session_bucket:
+                    session_bucket = ts // 1000 // _SESSION_GRANULARITY_SECONDS
+                    open_mask = self.calendar.open_mask(now)
+
+                # News keeps arriving while markets are closed, as in the live loop;
+                # skipping it would release a night's backlog at the next open
+                for news_event in self.news_engine.generate_news_events(self.context, now, self.symbols):
+                    apply_news_shock(self.engine, self.news_impact, news_event, now)
+                    self.news_events += 1
+                if not open_mask.any():
+                    continue
+
+                drift_offsets, volatility_scales = self.news_impact.parameters(now)
+                prices[s] = self.engine.step(
+                    self.shocks.next(),
+                    active=open_mask,
+                    drift_offsets=drift_offsets,
+                    volatility_scales=volatility_scales,
+                )
+                active[s] = open_mask
+
+            volumes = self.volume_rng.uniform(10, 1000, prices.shape)
+            yield DayBlock(timestamps, prices, volumes, active)
+            day_start_ms = day_end_ms
+
+
+def block_records(block: DayBlock, i: int) -> np.ndarray:
+    """Archive records of instrument `i` in `block`."""
+    from db.tick_archive import ARCHIVE_DTYPE
+
+    ticked = block.active[:, i]
+    prices = block.prices[ticked, i]
+    records = np.empty(len(prices), dtype=ARCHIVE_DTYPE)
+    records["timestamp_ms"] = block.timestamps_ms[ticked]
+    records["price"] = prices
+    records["bid"] = prices * 0.9995
+    records["ask"] = prices * 1.0005
+    records["volume"] = block.volumes[ticked, i]
+    return records
+
+
+def write_archive(generator: HistoryGenerator, archive) -> int:
+    """Writes every day of `generator` into `archive`. Returns the tick count."""
+    written = 0
+    for block in generator.days():
+        for i, symbol in enumerate(generator.symbols):
+            records = block_records(block, i)
+            archive.write(symbol, records)
+            written += len(records)
+    return written
+
+
+async def write_postgres(generator: HistoryGenerator) -> int:
+    """COPYs every day of `generator` into price_ticks. Returns the tick count."""
+    from db.database import engine
+    from db.partitions import create_partitions_between
+    from simulation.persistence import copy_tick_rows
+
+    async with engine.begin() as conn:
+        await create_partitions_between(conn, generator.start, generator.end)
+
+    written = 0
+    for block in generator.days():
+        rows = []
+        for i, symbol in enumerate(generator.symbols):
+            records = block_records(block, i)
+            rows.extend(
+                (symbol, datetime.fromtimestamp(ts / 1000, tz=timezone.utc), price, bid, ask, volume)
+                for ts, price, bid, ask, volume in records.tolist()
+            )
+        if rows:
+            await copy_tick_rows(rows)
+        written += len(rows)
+    return written
+
+
+def _parse_day(value: str) -> datetime:
+    day = date.fromisoformat(value)
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def main(argv=None) -> None:
+    from simulation.tasks import PRICE_MODEL
+
+    parser = argparse.ArgumentParser(description="Generate deterministic market history offline.")
+    parser.add_argument("--start", type=_parse_day, required=True, help="First UTC day, YYYY-MM-DD")
+    parser.add_argument("--end", type=_parse_day, required=True, help="UTC day after the last one, YYYY-MM-DD")
+    parser.add_argument("--interval", type=float, default=15.0, help="Seconds between ticks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model", default=PRICE_MODEL, help="gbm, jump_diffusion or garch")
+    parser.add_argument("--output", choices=("archive", "postgres"), default="archive")
+    parser.add_argument("--archive-dir", default=None, help="Defaults to TICK_ARCHIVE_DIR")
+    parser.add_argument("--all-hours", action="store_true", help="Tick around the clock, ignoring market sessions")
+    args = parser.parse_args(argv)
+
+    if args.end <= args.start:
+        parser.error("--end must be after --start")
+
+    generator = HistoryGenerator(
+        build_universe(),
+        args.start,
+        args.end,
+        interval=args.interval,
+        seed=args.seed,
+        model=args.model,
+        market_hours=not args.all_hours,
+    )
+    started = time.monotonic()
+    try:
+        if args.output == "archive":
+            from db.tick_archive import TickArchive, TICK_ARCHIVE_DIR
+
+            written = write_archive(generator, TickArchive(args.archive_dir or TICK_ARCHIVE_DIR))
+        else:
+            written = asyncio.run(write_postgres(generator))
+    finally:
+        generator.close()
+
+    elapsed = time.monotonic() - started
+    print(
+        f"Generated {written} ticks for {len(generator.symbols)} instruments "
+        f"({generator.news_events} news events) in {elapsed:.1f}s "
+        f"({written / max(elapsed, 1e-9):,.0f} ticks/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
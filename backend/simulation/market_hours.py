@@ -0,0 +1,66 @@
+"""
+Trading sessions of the simulated markets.
+
+Sessions are regular weekday hours in each exchange's local time zone; public
+holidays are not modelled. Instruments of markets without a session (e.g.
+"unknown") are treated as always open.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+# market -> (time zone, session open, session close)
+MARKET_SESSIONS = {
+    "india": (ZoneInfo("Asia/Kolkata"), time(9, 15), time(15, 30)),
+    "usa": (ZoneInfo("America/New_York"), time(9, 30), time(16, 0)),
+    "uk": (ZoneInfo("Europe/London"), time(8, 0), time(16, 30)),
+}
+
+
+def is_market_open(market: str, now: datetime) -> bool:
+    """Whether `market` is in its trading session at the aware datetime `now`."""
+    session = MARKET_SESSIONS.get(market)
+    if session is None:
+        return True
+    tz, open_time, close_time = session
+    local = now.astimezone(tz)
+    return local.weekday() < 5 and open_time <= local.time() < close_time
+
+
+def session_date(market: str, now: datetime) -> date:
+    """
+    Trading date of the latest session of `market` that opened at or before
+    `now`, so the date only changes when a new session opens. Markets without
+    a session roll over at UTC midnight.
+    """
+    session = MARKET_SESSIONS.get(market)
+    if session is None:
+        return now.astimezone(timezone.utc).date()
+    tz, open_time, _ = session
+    local = now.astimezone(tz)
+    day = local.date()
+    if local.time() < open_time:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+class MarketCalendar:
+    """Per-instrument open/closed mask, evaluated once per distinct market."""
+
+    def __init__(self, markets: List[str]):
+        self.market_names, self.market_ids = np.unique(
+            np.asarray(markets, dtype=object), return_inverse=True
+        )
+
+    def open_mask(self, now: datetime) -> np.ndarray:
+        is_open = np.array([is_market_open(market, now) for market in self.market_names], dtype=bool)
+        return is_open[self.market_ids]
+
+    def session_keys(self, now: datetime) -> np.ndarray:
+        """Per-instrument `session_date` as proleptic ordinals."""
+        keys = np.array([session_date(market, now).toordinal() for market in self.market_names], dtype=np.int64)
+        return keys[self.market_ids]
@@ -1,6 +1,11 @@
+import os
 import random
-from datetime import datetime, timezone
-import json
+import string
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+# Mean news arrival rate; inter-arrival times are exponential (a Poisson process)
+NEWS_EVENTS_PER_HOUR = float(os.getenv("NEWS_EVENTS_PER_HOUR", "12"))
 
 class MarketContext:
     def __init__(self, sentiment="neutral", current_leaders=None, current_laggards=None):
@@ -14,10 +19,27 @@ class MarketContext:
             "communicationServices"
         ]
 
+def build_sector_index(metadata: Dict[str, tuple], symbols: List[str] = None) -> Dict[str, List[str]]:
+    """
+    {sector: [symbols]} from {symbol: (sector, market)} instrument metadata
+    (see `load_instrument_metadata`), limited to `symbols` if given.
+    """
+    wanted = None if symbols is None else set(symbols)
+    index = {}
+    for symbol, (sector, _market) in metadata.items():
+        if sector and sector != "unknown" and (wanted is None or symbol in wanted):
+            index.setdefault(sector, []).append(symbol)
+    return index
+
+
 class NewsEngine:
     """
     Generates realistic financial news that affects simulated markets.
     Based on ADR-005.
+
+    Arrivals are scheduled by drawing exponential inter-arrival times, so
+    nothing is drawn between events, and templates are parsed once. Sector news
+    resolves its symbols through `sector_index`.
     """
     NEWS_CATEGORIES = {
         "company_specific": {
@@ -86,68 +108,108 @@ class NewsEngine:
         }
     }
 
-    def _fill_template(self, template: str, category: str, subcat: str, target: str) -> str:
-        # Simplistic template filler
-        text = template
-        if "{company}" in text:
-            text = text.replace("{company}", target)
-        if "{sector}" in text:
-            text = text.replace("{sector}", target.capitalize())
-        
-        # Quarter
-        if "{quarter}" in text:
-            text = text.replace("{quarter}", str(random.randint(1,4)))
-        
-        # EPS/Earnings specific
-        if "{eps}" in text:
-            text = text.replace("{eps}", f"{random.uniform(0.5, 5.0):.2f}")
-        
-        is_beat = random.random() > 0.5
-        verb1 = "Beats" if is_beat else "Misses"
-        verb2 = "beat" if is_beat else "miss"
-        
-        if "{beat_or_miss}" in text:
-            text = text.replace("{beat_or_miss}", verb2)
-        if "{beats_or_misses}" in text:
-            text = text.replace("{beats_or_misses}", verb1)
-            
-        if "{difference}" in text:
-            text = text.replace("{difference}", f"{random.uniform(0.01, 0.50):.2f}")
-        if "{revenue}" in text:
-            text = text.replace("{revenue}", f"{random.uniform(1.0, 50.0):.1f}")
-            
-        return text
-
-    def generate_news_event(self, context: MarketContext, active_symbols: list, active_sectors: list) -> dict:
+    def __init__(
+        self,
+        events_per_hour: float = NEWS_EVENTS_PER_HOUR,
+        sector_index: Dict[str, List[str]] = None,
+        rng: random.Random = None,
+    ):
+        self.events_per_hour = events_per_hour
+        # Pass a seeded generator for reproducible news
+        self.rng = rng or random.Random()
+        self.set_sector_index(sector_index or {})
+        self.next_arrival: Optional[datetime] = None
+
+        # Categories and their subcategories with the placeholders of each template
+        formatter = string.Formatter()
+        self._categories = [
+            (
+                cat_key,
+                [
+                    (
+                        sub_key,
+                        config,
+                        [
+                            (template, {field for _, field, _, _ in formatter.parse(template) if field})
+                            for template in config["templates"]
+                        ],
+                    )
+                    for sub_key, config in subcategories.items()
+                ],
+            )
+            for cat_key, subcategories in self.NEWS_CATEGORIES.items()
+        ]
+
+    def set_sector_index(self, sector_index: Dict[str, List[str]]) -> None:
+        self.sector_index = sector_index
+        self._sectors = sorted(sector_index)
+
+    def _schedule_next(self, after: datetime) -> None:
+        if self.events_per_hour <= 0:
+            self.next_arrival = None
+            return
+        self.next_arrival = after + timedelta(hours=self.rng.expovariate(self.events_per_hour))
+
+    def _fill_template(self, template: str, fields: set, target: str) -> str:
+        values = {}
+        if "company" in fields:
+            values["company"] = target
+        if "sector" in fields:
+            values["sector"] = target.capitalize()
+        if "quarter" in fields:
+            values["quarter"] = self.rng.randint(1, 4)
+        if "eps" in fields:
+            values["eps"] = f"{self.rng.uniform(0.5, 5.0):.2f}"
+        if "beat_or_miss" in fields or "beats_or_misses" in fields:
+            is_beat = self.rng.random() > 0.5
+            values["beat_or_miss"] = "beat" if is_beat else "miss"
+            values["beats_or_misses"] = "Beats" if is_beat else "Misses"
+        if "difference" in fields:
+            values["difference"] = f"{self.rng.uniform(0.01, 0.50):.2f}"
+        if "revenue" in fields:
+            values["revenue"] = f"{self.rng.uniform(1.0, 50.0):.1f}"
+        return template.format_map(values)
+
+    def generate_news_events(self, context: MarketContext, now: datetime = None, active_symbols: list = None) -> List[dict]:
         """
-        Generate a random news event or return None if probability fails.
+        Events whose scheduled arrival is due at `now`, usually none. The first
+        call only schedules the first arrival.
         """
-        # 1% chance to generate news on a given poll tick (to avoid constant chaos)
-        if random.random() > 0.01:
-            return None
-
-        cat_key = random.choice(list(self.NEWS_CATEGORIES.keys()))
-        sub_key = random.choice(list(self.NEWS_CATEGORIES[cat_key].keys()))
-        config = self.NEWS_CATEGORIES[cat_key][sub_key]
-        
-        template = random.choice(config["templates"])
+        now = now or datetime.now(timezone.utc)
+        if self.next_arrival is None:
+            self._schedule_next(now)
+            return []
+
+        events = []
+        while self.next_arrival is not None and self.next_arrival <= now:
+            events.append(self._make_event(context, self.next_arrival, active_symbols or []))
+            self._schedule_next(self.next_arrival)
+        return events
+
+    def _make_event(self, context: MarketContext, timestamp: datetime, active_symbols: list) -> dict:
+        cat_key, subcategories = self.rng.choice(self._categories)
+        sub_key, config, templates = self.rng.choice(subcategories)
+        template, fields = self.rng.choice(templates)
         scope = config.get("scope", "global")
-        
+
         target = "Market"
         affected_symbols = []
-        
+
         if scope == "symbol" and active_symbols:
-            target = random.choice(active_symbols)
+            target = self.rng.choice(active_symbols)
             affected_symbols = [target]
-        elif scope == "sector" and active_sectors:
-            target = random.choice(active_sectors)
-            # Would typically resolve which symbols belong to the sector here.
-            
-        headline = self._fill_template(template, cat_key, sub_key, target)
-        
+        elif scope == "sector":
+            if self._sectors:
+                target = self.rng.choice(self._sectors)
+                affected_symbols = list(self.sector_index[target])
+            else:
+                target = self.rng.choice(context.active_sectors)
+
+        headline = self._fill_template(template, fields, target)
+
         # Divide raw theoretical impact by 10 for realistic sub-1% minute-tick jumps
-        impact = random.uniform(*config["impact_range"]) / 10.0
-        
+        impact = self.rng.uniform(*config["impact_range"]) / 10.0
+
         # Amplify impact if sentiment matches
         if context.sentiment == "bullish" and impact > 0:
             impact *= 1.2
@@ -158,7 +220,7 @@ class NewsEngine:
             "headline": headline,
             "category": cat_key,
             "subcategory": sub_key,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": timestamp.isoformat(),
             "impact": impact,
             "duration_minutes": config.get("duration_minutes", 60),
             "affected_scope": scope,
@@ -0,0 +1,122 @@
+"""
+Time-decaying impact of news on drift and volatility.
+
+Each news event becomes a shock with a drift shift and a volatility multiplier
+over the instruments it targets, whose weight decays from 1 to 0 over the
+event's `duration_minutes`. Active shocks live in fixed-capacity arrays, so
+their combined effect is a couple of matrix-vector products per tick no matter
+how many events are active, and expired shocks are simply evicted. Base drifts
+and volatilities are never mutated.
+"""
+import os
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# "exponential" or "linear"
+NEWS_DECAY_KERNEL = os.getenv("NEWS_DECAY_KERNEL", "exponential")
+# Most shocks tracked at once; when full the one closest to expiry is replaced
+NEWS_MAX_ACTIVE_SHOCKS = int(os.getenv("NEWS_MAX_ACTIVE_SHOCKS", "64"))
+
+# Peak volatility multipliers, as previously applied permanently
+GLOBAL_VOLATILITY_SPIKE = 1.5
+SYMBOL_VOLATILITY_SPIKE = 2.0
+
+# The exponential kernel is down to e^-3 (about 5%) when the shock expires
+_EXPONENTIAL_RATE = 3.0
+
+
+def decay_weights(age: np.ndarray, duration: np.ndarray, kernel: str = NEWS_DECAY_KERNEL) -> np.ndarray:
+    """Weight of shocks `age` seconds old, 1 when they arrive and 0 from `duration` on."""
+    progress = np.clip(age / duration, 0.0, 1.0)
+    if kernel == "linear":
+        weights = 1.0 - progress
+    elif kernel == "exponential":
+        weights = np.exp(-_EXPONENTIAL_RATE * progress)
+    else:
+        raise ValueError(f"Unknown news decay kernel '{kernel}', expected 'exponential' or 'linear'")
+    return np.where(progress < 1.0, weights, 0.0)
+
+
+def combine_overlays(*overlays: Tuple[Optional[np.ndarray], Optional[np.ndarray]]):
+    """Sums drift offsets and multiplies volatility scales of (drift, scale) pairs; None if none apply."""
+    drift_offsets, volatility_scales = None, None
+    for drift, scale in overlays:
+        if drift is not None:
+            drift_offsets = drift if drift_offsets is None else drift_offsets + drift
+        if scale is not None:
+            volatility_scales = scale if volatility_scales is None else volatility_scales * scale
+    return drift_offsets, volatility_scales
+
+
+class NewsImpactModel:
+    """Active news shocks over a fixed set of instruments."""
+
+    def __init__(self, symbols: List[str], capacity: int = NEWS_MAX_ACTIVE_SHOCKS, kernel: str = NEWS_DECAY_KERNEL):
+        decay_weights(np.zeros(1), np.ones(1), kernel)  # Validate the kernel up front
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.kernel = kernel
+        self.active = np.zeros(capacity, dtype=bool)
+        self.starts = np.zeros(capacity)
+        self.durations = np.ones(capacity)
+        self.drifts = np.zeros(capacity)
+        self.log_volatility = np.zeros(capacity)
+        self.targets = np.zeros((capacity, len(symbols)))
+
+    def __len__(self) -> int:
+        return int(self.active.sum())
+
+    def add(self, now: datetime, duration_minutes: float, drift: float, volatility: float, indices=None) -> None:
+        """
+        Starts a shock shifting drift by `drift` and multiplying volatility by
+        `volatility` at its peak, for `indices` (all instruments if None).
+        """
+        free = np.flatnonzero(~self.active)
+        if len(free):
+            slot = free[0]
+        else:
+            # Replace the shock with the least weight left
+            slot = int(np.argmin(self._weights(now.timestamp())))
+        self.active[slot] = True
+        self.starts[slot] = now.timestamp()
+        self.durations[slot] = max(float(duration_minutes), 1e-3) * 60
+        self.drifts[slot] = drift
+        self.log_volatility[slot] = np.log(volatility)
+        self.targets[slot] = 0.0
+        self.targets[slot, slice(None) if indices is None else indices] = 1.0
+
+    def add_event(self, news_event: dict, now: datetime) -> None:
+        """Adds the shock of a NewsEngine event; events without resolvable targets are ignored."""
+        impact = news_event["impact"]
+        duration = news_event.get("duration_minutes", 60)
+        scope = news_event["affected_scope"]
+        if scope == "global":
+            self.add(now, duration, impact / 10, GLOBAL_VOLATILITY_SPIKE)
+            return
+
+        indices = self.indices(news_event.get("affected_symbols") or [])
+        if not indices:
+            return
+        if scope == "symbol":
+            self.add(now, duration, 0.0, SYMBOL_VOLATILITY_SPIKE, indices)
+        else:
+            self.add(now, duration, impact / 10, GLOBAL_VOLATILITY_SPIKE, indices)
+
+    def indices(self, symbols: Iterable[str]) -> List[int]:
+        return [self.index[symbol] for symbol in symbols if symbol in self.index]
+
+    def _weights(self, now: float) -> np.ndarray:
+        return np.where(self.active, decay_weights(now - self.starts, self.durations, self.kernel), 0.0)
+
+    def parameters(self, now: datetime) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """(drift offsets, volatility scales) of the active shocks at `now`; (None, None) if there are none."""
+        if not self.active.any():
+            return None, None
+        weights = self._weights(now.timestamp())
+        self.active &= weights > 0  # Evict expired shocks
+        if not self.active.any():
+            return None, None
+        drift_offsets = (weights * self.drifts) @ self.targets
+        volatility_scales = np.exp((weights * self.log_volatility) @ self.targets)
+        return drift_offsets, volatility_scales
@@ -0,0 +1,173 @@
+"""
+Write-behind persistence of price ticks.
+
+The tick loop hands each tick's rows to a `TickWriter` without waiting on
+Postgres. A background task flushes the buffered rows with asyncpg's binary
+COPY once enough rows have accumulated or the flush interval has passed.
+The buffer is bounded: while Postgres is slow or down, further ticks are
+dropped and counted instead of growing memory or stalling the loop. Rows of a
+failed flush are only retried after connection errors and timeouts, and at
+most TICK_WRITE_MAX_ATTEMPTS times; rows that can never be written (say, an
+unknown symbol or a missing partition) are discarded so they cannot jam the
+buffer.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import List
+
+# Flush as soon as this many rows are buffered...
+TICK_WRITE_BATCH_ROWS = int(os.getenv("TICK_WRITE_BATCH_ROWS", "5000"))
+# ...or at the latest after this many seconds
+TICK_WRITE_INTERVAL_SECONDS = float(os.getenv("TICK_WRITE_INTERVAL_SECONDS", "10"))
+# Rows held in memory at most; ticks beyond it are dropped
+TICK_WRITE_MAX_ROWS = int(os.getenv("TICK_WRITE_MAX_ROWS", "200000"))
+# Consecutive failed flushes after which the buffered rows are given up
+TICK_WRITE_MAX_ATTEMPTS = int(os.getenv("TICK_WRITE_MAX_ATTEMPTS", "5"))
+
+TICK_COLUMNS = ["symbol", "timestamp", "price", "bid", "ask", "volume"]
+
+
+async def copy_tick_rows(rows: List[tuple]) -> None:
+    """Bulk insert (symbol, timestamp, price, bid, ask, volume) rows with COPY."""
+    from db.database import engine
+
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "price_ticks", records=rows, columns=TICK_COLUMNS
+        )
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed COPY may succeed unchanged later: connection trouble or a timeout."""
+    import asyncpg
+    from sqlalchemy import exc
+
+    if isinstance(error, (OSError, asyncio.TimeoutError, asyncpg.InterfaceError, exc.TimeoutError)):
+        return True
+    if isinstance(error, (asyncpg.PostgresConnectionError, asyncpg.OperatorInterventionError,
+                          asyncpg.TooManyConnectionsError)):
+        return True
+    if isinstance(error, exc.DBAPIError):
+        return error.connection_invalidated or isinstance(error, (exc.OperationalError, exc.InterfaceError))
+    return False
+
+
+class TickWriter:
+    """Bounded write-behind buffer for price ticks, flushed by a background task."""
+
+    def __init__(
+        self,
+        batch_rows: int = TICK_WRITE_BATCH_ROWS,
+        interval: float = TICK_WRITE_INTERVAL_SECONDS,
+        max_rows: int = TICK_WRITE_MAX_ROWS,
+        max_attempts: int = TICK_WRITE_MAX_ATTEMPTS,
+        copy=copy_tick_rows,
+    ):
+        self.batch_rows = batch_rows
+        self.interval = interval
+        self.max_rows = max_rows
+        self.max_attempts = max_attempts
+        self.copy = copy
+
+        self.rows = []
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.max_flush_seconds = 0.0
+        self._dropping = False
+        self._attempts = 0  # Consecutive failed flushes
+
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, ticks: List[dict]) -> None:
+        """Queue tick dicts for persistence. Never blocks."""
+        room = max(self.max_rows - len(self.rows), 0)
+        if room < len(ticks):
+            if not self._dropping:
+                print(f"Tick write buffer full ({len(self.rows)} rows), dropping ticks")
+                self._dropping = True
+            self.dropped += len(ticks) - room
+            ticks = ticks[:room]
+        elif self._dropping:
+            print(f"Tick write buffer recovered, {self.dropped} ticks dropped so far")
+            self._dropping = False
+
+        timestamps = {}
+        for t in ticks:
+            ts = t["timestamp"]
+            if ts not in timestamps:
+                timestamps[ts] = datetime.fromisoformat(ts)
+            self.rows.append((t["symbol"], timestamps[ts], t["price"], t["bid"], t["ask"], t["volume"]))
+
+        if len(self.rows) >= self.batch_rows:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Write out everything buffered so far."""
+        async with self._flush_lock:
+            rows, self.rows = self.rows, []
+            if not rows:
+                return
+            started = time.monotonic()
+            try:
+                await self.copy(rows)
+            except Exception as e:
+                self.failed_flushes += 1
+                self._attempts += 1
+                print(f"Error writing {len(rows)} ticks to DB: {e}")
+                if not is_transient(e) or self._attempts >= self.max_attempts:
+                    self._attempts = 0
+                    self.dropped += len(rows)
+                    print(f"Discarded {len(rows)} ticks that could not be written")
+                    return
+                # Keep the newest rows for the next attempt as far as they fit
+                room = max(self.max_rows - len(self.rows), 0)
+                keep = rows[max(len(rows) - room, 0):]
+                self.dropped += len(rows) - len(keep)
+                self.rows = keep + self.rows
+                return
+            self._attempts = 0
+            self.flushes += 1
+            self.written += len(rows)
+            self.max_flush_seconds = max(self.max_flush_seconds, time.monotonic() - started)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stops the background task and flushes the remaining rows."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        print(
+            f"Tick writer closed: {self.written} written, {self.dropped} dropped, "
+            f"{self.failed_flushes} failed flushes"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self.rows),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failedFlushes": self.failed_flushes,
+            "maxFlushSeconds": self.max_flush_seconds,
+        }
@@ -1,9 +1,25 @@
+import asyncio
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, List
 
 # Implementation based on ADR-005 Models
 
 
+def _sum_jump_returns(rng: np.random.Generator, num_jumps: np.ndarray, jump_mean: float, jump_std: float) -> np.ndarray:
+    """
+    Sum the relative price moves exp(J) - 1 of a Poisson number of lognormal
+    jumps per cell of `num_jumps`, drawing every jump in one call.
+    """
+    total_jumps = int(num_jumps.sum())
+    if not total_jumps:
+        return np.zeros(num_jumps.shape)
+    jump_sizes = rng.normal(jump_mean, jump_std, total_jumps)
+    owners = np.repeat(np.arange(num_jumps.size), num_jumps.ravel())
+    sums = np.bincount(owners, weights=np.expm1(jump_sizes), minlength=num_jumps.size)
+    return sums.reshape(num_jumps.shape)
+
+
 class GBMPriceModel:
     """Base price model using Geometric Brownian Motion (GBM)"""
 
@@ -25,6 +41,16 @@ class GBMPriceModel:
         self.price += dS
         return max(self.price, 0.01)
 
+    def simulate_paths(self, n_steps: int, n_paths: int, seed: int = None) -> np.ndarray:
+        """
+        Simulate independent price paths from the current price without
+        mutating the model. Returns an (n_paths, n_steps) array.
+        """
+        rng = np.random.default_rng(seed)
+        dW = rng.normal(0, np.sqrt(self.dt), (n_paths, n_steps))
+        growth = 1 + self.drift * self.dt + self.volatility * dW
+        return np.maximum(self.price * np.cumprod(growth, axis=1), 0.01)
+
 
 class JumpDiffusionModel:
     """Merton's Jump Diffusion Model for sudden price movements"""
@@ -64,6 +90,22 @@ class JumpDiffusionModel:
         self.price = self.price + gbm_component + jump_component
         return max(self.price, 0.01)
 
+    def simulate_paths(self, n_steps: int, n_paths: int, seed: int = None) -> np.ndarray:
+        """
+        Simulate independent price paths from the current price without
+        mutating the model. Returns an (n_paths, n_steps) array.
+        """
+        rng = np.random.default_rng(seed)
+        k = np.exp(self.jump_mean + 0.5 * self.jump_std**2) - 1
+        adjusted_drift = self.drift - self.jump_intensity * k
+
+        dW = rng.normal(0, np.sqrt(self.dt), (n_paths, n_steps))
+        num_jumps = rng.poisson(self.jump_intensity * self.dt, (n_paths, n_steps))
+        jump_returns = _sum_jump_returns(rng, num_jumps, self.jump_mean, self.jump_std)
+
+        growth = 1 + adjusted_drift * self.dt + self.volatility * dW + jump_returns
+        return np.maximum(self.price * np.cumprod(growth, axis=1), 0.01)
+
 
 class GARCHVolatilityModel:
     """GARCH(1,1) Model for time-varying volatility clustering"""
@@ -105,3 +147,382 @@ class GBMWithGARCH:
         self.garch.update_volatility(return_val)
 
         return max(self.price, 0.01), volatility
+
+    def simulate_paths(self, n_steps: int, n_paths: int, seed: int = None) -> np.ndarray:
+        """
+        Simulate independent price paths from the current price and variance
+        without mutating the model. Returns an (n_paths, n_steps) array.
+
+        The variance recursion depends on the previous return, so it is
+        stepped through time once while every path is updated together.
+        """
+        rng = np.random.default_rng(seed)
+        garch = self.garch
+        dW = rng.normal(0, np.sqrt(self.dt), (n_paths, n_steps))
+
+        returns = np.empty((n_paths, n_steps))
+        variance = np.full(n_paths, garch.variance)
+        for t in range(n_steps):
+            step_returns = self.drift * self.dt + np.sqrt(variance) * dW[:, t]
+            variance = garch.omega + garch.alpha * step_returns**2 + garch.beta * variance
+            returns[:, t] = step_returns
+
+        return np.maximum(self.price * np.cumprod(1 + returns, axis=1), 0.01)
+
+
+# Pairwise correlation components (ADR-005 Model 4). Every pair of instruments
+# shares the global component, pairs in the same market add the market
+# component and pairs in the same sector add the sector component.
+GLOBAL_CORRELATION = 0.15
+MARKET_CORRELATION = 0.30
+SECTOR_CORRELATION = 0.25
+
+# Sector label that does not group instruments together (e.g. broad indices)
+UNGROUPED_SECTOR = "unknown"
+
+
+def build_correlation_matrix(
+    sectors: List[str],
+    markets: List[str],
+    global_corr: float = GLOBAL_CORRELATION,
+    market_corr: float = MARKET_CORRELATION,
+    sector_corr: float = SECTOR_CORRELATION,
+) -> np.ndarray:
+    """
+    Build a sector/market correlation matrix for the given instruments.
+
+    The matrix is a sum of block-constant components plus a positive diagonal,
+    so it is positive definite whenever the components add up to less than 1.
+    """
+    if global_corr + market_corr + sector_corr >= 1:
+        raise ValueError("Correlation components must sum to less than 1")
+
+    _, market_ids = np.unique(np.asarray(markets, dtype=object), return_inverse=True)
+    _, sector_ids = np.unique(np.asarray(sectors, dtype=object), return_inverse=True)
+    grouped = np.asarray(sectors, dtype=object) != UNGROUPED_SECTOR
+
+    same_market = market_ids[:, None] == market_ids[None, :]
+    same_sector = (sector_ids[:, None] == sector_ids[None, :]) & grouped[:, None] & grouped[None, :]
+
+    matrix = global_corr + market_corr * same_market + sector_corr * same_sector
+    np.fill_diagonal(matrix, 1.0)
+    return matrix
+
+
+class CorrelationEngine:
+    """
+    Cholesky decomposition for correlated asset returns (ADR-005 Model 4).
+
+    The factor is cached per instrument set and only recomputed by `update`
+    when symbols, sectors or markets change, so a tick costs one matrix
+    multiply for the whole universe.
+    """
+
+    def __init__(
+        self,
+        global_corr: float = GLOBAL_CORRELATION,
+        market_corr: float = MARKET_CORRELATION,
+        sector_corr: float = SECTOR_CORRELATION,
+    ):
+        self.global_corr = global_corr
+        self.market_corr = market_corr
+        self.sector_corr = sector_corr
+        self.asset_names: List[str] = []
+        self.correlation_matrix = None
+        self.cholesky_matrix = None
+        self._universe_key = None
+
+    def update(self, symbols: List[str], sectors: List[str], markets: List[str]) -> bool:
+        """Refactor the matrix if the instrument set changed. Returns True if it did."""
+        universe_key = tuple(zip(symbols, sectors, markets))
+        if universe_key == self._universe_key:
+            return False
+
+        self.correlation_matrix = build_correlation_matrix(
+            sectors, markets, self.global_corr, self.market_corr, self.sector_corr
+        )
+        self.cholesky_matrix = np.linalg.cholesky(self.correlation_matrix)
+        self.asset_names = list(symbols)
+        self._universe_key = universe_key
+        return True
+
+    def correlate(self, independent_shocks: np.ndarray) -> np.ndarray:
+        """
+        Apply the correlation structure to standard normal draws of shape
+        (n_assets,) or (n_steps, n_assets).
+        """
+        return independent_shocks @ self.cholesky_matrix.T
+
+
+class FactorShockModel:
+    """
+    Common-factor form of `build_correlation_matrix`.
+
+    Each shock is a loading on one global, one per-market and one per-sector
+    factor plus idiosyncratic noise, which reproduces the same correlation
+    matrix. The shared part is a vector of a few factors, so processes that
+    each simulate a slice of the universe can draw their own idiosyncratic
+    noise and still co-move consistently.
+    """
+
+    def __init__(
+        self,
+        sectors: List[str],
+        markets: List[str],
+        global_corr: float = GLOBAL_CORRELATION,
+        market_corr: float = MARKET_CORRELATION,
+        sector_corr: float = SECTOR_CORRELATION,
+    ):
+        if global_corr + market_corr + sector_corr >= 1:
+            raise ValueError("Correlation components must sum to less than 1")
+
+        sectors = np.asarray(sectors, dtype=object)
+        self.market_names, self.market_ids = np.unique(np.asarray(markets, dtype=object), return_inverse=True)
+        self.sector_names, self.sector_ids = np.unique(sectors, return_inverse=True)
+        grouped = sectors != UNGROUPED_SECTOR
+
+        self.global_loading = np.sqrt(global_corr)
+        self.market_loading = np.sqrt(market_corr)
+        self.sector_loadings = np.where(grouped, np.sqrt(sector_corr), 0.0)
+        self.idiosyncratic_loadings = np.sqrt(1 - global_corr - market_corr - sector_corr * grouped)
+
+    @property
+    def n_factors(self) -> int:
+        return 1 + len(self.market_names) + len(self.sector_names)
+
+    def draw_factors(self, rng: np.random.Generator) -> np.ndarray:
+        """One draw of the global, market and sector factors, in that order."""
+        return rng.standard_normal(self.n_factors)
+
+    def shocks(self, factors: np.ndarray, idiosyncratic: np.ndarray, indices=None) -> np.ndarray:
+        """
+        Combine common `factors` with idiosyncratic standard normal draws into
+        correlated shocks for `indices` (all instruments if None).
+        """
+        target = slice(None) if indices is None else indices
+        n_markets = len(self.market_names)
+        market_factors = factors[1:1 + n_markets]
+        sector_factors = factors[1 + n_markets:]
+        return (
+            self.global_loading * factors[0]
+            + self.market_loading * market_factors[self.market_ids[target]]
+            + self.sector_loadings[target] * sector_factors[self.sector_ids[target]]
+            + self.idiosyncratic_loadings[target] * idiosyncratic
+        )
+
+
+class ShockBuffer:
+    """
+    Ring buffer of pre-generated (and optionally correlated) standard normal shocks.
+
+    Shocks are drawn in blocks of `block_steps x n_assets`. While the tick loop
+    reads rows from the current block, the next block is generated on a
+    background thread, so the hot path is a single array index per tick.
+    Blocks are only drawn once shocks are first needed; async callers
+    `await ready()` before `next()` so neither the first block nor a late
+    refill ever blocks the event loop.
+    """
+
+    # Upper bound for one block so very large universes get shorter blocks
+    MAX_BLOCK_BYTES = 64 * 1024 * 1024
+
+    def __init__(
+        self,
+        n_assets: int,
+        block_steps: int = 10_000,
+        correlation: CorrelationEngine = None,
+        seed: int = None,
+        executor: ThreadPoolExecutor = None,
+    ):
+        self.n_assets = n_assets
+        self.block_steps = max(1, min(block_steps, self.MAX_BLOCK_BYTES // (8 * max(n_assets, 1))))
+        self.correlation = correlation
+        self.stalls = 0  # Times the tick loop had to wait for a refill
+
+        # Only ever used by one refill at a time (single worker), never concurrently
+        self._rng = np.random.default_rng(seed)
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="shock-buffer"
+        )
+        self._block = None
+        self._cursor = 0
+        self._next_block = None
+
+    def _generate_block(self) -> np.ndarray:
+        shocks = self._rng.standard_normal((self.block_steps, self.n_assets))
+        if self.correlation is not None:
+            shocks = self.correlation.correlate(shocks)
+        return shocks
+
+    def _refill(self):
+        """Future of the block that follows the current one, counting a stall if it is late."""
+        if self._next_block is None:
+            self._next_block = self._executor.submit(self._generate_block)
+        elif self._block is not None and not self._next_block.done():
+            self.stalls += 1
+        return self._next_block
+
+    def _advance(self, block: np.ndarray) -> None:
+        self._block = block
+        self._cursor = 0
+        self._next_block = self._executor.submit(self._generate_block)
+
+    async def ready(self) -> None:
+        """Waits, without blocking the event loop, until `next()` can return at once."""
+        if self._block is None or self._cursor == self.block_steps:
+            self._advance(await asyncio.wrap_future(self._refill()))
+
+    def next(self) -> np.ndarray:
+        """Return the shocks for the next tick, one per asset."""
+        if self._block is None or self._cursor == self.block_steps:
+            self._advance(self._refill().result())
+
+        shocks = self._block[self._cursor]
+        self._cursor += 1
+        return shocks
+
+    async def call(self, fn, *args):
+        """Runs `fn` on the buffer's worker, between refills, without blocking the event loop."""
+        return await asyncio.wrap_future(self._executor.submit(fn, *args))
+
+    def reset(self):
+        """Discard buffered shocks, e.g. after the correlation factor was rebuilt."""
+        if self._next_block is not None:
+            self._next_block.cancel()
+        self._block = None
+        self._next_block = None
+
+    def close(self):
+        if self._next_block is not None:
+            self._next_block.cancel()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+
+class VectorizedPriceEngine:
+    """
+    Universe-level price model that advances every instrument in one batched draw.
+
+    Prices, drifts and volatilities are held as NumPy arrays indexed by symbol
+    position, so a tick costs a fixed number of array operations no matter how
+    many instruments are simulated. Supports the GBM, jump-diffusion and GARCH
+    variants of the scalar models above.
+    """
+
+    MODELS = ("gbm", "jump_diffusion", "garch")
+
+    def __init__(
+        self,
+        symbols: List[str],
+        initial_prices,
+        drifts,
+        volatilities,
+        model: str = "gbm",
+        dt: float = None,
+        jump_intensity: float = 2.0,
+        jump_mean: float = 0.0,
+        jump_std: float = 0.10,
+        garch_omega: float = 0.000001,
+        garch_alpha: float = 0.1,
+        garch_beta: float = 0.85,
+        correlation: CorrelationEngine = None,
+        seed: int = None,
+    ):
+        if model not in self.MODELS:
+            raise ValueError(f"Unknown price model '{model}', expected one of {self.MODELS}")
+
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.prices = np.array(initial_prices, dtype=np.float64)
+        self.drifts = np.array(drifts, dtype=np.float64)
+        self.volatilities = np.array(volatilities, dtype=np.float64)
+        self.model = model
+
+        # Same time steps as the scalar models: GBM is scaled down for slow
+        # cent-level ticks, the others use 15 second steps of a trading day.
+        if dt is None:
+            dt = 1 / (252 * 200000) if model == "gbm" else 15 / (252 * 390 * 60)
+        self.dt = dt
+        self.sqrt_dt = np.sqrt(dt)
+
+        self.jump_intensity = jump_intensity
+        self.jump_mean = jump_mean
+        self.jump_std = jump_std
+
+        self.garch_omega = garch_omega
+        self.garch_alpha = garch_alpha
+        self.garch_beta = garch_beta
+        self.variances = self.volatilities**2
+
+        self.correlation = correlation
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def current_volatilities(self) -> np.ndarray:
+        """Effective per-instrument volatility used by the next step."""
+        if self.model == "garch":
+            return np.sqrt(self.variances)
+        return self.volatilities
+
+    def scale_volatility(self, factor, indices=None):
+        """Multiply volatility by `factor` for `indices` (all instruments if None)."""
+        target = slice(None) if indices is None else indices
+        self.volatilities[target] *= factor
+        self.variances[target] *= np.square(factor)
+
+    def step(
+        self,
+        shocks: np.ndarray = None,
+        active: np.ndarray = None,
+        drift_offsets: np.ndarray = None,
+        volatility_scales: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Advance every instrument by one time step and return the new prices.
+        `shocks` are optional standard normal draws, one per instrument, that
+        already carry any correlation structure. Instruments where the boolean
+        `active` mask is False (e.g. closed markets) keep their price and state.
+        `drift_offsets` and `volatility_scales` (e.g. from a scenario) adjust
+        this step only, leaving the base parameters untouched.
+        """
+        if shocks is None:
+            shocks = self.rng.standard_normal(len(self.symbols))
+            if self.correlation is not None:
+                shocks = self.correlation.correlate(shocks)
+        dW = shocks * self.sqrt_dt
+        if volatility_scales is not None:
+            dW = dW * volatility_scales
+        drifts = self.drifts if drift_offsets is None else self.drifts + drift_offsets
+
+        if self.model == "gbm":
+            returns = drifts * self.dt + self.volatilities * dW
+        elif self.model == "jump_diffusion":
+            returns = self._jump_diffusion_returns(drifts, dW)
+        else:
+            returns = drifts * self.dt + np.sqrt(self.variances) * dW
+            variances = (
+                self.garch_omega
+                + self.garch_alpha * returns**2
+                + self.garch_beta * self.variances
+            )
+            self.variances = variances if active is None else np.where(active, variances, self.variances)
+
+        if active is not None:
+            returns = np.where(active, returns, 0.0)
+
+        self.prices *= 1 + returns
+        np.maximum(self.prices, 0.01, out=self.prices)
+        return self.prices.copy()
+
+    def _jump_diffusion_returns(self, drifts: np.ndarray, dW: np.ndarray) -> np.ndarray:
+        k = np.exp(self.jump_mean + 0.5 * self.jump_std**2) - 1
+        adjusted_drifts = drifts - self.jump_intensity * k
+        returns = adjusted_drifts * self.dt + self.volatilities * dW
+
+        num_jumps = self.rng.poisson(self.jump_intensity * self.dt, len(self.symbols))
+        returns += _sum_jump_returns(self.rng, num_jumps, self.jump_mean, self.jump_std)
+        return returns
@@ -0,0 +1,259 @@
+"""
+Historical replay: streams stored ticks instead of simulating new ones.
+
+    python -m simulation.replay --start 2026-01-05T14:30 --end 2026-01-06 --speed 60
+
+Ticks are read in time order from `price_ticks` through a server-side cursor
+or from the columnar tick archive one day at a time, so memory stays bounded
+for any range. They are published to the same `market:ticks:*` channels and
+quote snapshots as the live loop, in their original timestamps, paced at
+`speed` times real time. Replayed ticks are not persisted again.
+
+With SIMULATOR_SOURCE=replay the leader-leased runner replays REPLAY_START to
+REPLAY_END instead of running the price engine.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+# "postgres" or "archive"
+REPLAY_SOURCE = os.getenv("REPLAY_SOURCE", "postgres")
+REPLAY_START = os.getenv("REPLAY_START", "")
+REPLAY_END = os.getenv("REPLAY_END", "")
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "10"))
+# Start over at the end of the range instead of stopping
+REPLAY_LOOP = os.getenv("REPLAY_LOOP", "false").lower() == "true"
+# Rows fetched per round trip of the server-side cursor
+REPLAY_FETCH_ROWS = int(os.getenv("REPLAY_FETCH_ROWS", "5000"))
+
+
+class TickBatch(NamedTuple):
+    """Time-ordered stored ticks as columns; `indices` are positions in the replayed universe."""
+
+    indices: np.ndarray
+    timestamps_ms: np.ndarray
+    prices: np.ndarray
+    volumes: np.ndarray
+
+
+async def postgres_batches(
+    index: Dict[str, int], start: datetime, end: datetime, fetch_rows: int = REPLAY_FETCH_ROWS
+) -> AsyncIterator[TickBatch]:
+    """Ticks of the `index` symbols in [start, end) from price_ticks, via a server-side cursor."""
+    from sqlalchemy import text
+    from db.database import engine
+
+    query = text("""
+        SELECT symbol, timestamp, price, volume
+        FROM price_ticks
+        WHERE timestamp >= :start AND timestamp < :end
+        ORDER BY timestamp, symbol
+    """)
+    async with engine.connect() as conn:
+        result = await conn.stream(query, {"start": start, "end": end})
+        async for rows in result.partitions(fetch_rows):
+            rows = [row for row in rows if row[0] in index]
+            if not rows:
+                continue
+            symbols, timestamps, prices, volumes = zip(*rows)
+            yield TickBatch(
+                np.array([index[symbol] for symbol in symbols]),
+                np.array([int(ts.timestamp() * 1000) for ts in timestamps], dtype=np.int64),
+                np.array(prices, dtype=np.float64),
+                np.array(volumes, dtype=np.float64),
+            )
+
+
+def archive_batches(
+    archive, index: Dict[str, int], start: datetime, end: datetime, fetch_rows: int = REPLAY_FETCH_ROWS
+) -> Iterator[TickBatch]:
+    """Ticks of the `index` symbols in [start, end) from the tick archive, merged one day at a time."""
+    day = start.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        day_end = min(day + timedelta(days=1), end)
+        parts = []
+        for symbol, i in index.items():
+            for records in archive.ticks(symbol, max(day, start), day_end):
+                parts.append((np.full(len(records), i), records))
+        day = day + timedelta(days=1)
+        if not parts:
+            continue
+
+        indices = np.concatenate([part[0] for part in parts])
+        timestamps = np.concatenate([part[1]["timestamp_ms"] for part in parts])
+        order = np.lexsort((indices, timestamps))
+        prices = np.concatenate([part[1]["price"] for part in parts])[order]
+        volumes = np.concatenate([part[1]["volume"] for part in parts])[order]
+        indices, timestamps = indices[order], timestamps[order]
+        for lo in range(0, len(order), fetch_rows):
+            hi = lo + fetch_rows
+            yield TickBatch(indices[lo:hi], timestamps[lo:hi], prices[lo:hi], volumes[lo:hi])
+
+
+async def _as_async(batches: Iterator[TickBatch]) -> AsyncIterator[TickBatch]:
+    for batch in batches:
+        yield batch
+        await asyncio.sleep(0)  # Reading the archive must not starve the publisher
+
+
+def split_by_timestamp(batch: TickBatch) -> List[TickBatch]:
+    """One batch per distinct timestamp, i.e. per original tick."""
+    bounds = np.flatnonzero(np.diff(batch.timestamps_ms)) + 1
+    starts = np.concatenate([[0], bounds])
+    stops = np.concatenate([bounds, [len(batch.timestamps_ms)]])
+    return [
+        TickBatch(*(column[lo:hi] for column in batch))
+        for lo, hi in zip(starts.tolist(), stops.tolist())
+    ]
+
+
+async def ticks_by_timestamp(batches: AsyncIterator[TickBatch]) -> AsyncIterator[TickBatch]:
+    """
+    One batch per original tick across fetched batches: the last tick of a
+    batch is held back and joined with its continuation in the next one.
+    """
+    carry = None
+    async for batch in batches:
+        if carry is not None:
+            batch = TickBatch(*(np.concatenate(pair) for pair in zip(carry, batch)))
+        ticks = split_by_timestamp(batch)
+        carry = ticks.pop()
+        for tick in ticks:
+            yield tick
+    if carry is not None and len(carry.indices):
+        yield carry
+
+
+class ReplayClock:
+    """Maps data timestamps to event loop time at `speed` times real time."""
+
+    def __init__(self, speed: float, clock=None):
+        if speed <= 0:
+            raise ValueError("Replay speed must be positive")
+        self.speed = speed
+        self.clock = clock or asyncio.get_running_loop().time
+        self.origin = None  # (data ms, loop time) of the first tick
+
+    def delay(self, timestamp_ms: int) -> float:
+        """Seconds to wait before publishing a tick stamped `timestamp_ms`."""
+        now = self.clock()
+        if self.origin is None:
+            self.origin = (timestamp_ms, now)
+        data_origin, wall_origin = self.origin
+        return wall_origin + (timestamp_ms - data_origin) / 1000 / self.speed - now
+
+
+async def replay_ticks(
+    source: str = REPLAY_SOURCE,
+    start: datetime = None,
+    end: datetime = None,
+    speed: float = REPLAY_SPEED,
+    loop: bool = REPLAY_LOOP,
+) -> None:
+    """Publishes the stored ticks of [start, end) until the range is exhausted (or forever if `loop`)."""
+    from simulation.market_hours import MarketCalendar
+    from simulation.tasks import (
+        MOCK_INSTRUMENTS,
+        build_snapshots,
+        load_instrument_metadata,
+        publish_symbol_table,
+        publish_ticks,
+    )
+    from db.redis_client import get_redis_client
+
+    if start is None or end is None or end <= start:
+        raise ValueError("Replay needs a start before its end")
+
+    r = get_redis_client()
+    symbols = [inst["symbol"] for inst in MOCK_INSTRUMENTS]
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    symbol_table = await publish_symbol_table(r, symbols)
+    metadata = await load_instrument_metadata()
+    calendar = MarketCalendar([metadata.get(symbol, ("unknown", "unknown"))[1] for symbol in symbols])
+
+    # Sessions start blank: the live quotes belong to a different day
+    initial = SimpleNamespace(prices=np.array([inst["price"] for inst in MOCK_INSTRUMENTS], dtype=np.float64))
+    snapshots = build_snapshots(MOCK_INSTRUMENTS, {}, initial)
+
+    print(f"Replaying {source} ticks from {start.isoformat()} to {end.isoformat()} at {speed}x")
+    while True:
+        if source == "archive":
+            from db.tick_archive import TickArchive
+
+            batches = _as_async(archive_batches(TickArchive(), index, start, end))
+        elif source == "postgres":
+            batches = postgres_batches(index, start, end)
+        else:
+            raise ValueError(f"Unknown replay source '{source}', expected 'postgres' or 'archive'")
+
+        clock = ReplayClock(speed)
+        published = 0
+        async for tick in ticks_by_timestamp(batches):
+            timestamp_ms = int(tick.timestamps_ms[0])
+            delay = clock.delay(timestamp_ms)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+            await publish_ticks(
+                r,
+                snapshots,
+                tick.indices,
+                tick.prices,
+                calendar.session_keys(now)[tick.indices],
+                symbol_table,
+                tick.indices,
+                now,
+                volumes=tick.volumes,
+            )
+            published += len(tick.indices)
+
+        print(f"Replay finished, {published} ticks published")
+        if not loop or not published:
+            return
+
+
+def parse_timestamp(value: str) -> datetime:
+    timestamp = datetime.fromisoformat(value)
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def replay_range(start: str = REPLAY_START, end: str = REPLAY_END) -> Tuple[datetime, datetime]:
+    """The configured replay range, checked up front so the runner fails once instead of every lease."""
+    try:
+        start_ts, end_ts = parse_timestamp(start), parse_timestamp(end)
+    except ValueError:
+        raise ValueError(f"REPLAY_START and REPLAY_END must be ISO timestamps, got {start!r} and {end!r}")
+    if end_ts <= start_ts:
+        raise ValueError(f"REPLAY_END ({end}) must be after REPLAY_START ({start})")
+    if REPLAY_SOURCE not in ("postgres", "archive"):
+        raise ValueError(f"Unknown REPLAY_SOURCE '{REPLAY_SOURCE}', expected 'postgres' or 'archive'")
+    if REPLAY_SPEED <= 0:
+        raise ValueError("REPLAY_SPEED must be positive")
+    return start_ts, end_ts
+
+
+async def run_replay(start: datetime, end: datetime) -> None:
+    """Runner job replaying [start, end), then holding the lease idle so it is not restarted."""
+    await replay_ticks(start=start, end=end)
+    await asyncio.Event().wait()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay stored ticks onto the market channels.")
+    parser.add_argument("--start", type=parse_timestamp, required=True, help="ISO timestamp, UTC if naive")
+    parser.add_argument("--end", type=parse_timestamp, required=True, help="ISO timestamp, UTC if naive")
+    parser.add_argument("--speed", type=float, default=REPLAY_SPEED, help="Multiple of real time")
+    parser.add_argument("--source", choices=("postgres", "archive"), default=REPLAY_SOURCE)
+    parser.add_argument("--loop", action="store_true", default=REPLAY_LOOP)
+    args = parser.parse_args(argv)
+
+    asyncio.run(replay_ticks(args.source, args.start, args.end, args.speed, args.loop))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Standalone simulator entry point.
+
+    python -m simulation.runner
+
+Any number of runners (and API processes with EMBEDDED_SIMULATOR enabled) can
+be started; a Redis lease makes sure exactly one of them runs the tick loop.
+The others stay in hot standby and take over once the lease expires.
+"""
+import asyncio
+import contextlib
+import functools
+import logging
+import os
+import signal
+import socket
+import sys
+import uuid
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "simulator:leader"
+LEASE_TTL_MS = int(os.getenv("SIMULATOR_LEASE_TTL_MS", "10000"))
+# "live" runs the price engine, "replay" streams stored ticks (see simulation.replay)
+SIMULATOR_SOURCE = os.getenv("SIMULATOR_SOURCE", "live")
+
+# Only the current owner may extend or drop the lease
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    """Redis lease (SET NX PX) identifying the single active simulator."""
+
+    def __init__(self, redis_client, key: str = LEADER_KEY, ttl_ms: int = LEASE_TTL_MS, owner: str = None):
+        self.redis = redis_client
+        self.key = key
+        self.ttl_ms = ttl_ms
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        return bool(await self.redis.set(self.key, self.owner, nx=True, px=self.ttl_ms))
+
+    async def renew(self) -> bool:
+        return bool(await self.redis.eval(_RENEW_SCRIPT, 1, self.key, self.owner, self.ttl_ms))
+
+    async def release(self) -> None:
+        await self.redis.eval(_RELEASE_SCRIPT, 1, self.key, self.owner)
+
+
+async def run_as_leader(job_factory, lease: LeaderLease) -> None:
+    """
+    Waits in standby until `lease` is acquired, then runs `job_factory()` while
+    renewing the lease. The job is cancelled as soon as a renewal fails, so two
+    leaders never overlap for longer than one renewal interval. Never returns
+    unless cancelled.
+    """
+    renew_interval = lease.ttl_ms / 1000 / 3
+
+    while True:
+        try:
+            acquired = await lease.acquire()
+        except Exception as e:
+            logger.error(f"Error acquiring simulator lease: {e}")
+            acquired = False
+
+        if not acquired:
+            await asyncio.sleep(renew_interval)  # Hot standby
+            continue
+
+        logger.info(f"Acquired simulator lease as {lease.owner}, starting tick loop")
+        job = asyncio.create_task(job_factory())
+        try:
+            while not job.done():
+                await asyncio.wait({job}, timeout=renew_interval)
+                if job.done():
+                    break
+                try:
+                    renewed = await lease.renew()
+                except Exception as e:
+                    logger.error(f"Error renewing simulator lease: {e}")
+                    renewed = False
+                if not renewed:
+                    logger.warning("Lost simulator lease, stopping tick loop")
+                    break
+        finally:
+            job.cancel()
+            await asyncio.gather(job, return_exceptions=True)
+            with contextlib.suppress(Exception):
+                await lease.release()
+
+        if not job.cancelled() and job.exception() is not None:
+            logger.error(f"Simulator tick loop crashed: {job.exception()}")
+            await asyncio.sleep(renew_interval)
+
+
+def simulator_job():
+    """
+    The leased job: the tick loop, in-process or as the coordinator of
+    SIMULATOR_SHARDS shard processes, or a historical replay with
+    SIMULATOR_SOURCE=replay. Raises ValueError for an unusable replay
+    configuration, before any lease is taken.
+    """
+    from simulation.tasks import simulate_tick_loop
+    from simulation.sharding import SIMULATOR_SHARDS, run_sharded_simulator
+
+    if SIMULATOR_SOURCE == "replay":
+        from simulation.replay import replay_range, run_replay
+
+        try:
+            start, end = replay_range()
+        except ValueError as e:
+            logger.error(f"Not starting the simulator: {e}")
+            raise
+        return functools.partial(run_replay, start, end)
+    return run_sharded_simulator if SIMULATOR_SHARDS > 1 else simulate_tick_loop
+
+
+async def run_simulator(job_factory=None) -> None:
+    """Runs `job_factory` (by default `simulator_job()`) under the leader lease."""
+    from db.redis_client import get_redis_client
+
+    job_factory = job_factory or simulator_job()
+    lease = LeaderLease(get_redis_client())
+    logger.info(f"Simulator runner {lease.owner} started in standby")
+    await run_as_leader(job_factory, lease)
+
+
+async def _main() -> None:
+    from db.database import init_db
+
+    job_factory = simulator_job()
+    await init_db()
+
+    runner = asyncio.create_task(run_simulator(job_factory))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, runner.cancel)
+
+    # Cancelling the runner releases the lease so a standby takes over at once
+    with contextlib.suppress(asyncio.CancelledError):
+        await runner
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_main())
+    except ValueError as e:
+        sys.exit(f"Invalid simulator configuration: {e}")
@@ -0,0 +1,299 @@
+"""
+Market scenarios: scripted regimes such as a crash, a bull run or a sector
+rotation.
+
+A scenario is a list of phases. Each phase lasts `minutes` of wall-clock time
+and sets, per target, an additive annualized `drift`, a `volatility`
+multiplier and an optional one-off `jump` (a return applied when the phase
+begins). Targets are "*" (every instrument), "market:<market>",
+"sector:<sector>" or "symbol:<symbol>"; contributions of several matching
+targets add up (drift, jump) or multiply (volatility).
+
+`compile_scenario` turns a definition into (phase x instrument) arrays once,
+so applying it each tick is a row lookup and no per-symbol work.
+
+    python -m simulation.scenarios start market_crash
+    python -m simulation.scenarios stop
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Redis key holding the active scenario: {"scenario": <name or definition>, "started_at": <iso>}
+SCENARIO_KEY = "simulator:scenario"
+# How often the tick loop checks for a started or stopped scenario
+SCENARIO_POLL_SECONDS = float(os.getenv("SCENARIO_POLL_SECONDS", "10"))
+
+BUILT_IN_SCENARIOS = {
+    "bull_market": {
+        "name": "Bull Market Rally",
+        "phases": [
+            {"minutes": 90, "drift": {"*": 0.30, "sector:technology": 0.10, "sector:consumerCyclical": 0.10},
+             "volatility": {"*": 0.7}},
+        ],
+    },
+    "bear_market": {
+        "name": "Bear Market Decline",
+        "phases": [
+            {"minutes": 90, "drift": {"*": -0.25, "sector:healthcare": 0.10, "sector:consumerDefensive": 0.10},
+             "volatility": {"*": 1.5}},
+        ],
+    },
+    "market_crash": {
+        "name": "Flash Crash",
+        "phases": [
+            {"minutes": 5, "drift": {"*": -0.50}, "volatility": {"*": 3.0}, "jump": {"*": -0.05}},
+            {"minutes": 15, "drift": {"*": -0.50}, "volatility": {"*": 2.0}},
+            {"minutes": 10, "drift": {"*": 0.20}, "volatility": {"*": 1.5}, "jump": {"*": 0.02}},
+        ],
+    },
+    "sector_rotation": {
+        "name": "Sector Rotation",
+        "phases": [
+            {"minutes": 30, "drift": {"*": 0.08, "sector:financialServices": 0.30, "sector:energy": 0.30,
+                                      "sector:industrials": 0.30, "sector:technology": -0.30,
+                                      "sector:consumerCyclical": -0.30}},
+        ],
+    },
+    "black_swan": {
+        "name": "Black Swan Event",
+        "phases": [
+            {"minutes": 10, "drift": {"*": -0.40}, "volatility": {"*": 5.0}, "jump": {"*": -0.15}},
+            {"minutes": 50, "drift": {"*": 0.15}, "volatility": {"*": 2.5}},
+        ],
+    },
+    "tech_bubble": {
+        "name": "Tech Bubble",
+        "phases": [
+            {"minutes": 60, "drift": {"*": 0.05, "sector:technology": 0.75}, "volatility": {"sector:technology": 1.5}},
+            {"minutes": 30, "drift": {"*": 0.05, "sector:technology": 0.05}, "volatility": {"sector:technology": 2.0}},
+            {"minutes": 30, "drift": {"*": 0.05, "sector:technology": -0.65}, "volatility": {"sector:technology": 3.0}},
+        ],
+    },
+}
+
+
+class ScenarioSchedule(NamedTuple):
+    """A compiled scenario; row p of each array applies during phase p."""
+
+    name: str
+    ends: np.ndarray  # Seconds since the start at which each phase ends
+    drift_offsets: np.ndarray
+    volatility_scales: np.ndarray
+    jumps: np.ndarray
+
+    def phase(self, elapsed: float) -> int:
+        """Index of the phase running `elapsed` seconds in, len(ends) once finished."""
+        return int(np.searchsorted(self.ends, elapsed, side="right"))
+
+    def entered(self, since: float, elapsed: float) -> np.ndarray:
+        """Mask of the phases that began after `since` and by `elapsed` seconds in."""
+        starts = np.concatenate([[0.0], self.ends[:-1]])
+        return (starts > since) & (starts <= elapsed)
+
+
+def _target_mask(target: str, symbols: List[str], sectors: List[str], markets: List[str]) -> np.ndarray:
+    if target == "*":
+        return np.ones(len(symbols), dtype=bool)
+    kind, _, value = target.partition(":")
+    column = {"symbol": symbols, "sector": sectors, "market": markets}.get(kind)
+    if column is None or not value:
+        raise ValueError(f"Unknown scenario target '{target}'")
+    return np.array([v == value for v in column], dtype=bool)
+
+
+def compile_scenario(definition: dict, symbols: List[str], sectors: List[str], markets: List[str]) -> ScenarioSchedule:
+    """Resolves the targets of every phase of `definition` against the instruments."""
+    phases = definition.get("phases") or []
+    if not phases:
+        raise ValueError("A scenario needs at least one phase")
+
+    n = len(symbols)
+    drift_offsets = np.zeros((len(phases), n))
+    volatility_scales = np.ones((len(phases), n))
+    jumps = np.zeros((len(phases), n))
+    masks = {}
+    for p, phase in enumerate(phases):
+        for field, out in (("drift", drift_offsets), ("jump", jumps)):
+            for target, value in phase.get(field, {}).items():
+                if target not in masks:
+                    masks[target] = _target_mask(target, symbols, sectors, markets)
+                out[p, masks[target]] += value
+        for target, value in phase.get("volatility", {}).items():
+            if value <= 0:
+                raise ValueError("Scenario volatility multipliers must be positive")
+            if target not in masks:
+                masks[target] = _target_mask(target, symbols, sectors, markets)
+            volatility_scales[p, masks[target]] *= value
+
+    ends = np.cumsum([float(phase["minutes"]) * 60 for phase in phases])
+    return ScenarioSchedule(definition.get("name", "custom"), ends, drift_offsets, volatility_scales, jumps)
+
+
+def resolve_definition(scenario) -> dict:
+    """A built-in scenario by name, or a custom definition as is."""
+    if isinstance(scenario, dict):
+        return scenario
+    if scenario not in BUILT_IN_SCENARIOS:
+        raise ValueError(f"Unknown scenario '{scenario}', expected one of {sorted(BUILT_IN_SCENARIOS)}")
+    return BUILT_IN_SCENARIOS[scenario]
+
+
+class ActiveScenario:
+    """
+    The scenario applied to a set of instruments. `set` takes the spec stored
+    under SCENARIO_KEY and only recompiles when it changes; `parameters` gives
+    the per-tick drift offsets, volatility scales and phase-entry jumps.
+
+    `prices_as_of` is when the prices being simulated were published, for a
+    simulator resuming from the last quotes: phases that began before then
+    already have their jump in those prices and do not get it again.
+    """
+
+    def __init__(self, symbols: List[str], sectors: List[str], markets: List[str], prices_as_of: datetime = None):
+        self.symbols = symbols
+        self.sectors = sectors
+        self.markets = markets
+        self.prices_as_of = prices_as_of
+        self.spec = None
+        self.schedule: Optional[ScenarioSchedule] = None
+        self.started_at: Optional[datetime] = None
+        self._jumped_until = -np.inf  # Seconds into the scenario up to which jumps were applied
+
+    def set(self, spec: Optional[dict]) -> None:
+        if spec == self.spec:
+            return
+        self.spec = spec
+        self.schedule, self.started_at, self._jumped_until = None, None, -np.inf
+        if not spec:
+            return
+        try:
+            self.schedule = compile_scenario(
+                resolve_definition(spec["scenario"]), self.symbols, self.sectors, self.markets
+            )
+            self.started_at = datetime.fromisoformat(spec["started_at"])
+            if self.prices_as_of is not None:
+                self._jumped_until = (self.prices_as_of - self.started_at).total_seconds()
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Ignoring invalid scenario {spec}: {e}")
+            self.schedule = None
+
+    def parameters(self, now: datetime) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]]:
+        """(drift offsets, volatility scales, jumps) for `now`; None where nothing applies."""
+        if self.schedule is None:
+            return None, None, None
+        elapsed = (now - self.started_at).total_seconds()
+        phase = self.schedule.phase(elapsed)
+        if phase < 0 or phase >= len(self.schedule.ends):
+            return None, None, None
+        # Jumps of every phase begun since the last call, usually none or the current one
+        entered = self.schedule.entered(self._jumped_until, elapsed)
+        self._jumped_until = max(self._jumped_until, elapsed)
+        rows = self.schedule.jumps[entered]
+        rows = rows[rows.any(axis=1)]
+        jumps = None
+        if len(rows):
+            jumps = rows[0] if len(rows) == 1 else np.prod(1 + rows, axis=0) - 1
+        return self.schedule.drift_offsets[phase], self.schedule.volatility_scales[phase], jumps
+
+
+def apply_scenario_jumps(
+    engine, jumps: Optional[np.ndarray], active: np.ndarray = None, deferred: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """
+    One-off moves of a phase that just began, plus the `deferred` ones still
+    owed, for instruments that are trading. Returns the moves of the others,
+    to pass back in as `deferred` until their market opens.
+    """
+    if jumps is not None and active is not None and jumps[~active].any():
+        print(f"Deferring scenario jumps of {np.count_nonzero(jumps[~active])} closed instruments to their next open")
+    if deferred is not None:
+        jumps = deferred if jumps is None else (1 + deferred) * (1 + jumps) - 1
+    if jumps is None or not jumps.any():
+        return None
+    owed = None
+    if active is not None:
+        owed = np.where(active, 0.0, jumps)
+        jumps = np.where(active, jumps, 0.0)
+    engine.prices *= 1 + jumps
+    np.maximum(engine.prices, 0.01, out=engine.prices)
+    return owed if owed is not None and owed.any() else None
+
+
+class ScenarioPoller:
+    """Reads SCENARIO_KEY at most every `interval` seconds; the tick loop calls `poll` every tick."""
+
+    def __init__(self, interval: float = SCENARIO_POLL_SECONDS, clock=time.monotonic):
+        self.interval = interval
+        self._clock = clock
+        self._last_poll = None
+        self.spec = None
+
+    async def poll(self, r) -> Optional[dict]:
+        now = self._clock()
+        if self._last_poll is None or now - self._last_poll >= self.interval:
+            self._last_poll = now
+            try:
+                raw = await r.get(SCENARIO_KEY)
+                self.spec = json.loads(raw) if raw else None
+            except Exception as e:
+                print(f"Error reading active scenario: {e}")
+        return self.spec
+
+
+async def start_scenario(r, scenario, started_at: datetime = None) -> dict:
+    """Activates a built-in scenario by name or a custom definition."""
+    resolve_definition(scenario)  # Validate before publishing
+    spec = {
+        "scenario": scenario,
+        "started_at": (started_at or datetime.now(timezone.utc)).isoformat(),
+    }
+    await r.set(SCENARIO_KEY, json.dumps(spec))
+    return spec
+
+
+async def stop_scenario(r) -> None:
+    await r.delete(SCENARIO_KEY)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Start or stop a market scenario.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    start = commands.add_parser("start")
+    start.add_argument("scenario", help=f"One of {sorted(BUILT_IN_SCENARIOS)} or a JSON definition file")
+    commands.add_parser("stop")
+    commands.add_parser("list")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for key, definition in BUILT_IN_SCENARIOS.items():
+            minutes = sum(phase["minutes"] for phase in definition["phases"])
+            print(f"{key}: {definition['name']} ({minutes} minutes)")
+        return
+
+    from db.redis_client import get_redis_client
+
+    async def run():
+        r = get_redis_client()
+        if args.command == "stop":
+            await stop_scenario(r)
+            print("Scenario stopped")
+            return
+        scenario = args.scenario
+        if scenario not in BUILT_IN_SCENARIOS and os.path.exists(scenario):
+            with open(scenario) as f:
+                scenario = json.load(f)
+        spec = await start_scenario(r, scenario)
+        print(f"Started scenario {args.scenario} at {spec['started_at']}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TickScheduler:
+    """
+    Fixed-rate tick scheduler against the monotonic clock.
+
+    Deadlines are `start + n * period`, so time spent doing the tick's work is
+    absorbed instead of accumulating as drift. A tick that finishes after its
+    deadline is reported as an overrun; deadlines that were missed entirely are
+    skipped rather than run back to back.
+    """
+
+    def __init__(self, period: float, clock=time.monotonic, sleep=asyncio.sleep):
+        self.period = period
+        self._clock = clock
+        self._sleep = sleep
+        self._next_deadline = clock() + period
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.max_lateness = 0.0
+
+    async def wait_next(self) -> float:
+        """
+        Sleeps until the next tick deadline. Returns how late the current tick
+        finished (0.0 when it was on time).
+        """
+        self.ticks += 1
+        now = self._clock()
+        lateness = now - self._next_deadline
+
+        if lateness <= 0:
+            await self._sleep(-lateness)
+            self._next_deadline += self.period
+            return 0.0
+
+        missed = int(lateness // self.period)
+        self.overruns += 1
+        self.skipped_ticks += missed
+        self.max_lateness = max(self.max_lateness, lateness)
+        logger.warning(
+            f"Tick overran its {self.period:.3f}s period by {lateness * 1000:.0f}ms"
+            f" (skipping {missed} ticks, {self.overruns} overruns in {self.ticks} ticks)"
+        )
+        self._next_deadline += (missed + 1) * self.period
+        await self._sleep(0)
+        return lateness
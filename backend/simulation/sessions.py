@@ -0,0 +1,81 @@
+from datetime import date
+from typing import Dict
+
+import numpy as np
+
+
+class SessionState:
+    """
+    Intraday state of every instrument for its current trading session: open,
+    running high/low, cumulative volume and VWAP, plus the previous session's
+    close. Updated with array operations per tick and rolled over per
+    instrument when its session key (see `MarketCalendar.session_keys`)
+    changes.
+    """
+
+    def __init__(self, initial_prices):
+        last = np.array(initial_prices, dtype=np.float64)
+        n = len(last)
+        self.session = np.full(n, -1, dtype=np.int64)  # No session seen yet
+        self.last = last
+        self.previous_close = last.copy()
+        self.open = last.copy()
+        self.high = last.copy()
+        self.low = last.copy()
+        self.volume = np.zeros(n)
+        self.turnover = np.zeros(n)  # sum(price * volume) for the VWAP
+
+    def __len__(self) -> int:
+        return len(self.last)
+
+    def update(self, indices: np.ndarray, prices: np.ndarray, volumes: np.ndarray, session_keys: np.ndarray) -> None:
+        """Apply one tick for the instruments at `indices`."""
+        rolled = self.session[indices] != session_keys
+        if rolled.any():
+            idx = indices[rolled]
+            # Instruments without a previous session keep their initial price as close
+            seen = self.session[idx] >= 0
+            self.previous_close[idx] = np.where(seen, self.last[idx], self.previous_close[idx])
+            self.session[idx] = session_keys[rolled]
+            self.open[idx] = prices[rolled]
+            self.high[idx] = prices[rolled]
+            self.low[idx] = prices[rolled]
+            self.volume[idx] = 0.0
+            self.turnover[idx] = 0.0
+
+        self.high[indices] = np.maximum(self.high[indices], prices)
+        self.low[indices] = np.minimum(self.low[indices], prices)
+        self.volume[indices] += volumes
+        self.turnover[indices] += prices * volumes
+        self.last[indices] = prices
+
+    def vwap(self, indices: np.ndarray) -> np.ndarray:
+        """Session VWAP, or the last price before any volume has traded."""
+        volume = self.volume[indices]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(volume > 0, self.turnover[indices] / volume, self.last[indices])
+
+    def restore(self, quotes: Dict[int, dict]) -> None:
+        """
+        Resume sessions from previously published quote snapshots, keyed by
+        instrument index, so a restarted simulator keeps today's open, range
+        and volume.
+        """
+        for i, quote in quotes.items():
+            try:
+                session = date.fromisoformat(quote["sessionDate"]).toordinal()
+                values = [
+                    float(quote[field])
+                    for field in ("previousClose", "open", "high", "low", "volume", "vwap", "price")
+                ]
+            except (KeyError, TypeError, ValueError):
+                continue  # Snapshot from before session tracking
+            previous_close, open_, high, low, volume, vwap, price = values
+            self.session[i] = session
+            self.previous_close[i] = previous_close
+            self.open[i] = open_
+            self.high[i] = high
+            self.low[i] = low
+            self.volume[i] = volume
+            self.turnover[i] = vwap * volume
+            self.last[i] = price
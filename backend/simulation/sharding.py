@@ -0,0 +1,344 @@
+"""
+Sharded simulator: the instrument universe is split across worker processes.
+
+The coordinator runs under the simulator lease like the single-process loop.
+Once per tick it draws the common correlation factors and the due news events
+and sends both, with the tick timestamp and the active scenario, to every
+shard, so all shards co-move and react to the same news. Each shard owns the
+price engine for its slice of instruments and publishes and stores only that
+slice.
+"""
+import asyncio
+import multiprocessing
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import List
+
+import numpy as np
+
+from simulation.news_engine import NewsEngine, MarketContext, build_sector_index
+
+SIMULATOR_SHARDS = int(os.getenv("SIMULATOR_SHARDS", "1"))
+# "market" keeps each market in one shard, "hash" spreads symbols evenly
+SIMULATOR_SHARD_BY = os.getenv("SIMULATOR_SHARD_BY", "market")
+# Seconds a shard gets to exit on shutdown before it is terminated
+SHARD_STOP_TIMEOUT_SECONDS = 5
+
+
+def build_shard_map(instruments: List[dict], n_shards: int, by: str = "market") -> List[List[dict]]:
+    """
+    Split instruments (dicts with at least "symbol" and "market") into at most
+    `n_shards` non-empty shards.
+    """
+    if n_shards < 1:
+        raise ValueError("n_shards must be at least 1")
+
+    shards = [[] for _ in range(n_shards)]
+    if by == "hash":
+        for inst in instruments:
+            # crc32 rather than hash() so the map is stable across processes
+            shards[zlib.crc32(inst["symbol"].encode("utf-8")) % n_shards].append(inst)
+    elif by == "market":
+        by_market = {}
+        for inst in instruments:
+            by_market.setdefault(inst["market"], []).append(inst)
+        # Largest markets first, each into the currently smallest shard
+        for market_instruments in sorted(by_market.values(), key=len, reverse=True):
+            min(shards, key=len).extend(market_instruments)
+    else:
+        raise ValueError(f"Unknown shard strategy '{by}', expected 'market' or 'hash'")
+
+    return [shard for shard in shards if shard]
+
+
+def shard_main(shard_id: int, instruments: List[dict], indices: List[int], symbols: List[str], factor_model, conn) -> None:
+    """Process entry point of one shard."""
+    asyncio.run(_run_shard(shard_id, instruments, indices, symbols, factor_model, conn))
+
+
+async def _run_shard(shard_id, instruments, indices, symbols, factor_model, conn) -> None:
+    from simulation.price_engine import VectorizedPriceEngine, ShockBuffer
+    from simulation.market_hours import MarketCalendar
+    from simulation.candles import CandleAggregator, CandleWriter, load_open_candles, publish_ended_candles
+    from simulation.persistence import TickWriter
+    from simulation.wire_format import SymbolTable
+    from simulation.scenarios import ActiveScenario, apply_scenario_jumps
+    from simulation.news_impact import NewsImpactModel, combine_overlays
+    from simulation.tasks import (
+        PRICE_MODEL,
+        SHOCK_BUFFER_STEPS,
+        ENFORCE_MARKET_HOURS,
+        WRITER_STATS_INTERVAL_SECONDS,
+        load_last_quotes,
+        quotes_as_of,
+        build_snapshots,
+        apply_news_shock,
+        publish_ticks,
+        log_writer_stats,
+    )
+    from db.redis_client import get_redis_client
+
+    r = get_redis_client()
+    shard_symbols = [inst["symbol"] for inst in instruments]
+    last_quotes = await load_last_quotes(r, shard_symbols)
+
+    engine = VectorizedPriceEngine(
+        symbols=shard_symbols,
+        initial_prices=[last_quotes.get(inst["symbol"], inst)["price"] for inst in instruments],
+        drifts=[inst["drift"] for inst in instruments],
+        volatilities=[inst["volatility"] for inst in instruments],
+        model=PRICE_MODEL,
+    )
+    # Only the idiosyncratic part is drawn locally; common factors come from the coordinator
+    idiosyncratic = ShockBuffer(n_assets=len(engine), block_steps=SHOCK_BUFFER_STEPS)
+    snapshots = build_snapshots(instruments, last_quotes, engine)
+    local_ids = np.arange(len(engine))
+    symbol_table = SymbolTable(symbols)
+    symbol_ids = np.array(indices)
+    calendar = MarketCalendar([inst["market"] for inst in instruments])
+    scenario = ActiveScenario(
+        shard_symbols,
+        [inst["sector"] for inst in instruments],
+        [inst["market"] for inst in instruments],
+        quotes_as_of(last_quotes),
+    )
+    deferred_jumps = None  # Scenario jumps owed to markets that were closed
+    news_impact = NewsImpactModel(shard_symbols)
+    candles = CandleAggregator(shard_symbols)
+    candles.restore(await load_open_candles(r, shard_symbols))
+
+    # Publish every instrument once so markets that are closed still have a quote
+    try:
+        now = datetime.now(timezone.utc)
+        await publish_ticks(
+            r,
+            snapshots,
+            local_ids,
+            engine.prices.copy(),
+            calendar.session_keys(now),
+            symbol_table,
+            symbol_ids,
+            now,
+            volumes=np.zeros(len(engine)),
+        )
+    except Exception as e:
+        print(f"Error publishing initial quotes in shard {shard_id}: {e}")
+
+    print(f"Simulator shard {shard_id} started with {len(engine)} instruments")
+    loop = asyncio.get_running_loop()
+    tick_writer = TickWriter()
+    tick_writer.start()
+    candle_writer = CandleWriter()
+    candle_writer.start()
+    last_writer_stats = loop.time()
+    try:
+        while True:
+            try:
+                message = await loop.run_in_executor(None, conn.recv)
+            except EOFError:
+                break  # Coordinator went away
+            if message is None:
+                break
+
+            now, factors, news_events, scenario_spec = message
+            try:
+                for news_event in news_events:
+                    apply_news_shock(engine, news_impact, news_event, now)
+
+                await idiosyncratic.ready()
+                shocks = factor_model.shocks(factors, idiosyncratic.next(), symbol_ids)
+                open_mask = calendar.open_mask(now) if ENFORCE_MARKET_HOURS else None
+                open_idx = local_ids if open_mask is None else np.flatnonzero(open_mask)
+
+                scenario.set(scenario_spec)
+                scenario_drifts, scenario_scales, jumps = scenario.parameters(now)
+                deferred_jumps = apply_scenario_jumps(engine, jumps, open_mask, deferred_jumps)
+                drift_offsets, volatility_scales = combine_overlays(
+                    (scenario_drifts, scenario_scales), news_impact.parameters(now)
+                )
+
+                # Buckets end on time, also while every market is closed
+                candle_writer.submit(await publish_ended_candles(r, candles, now))
+
+                if len(open_idx):
+                    new_prices = engine.step(
+                        shocks,
+                        active=open_mask,
+                        drift_offsets=drift_offsets,
+                        volatility_scales=volatility_scales,
+                    )
+                    current_ticks, closed_candles = await publish_ticks(
+                        r,
+                        snapshots,
+                        open_idx,
+                        new_prices[open_idx],
+                        calendar.session_keys(now)[open_idx],
+                        symbol_table,
+                        symbol_ids[open_idx],
+                        now,
+                        candles=candles,
+                    )
+                    tick_writer.submit(current_ticks)
+                    candle_writer.submit(closed_candles)
+
+                if loop.time() - last_writer_stats > WRITER_STATS_INTERVAL_SECONDS:
+                    last_writer_stats = loop.time()
+                    log_writer_stats(f"Simulator shard {shard_id}", tick_writer, candle_writer)
+            except Exception as loop_err:
+                print(f"Error in simulator shard {shard_id} iteration: {loop_err}")
+    finally:
+        await tick_writer.close()
+        await candle_writer.close()
+        idiosyncratic.close()
+
+
+class _Shard:
+    """
+    A shard process and its pipe. Pipe writes and process joins block, so they
+    run in the default executor and never hold up the coordinator's event
+    loop (and with it the lease renewal).
+    """
+
+    def __init__(self, shard_id: int, instruments: List[dict], indices: List[int]):
+        self.shard_id = shard_id
+        self.instruments = instruments
+        self.indices = indices
+        self.process = None
+        self.conn = None
+        self.sending = None  # Future of the tick message being written
+        self.dropped = 0
+        self.undelivered_news = []  # News of dropped messages, sent with the next one
+
+    def start(self, ctx, symbols: List[str], factor_model) -> None:
+        self.sending = None
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=shard_main,
+            args=(self.shard_id, self.instruments, self.indices, symbols, factor_model, child_conn),
+            name=f"simulator-shard-{self.shard_id}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def send(self, now, factors, news_events, scenario_spec) -> bool:
+        """
+        Writes a tick message to the shard off the loop. While the previous
+        message is still being written the shard is backed up and this tick is
+        dropped: its timestamp and factors are superseded by the next one, but
+        its news events are held and delivered with the next message, so every
+        shard still reacts to all news.
+        """
+        if self.sending is not None and not self.sending.done():
+            if not self.dropped:
+                print(f"Simulator shard {self.shard_id} is falling behind, dropping ticks")
+            self.dropped += 1
+            self.undelivered_news.extend(news_events)
+            return False
+        if self.dropped:
+            print(f"Simulator shard {self.shard_id} caught up after {self.dropped} dropped ticks")
+            self.dropped = 0
+        message = (now, factors, self.undelivered_news + list(news_events), scenario_spec)
+        self.undelivered_news = []
+        self.sending = asyncio.get_running_loop().run_in_executor(None, self.conn.send, message)
+        self.sending.add_done_callback(self._sent)
+        return True
+
+    def _sent(self, future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error sending tick to simulator shard {self.shard_id}: {future.exception()}")
+
+    def _stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.process.join(timeout=SHARD_STOP_TIMEOUT_SECONDS)
+
+    async def stop(self) -> None:
+        """Asks the shard to exit, terminating it if it does not within the timeout."""
+        loop = asyncio.get_running_loop()
+        try:
+            # The stop message may be stuck behind a full pipe, hence the outer timeout
+            await asyncio.wait_for(loop.run_in_executor(None, self._stop), SHARD_STOP_TIMEOUT_SECONDS + 1)
+        except asyncio.TimeoutError:
+            pass
+        if self.process.is_alive():
+            self.process.terminate()  # Also breaks the pipe under any write still pending
+            await loop.run_in_executor(None, self.process.join, SHARD_STOP_TIMEOUT_SECONDS)
+
+
+async def run_sharded_simulator(n_shards: int = SIMULATOR_SHARDS, by: str = SIMULATOR_SHARD_BY) -> None:
+    """
+    Coordinator loop of the sharded simulator. Meant to run continuously in
+    place of `simulate_tick_loop`.
+    """
+    from simulation.price_engine import FactorShockModel
+    from simulation.scheduler import TickScheduler
+    from simulation.scenarios import ScenarioPoller
+    from simulation.tasks import (
+        MOCK_INSTRUMENTS,
+        TICK_INTERVAL_SECONDS,
+        load_instrument_metadata,
+        publish_symbol_table,
+        publish_news_event,
+        run_maintenance,
+    )
+    from db.redis_client import get_redis_client
+
+    r = get_redis_client()
+    metadata = await load_instrument_metadata()
+    universe = []
+    for inst in MOCK_INSTRUMENTS:
+        sector, market = metadata.get(inst["symbol"], ("unknown", "unknown"))
+        universe.append(dict(inst, sector=sector, market=market))
+
+    symbols = [inst["symbol"] for inst in universe]
+    position = {symbol: i for i, symbol in enumerate(symbols)}
+    await publish_symbol_table(r, symbols)
+    factor_model = FactorShockModel(
+        [inst["sector"] for inst in universe], [inst["market"] for inst in universe]
+    )
+
+    ctx = multiprocessing.get_context("spawn")
+    shards = [
+        _Shard(shard_id, shard_instruments, [position[inst["symbol"]] for inst in shard_instruments])
+        for shard_id, shard_instruments in enumerate(build_shard_map(universe, n_shards, by))
+    ]
+    for shard in shards:
+        shard.start(ctx, symbols, factor_model)
+    print(f"Started {len(shards)} simulator shards by {by}")
+
+    rng = np.random.default_rng()
+    news_engine = NewsEngine(sector_index=build_sector_index(metadata, symbols))
+    context = MarketContext(sentiment="neutral")
+    scenario_poller = ScenarioPoller()
+    scheduler = TickScheduler(TICK_INTERVAL_SECONDS)
+    # Partition rotation and archiving run beside the tick loop, never inside it
+    maintenance = asyncio.create_task(run_maintenance())
+
+    try:
+        while True:
+            try:
+                now = datetime.now(timezone.utc)
+                news_events = news_engine.generate_news_events(context, now, symbols)
+                for news_event in news_events:
+                    await publish_news_event(r, news_event)
+
+                # Every shard steps with the same factors, news, scenario and timestamp
+                factors = factor_model.draw_factors(rng)
+                scenario_spec = await scenario_poller.poll(r)
+                for shard in shards:
+                    if not shard.process.is_alive():
+                        print(f"Simulator shard {shard.shard_id} died, restarting it")
+                        shard.start(ctx, symbols, factor_model)
+                    shard.send(now, factors, news_events, scenario_spec)
+            except Exception as loop_err:
+                print(f"Error in simulator coordinator iteration: {loop_err}")
+
+            await scheduler.wait_next()
+    finally:
+        maintenance.cancel()
+        await asyncio.gather(maintenance, return_exceptions=True)
+        await asyncio.gather(*(shard.stop() for shard in shards), return_exceptions=True)
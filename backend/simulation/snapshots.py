@@ -0,0 +1,136 @@
+from datetime import date
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from simulation.sessions import SessionState
+
+
+class QuoteSnapshotBuilder:
+    """
+    Builds the tick and `market:quote:{symbol}` payloads for a set of instruments.
+
+    Valuation fundamentals only depend on the symbol and its base price, so they
+    are computed once here. Per tick, the price-dependent fields of every
+    instrument are derived with array operations and only the final dicts are
+    built per symbol. Open, high, low, previous close, volume and VWAP come
+    from the intraday `sessions` state, which the caller updates before
+    building.
+    """
+
+    def __init__(self, instruments: List[dict], sessions: Optional[SessionState] = None):
+        self.symbols = [inst["symbol"] for inst in instruments]
+        self.base_prices = np.array([inst["price"] for inst in instruments], dtype=np.float64)
+        self.sessions = sessions if sessions is not None else SessionState(self.base_prices)
+
+        # Dynamic valuation stats are seeded deterministically by symbol name
+        seeds = np.array([sum(ord(c) for c in symbol) for symbol in self.symbols], dtype=np.int64)
+
+        # EPS for P/E and book value for P/B
+        self.eps = self.base_prices / (15.0 + seeds % 20)
+        self.book_value = self.base_prices / (1.5 + seeds % 5)
+        # ROE between 8% and 25%
+        self.roe = 8.0 + seeds % 18
+        # Dividend payout ratio between 0% and 40% of EPS
+        self.annual_dividend = self.eps * ((seeds % 5) * 0.1)
+        self.outstanding_shares = (10 + seeds % 90) * 1_000_000.0
+        # 52-week range around the base price
+        self.fifty_two_week_high = self.base_prices * 1.3
+        self.fifty_two_week_low = self.base_prices * 0.75
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def tick_columns(self, indices: np.ndarray, prices: np.ndarray, volumes: np.ndarray) -> dict:
+        """Tick fields for the instruments at `indices` as arrays."""
+        previous_close = self.sessions.previous_close[indices]
+        change = prices - previous_close
+        return {
+            "price": prices,
+            "bid": prices * 0.9995,
+            "ask": prices * 1.0005,
+            "volume": volumes,
+            "change": change,
+            "changePercent": change / previous_close * 100,
+        }
+
+    def build(self, indices: np.ndarray, columns: dict, timestamp: str) -> Tuple[List[dict], List[dict]]:
+        """Returns the tick dicts and quote snapshot dicts for `indices`."""
+        prices = columns["price"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            eps = self.eps[indices]
+            book_value = self.book_value[indices]
+            pe_ratio = np.where(eps > 0, prices / eps, 0.0)
+            pb_ratio = np.where(book_value > 0, prices / book_value, 0.0)
+            div_yield = np.where(prices > 0, self.annual_dividend[indices] / prices * 100.0, 0.0)
+
+        sessions = self.sessions
+        symbols = [self.symbols[i] for i in indices.tolist()]
+        price = prices.tolist()
+        bid = columns["bid"].tolist()
+        ask = columns["ask"].tolist()
+        volume = columns["volume"].tolist()
+        change = columns["change"].tolist()
+        change_percent = columns["changePercent"].tolist()
+
+        ticks = [
+            {
+                "symbol": symbols[i],
+                "timestamp": timestamp,
+                "price": price[i],
+                "bid": bid[i],
+                "ask": ask[i],
+                "volume": volume[i],
+                "change": change[i],
+                "changePercent": change_percent[i],
+            }
+            for i in range(len(symbols))
+        ]
+
+        session_open = sessions.open[indices].tolist()
+        high = sessions.high[indices].tolist()
+        low = sessions.low[indices].tolist()
+        previous_close = sessions.previous_close[indices].tolist()
+        session_volume = sessions.volume[indices]
+        vwap = sessions.vwap(indices).tolist()
+        session_keys = sessions.session[indices].tolist()
+        # Only a handful of distinct session dates per tick
+        iso_dates = {key: date.fromordinal(key).isoformat() for key in set(session_keys) if key > 0}
+        session_date = [iso_dates.get(key) for key in session_keys]
+        fifty_two_week_high = np.maximum(sessions.high[indices], self.fifty_two_week_high[indices]).tolist()
+        fifty_two_week_low = np.minimum(sessions.low[indices], self.fifty_two_week_low[indices]).tolist()
+        market_cap = (prices * self.outstanding_shares[indices]).tolist()
+        avg_volume = (session_volume * 1.15).tolist()
+        session_volume = session_volume.tolist()
+        pe_ratio = pe_ratio.tolist()
+        pb_ratio = pb_ratio.tolist()
+        roe = self.roe[indices].astype(np.float64).tolist()
+        div_yield = div_yield.tolist()
+
+        quotes = [
+            {
+                "symbol": symbols[i],
+                "name": symbols[i],
+                "price": price[i],
+                "open": session_open[i],
+                "high": high[i],
+                "low": low[i],
+                "previousClose": previous_close[i],
+                "change": change[i],
+                "changePercent": change_percent[i],
+                "volume": session_volume[i],
+                "vwap": vwap[i],
+                "sessionDate": session_date[i],
+                "timestamp": timestamp,
+                "fiftyTwoWeekHigh": fifty_two_week_high[i],
+                "fiftyTwoWeekLow": fifty_two_week_low[i],
+                "marketCap": market_cap[i],
+                "avgVolume": avg_volume[i],
+                "peRatio": pe_ratio[i],
+                "pbRatio": pb_ratio[i],
+                "roe": roe[i],
+                "divYield": div_yield[i],
+            }
+            for i in range(len(symbols))
+        ]
+        return ticks, quotes
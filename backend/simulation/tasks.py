@@ -3,15 +3,44 @@ from celery import Celery
 import asyncio
 import json
 import time
-import random
 from datetime import datetime, timezone
+import numpy as np
 import redis
-from simulation.news_engine import NewsEngine, MarketContext
+from simulation.news_engine import NewsEngine, MarketContext, build_sector_index
 
 
 # Use the redis container hostname from docker-compose
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+# Universe-level price model: "gbm", "jump_diffusion" or "garch"
+PRICE_MODEL = os.getenv("PRICE_MODEL", "gbm")
+
+# Ticks worth of random shocks pre-generated per ring buffer block
+SHOCK_BUFFER_STEPS = int(os.getenv("SHOCK_BUFFER_STEPS", "10000"))
+
+# Publish one batched message per tick on market:ticks:global instead of one per symbol
+GLOBAL_TICK_BATCH = os.getenv("GLOBAL_TICK_BATCH", "false").lower() == "true"
+
+# Encoding of ticks on the market:ticks:* channels: "json" or "binary" (see wire_format)
+TICK_WIRE_FORMAT = os.getenv("TICK_WIRE_FORMAT", "json")
+
+# How often tick partitions are rotated (and expired ones archived) and old rows pruned
+MAINTENANCE_INTERVAL_SECONDS = float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+# Wait before retrying maintenance that failed
+MAINTENANCE_RETRY_SECONDS = 60
+
+# How often the tick loop re-reads instrument sectors and markets
+INSTRUMENT_REFRESH_SECONDS = float(os.getenv("INSTRUMENT_REFRESH_SECONDS", "3600"))
+
+# How often the simulator logs the counters of its tick and candle writers
+WRITER_STATS_INTERVAL_SECONDS = float(os.getenv("WRITER_STATS_INTERVAL_SECONDS", "300"))
+
+# Target tick period, kept fixed against the monotonic clock
+TICK_INTERVAL_SECONDS = float(os.getenv("TICK_INTERVAL_SECONDS", "3"))
+
+# Only simulate instruments whose market is in its trading session
+ENFORCE_MARKET_HOURS = os.getenv("ENFORCE_MARKET_HOURS", "true").lower() == "true"
+
 celery_app = Celery("market_worker", broker=REDIS_URL, backend=REDIS_URL)
 
 celery_app.conf.update(
@@ -72,206 +101,421 @@ MOCK_INSTRUMENTS = [
 ]
 
 
+async def load_instrument_metadata() -> dict:
+    """
+    Returns {symbol: (sector, market)} from the instruments table, falling back
+    to the seeded defaults if the database is not reachable yet.
+    """
+    from db.database import AsyncSessionLocal, DEFAULT_INSTRUMENTS
+    from db.models import DbInstrument
+    from sqlalchemy import select
+
+    try:
+        async with AsyncSessionLocal() as session:
+            res = await session.execute(
+                select(DbInstrument.symbol, DbInstrument.sector, DbInstrument.market)
+            )
+            rows = res.all()
+            if rows:
+                return {symbol: (sector, market) for symbol, sector, market in rows}
+    except Exception as e:
+        print(f"Error loading instrument metadata: {e}")
+
+    return {inst["symbol"]: (inst["sector"], inst["market"]) for inst in DEFAULT_INSTRUMENTS}
+
+
+async def refresh_correlation(engine, correlation, shock_buffer, metadata: dict) -> bool:
+    """
+    Applies {symbol: (sector, market)} metadata; the Cholesky factor is only
+    rebuilt if it changed, on the shock buffer's worker, and then the buffered
+    shocks are discarded. Returns True if it was rebuilt.
+    """
+    sectors, markets = [], []
+    for symbol in engine.symbols:
+        sector, market = metadata.get(symbol, ("unknown", "unknown"))
+        sectors.append(sector)
+        markets.append(market)
+    if await shock_buffer.call(correlation.update, engine.symbols, sectors, markets):
+        shock_buffer.reset()
+        print(f"Rebuilt correlation factor for {len(engine.symbols)} instruments")
+        return True
+    return False
+
+
+async def load_last_quotes(r, symbols: list) -> dict:
+    """
+    Latest published market:quote:* snapshot per symbol, so a simulator taking
+    over the leader lease continues where the last one stopped.
+    """
+    try:
+        raw_quotes = await r.mget(*[f"market:quote:{symbol}" for symbol in symbols])
+    except Exception as e:
+        print(f"Error loading last quotes: {e}")
+        return {}
+    return {
+        symbol: json.loads(raw)
+        for symbol, raw in zip(symbols, raw_quotes)
+        if raw
+    }
+
+
+def quotes_as_of(last_quotes: dict):
+    """Publication time of the newest of `last_quotes`, None if there are none."""
+    timestamps = [datetime.fromisoformat(quote["timestamp"]) for quote in last_quotes.values() if quote.get("timestamp")]
+    return max(timestamps, default=None)
+
+
+def build_snapshots(instruments: list, last_quotes: dict, engine):
+    """
+    Quote snapshot builder for `instruments` whose session state resumes from
+    `last_quotes` and otherwise starts from the engine's initial prices.
+    """
+    from simulation.sessions import SessionState
+    from simulation.snapshots import QuoteSnapshotBuilder
+
+    sessions = SessionState(engine.prices)
+    sessions.restore(
+        {
+            i: last_quotes[inst["symbol"]]
+            for i, inst in enumerate(instruments)
+            if inst["symbol"] in last_quotes
+        }
+    )
+    return QuoteSnapshotBuilder(instruments, sessions)
+
+
+async def publish_news_event(r, news_event: dict) -> None:
+    """Publishes a generated headline to clients and stores it in PostgreSQL."""
+    from db.database import AsyncSessionLocal
+    from db.models import DbNewsEvent
+
+    # Publish headline to clients
+    await r.publish("market:news:global", json.dumps(news_event))
+
+    # Save news event to PostgreSQL database
+    try:
+        async with AsyncSessionLocal() as session:
+            db_event = DbNewsEvent(
+                headline=news_event["headline"],
+                category=news_event["category"],
+                subcategory=news_event["subcategory"],
+                timestamp=datetime.now(timezone.utc),
+                impact=news_event["impact"],
+                duration_minutes=news_event["duration_minutes"],
+                affected_scope=news_event["affected_scope"],
+                affected_symbols=news_event["affected_symbols"],
+            )
+            session.add(db_event)
+            await session.commit()
+    except Exception as e:
+        print(f"Error saving news event to DB: {e}")
+
+
+def apply_news_shock(engine, news_impact, news_event: dict, now: datetime) -> None:
+    """
+    Applies a news event to the instruments of `engine` it affects: symbol news
+    moves the price at once, and every event adds a decaying drift/volatility
+    shock to `news_impact`.
+    """
+    if news_event["affected_scope"] == "symbol" and news_event["affected_symbols"]:
+        indices = [
+            engine.index[sym]
+            for sym in news_event["affected_symbols"]
+            if sym in engine.index
+        ]
+        engine.prices[indices] *= 1 + news_event["impact"]  # Immediate jump
+    news_impact.add_event(news_event, now)
+
+
+async def publish_ticks(
+    r,
+    snapshots,
+    indices: np.ndarray,
+    new_prices: np.ndarray,
+    session_keys: np.ndarray,
+    symbol_table,
+    symbol_ids: np.ndarray,
+    now: datetime,
+    volumes: np.ndarray = None,
+    candles=None,
+) -> tuple:
+    """
+    Builds ticks and quote snapshots for the instruments at `indices` of the
+    `snapshots` builder and publishes them to Redis in one pipelined round
+    trip. `session_keys` are their current trading sessions and `symbol_ids`
+    their ids in the shared `symbol_table`. With a `candles` aggregator the
+    ticks are also folded into the open candles.
+
+    Returns the tick dicts and the candles that closed with this tick.
+    """
+    from simulation import wire_format
+    from simulation.candles import queue_candle_writes
+
+    if volumes is None:
+        volumes = np.random.uniform(10, 1000, len(indices))
+    snapshots.sessions.update(indices, new_prices, volumes, session_keys)
+    columns = snapshots.tick_columns(indices, new_prices, volumes)
+    current_ticks, quotes = snapshots.build(indices, columns, now.isoformat())
+
+    # All publishes and quote writes of this tick go out in one round trip
+    pipe = r.pipeline(transaction=False)
+    for tick, snapshot in zip(current_ticks, quotes):
+        symbol = tick["symbol"]
+
+        # Publish to redis for the WebSocket server
+        if TICK_WIRE_FORMAT == "json":
+            tick_json = json.dumps(tick)
+            pipe.publish(f"market:ticks:{symbol}", tick_json)
+            if not GLOBAL_TICK_BATCH:
+                pipe.publish("market:ticks:global", tick_json)  # Global feed
+
+        # Save latest state for REST API
+        pipe.set(f"market:quote:{symbol}", json.dumps(snapshot))
+
+    if TICK_WIRE_FORMAT == "binary":
+        records = wire_format.pack_tick_records(
+            symbol_table,
+            symbol_ids,
+            wire_format.to_epoch_ms(now),
+            columns["price"],
+            columns["bid"],
+            columns["ask"],
+            columns["volume"],
+            columns["change"],
+            columns["changePercent"],
+        )
+        messages = wire_format.encode_single_records(symbol_table, records)
+        for tick, message in zip(current_ticks, messages):
+            pipe.publish(f"market:ticks:{tick['symbol']}", message)
+        if GLOBAL_TICK_BATCH:
+            pipe.publish(
+                "market:ticks:global", wire_format.encode_records(symbol_table, records)
+            )
+        else:
+            for message in messages:
+                pipe.publish("market:ticks:global", message)
+    elif GLOBAL_TICK_BATCH:
+        pipe.publish(
+            "market:ticks:global",
+            json.dumps({"type": "ticks", "ticks": current_ticks}),
+        )
+
+    closed_candles = []
+    if candles is not None:
+        closed_candles = candles.update(indices, new_prices, volumes, now)
+        queue_candle_writes(pipe, candles, indices, closed_candles)
+
+    await pipe.execute()
+    return current_ticks, closed_candles
+
+
+async def prune_old_rows() -> bool:
+    """
+    Rotates the price_ticks partitions (pre-creating upcoming ones and
+    dropping expired ones) and prunes old notifications. Returns True on success.
+    """
+    from db.database import AsyncSessionLocal
+    from db.partitions import maintain_tick_partitions
+    from sqlalchemy import text
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await maintain_tick_partitions(session)
+            await session.execute(
+                text("DELETE FROM notifications WHERE timestamp < NOW() - INTERVAL '30 days'")
+            )
+            await session.commit()
+        return True
+    except Exception as prune_err:
+        print(f"Error pruning old rows: {prune_err}")
+        return False
+
+
+async def run_maintenance(interval: float = MAINTENANCE_INTERVAL_SECONDS) -> None:
+    """
+    Runs `prune_old_rows` every `interval` seconds as a task of its own next to
+    the tick loop, so archiving an expired partition never delays a tick.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        while not await prune_old_rows():
+            await asyncio.sleep(MAINTENANCE_RETRY_SECONDS)
+
+
+def log_writer_stats(label: str, tick_writer, candle_writer) -> None:
+    """One line with the write-behind counters, dropped rows included."""
+    print(f"{label} writers: ticks {tick_writer.stats()}, candles {candle_writer.stats()}")
+
+
+async def publish_symbol_table(r, symbols: list):
+    """
+    Publishes the symbol table consumers need to decode binary ticks or to
+    serve binary clients, and returns it.
+    """
+    from simulation import wire_format
+
+    symbol_table = wire_format.SymbolTable(symbols)
+    try:
+        await wire_format.publish_symbol_table(r, symbol_table)
+    except Exception as e:
+        print(f"Error publishing symbol table: {e}")
+    return symbol_table
+
+
 async def simulate_tick_loop():
     """
     Background job meant to run continuously, generating new price ticks
     for all active instruments and publishing them to Redis Pub/Sub channels.
     """
-    from simulation.price_engine import GBMPriceModel
+    from simulation.price_engine import VectorizedPriceEngine, CorrelationEngine, ShockBuffer
+    from simulation.market_hours import MarketCalendar
+    from simulation.scheduler import TickScheduler
+    from simulation.candles import CandleAggregator, CandleWriter, load_open_candles, publish_ended_candles
+    from simulation.persistence import TickWriter
+    from simulation.scenarios import ActiveScenario, ScenarioPoller, apply_scenario_jumps
+    from simulation.news_impact import NewsImpactModel, combine_overlays
     from db.redis_client import get_redis_client
-    from db.database import AsyncSessionLocal
-    from db.models import DbNewsEvent, DbPriceTick
-
-    # Initialize engines
-    engines = {}
-    for inst in MOCK_INSTRUMENTS:
-        engines[inst["symbol"]] = GBMPriceModel(
-            initial_price=inst["price"],
-            drift=inst["drift"],
-            volatility=inst["volatility"],
-        )
 
     r = get_redis_client()
-    news_engine = NewsEngine()
+    symbols = [inst["symbol"] for inst in MOCK_INSTRUMENTS]
+    last_quotes = await load_last_quotes(r, symbols)
+
+    # Initialize one engine for the whole universe. Correlated shocks are
+    # pre-generated off the hot path by the ring buffer.
+    correlation = CorrelationEngine()
+    engine = VectorizedPriceEngine(
+        symbols=symbols,
+        initial_prices=[last_quotes.get(inst["symbol"], inst)["price"] for inst in MOCK_INSTRUMENTS],
+        drifts=[inst["drift"] for inst in MOCK_INSTRUMENTS],
+        volatilities=[inst["volatility"] for inst in MOCK_INSTRUMENTS],
+        model=PRICE_MODEL,
+    )
+    shock_buffer = ShockBuffer(
+        n_assets=len(engine), block_steps=SHOCK_BUFFER_STEPS, correlation=correlation
+    )
+    metadata = await load_instrument_metadata()
+    await refresh_correlation(engine, correlation, shock_buffer, metadata)
+
+    # Static fundamentals are computed once; only price-dependent fields per tick
+    snapshots = build_snapshots(MOCK_INSTRUMENTS, last_quotes, engine)
+    symbol_table = await publish_symbol_table(r, symbols)
+    symbol_ids = np.arange(len(engine))
+
+    sectors, markets = zip(*[metadata.get(symbol, ("unknown", "unknown")) for symbol in symbols])
+    calendar = MarketCalendar(list(markets))
+    scenario = ActiveScenario(symbols, list(sectors), list(markets), quotes_as_of(last_quotes))
+    scenario_poller = ScenarioPoller()
+    deferred_jumps = None  # Scenario jumps owed to markets that were closed
+
+    candles = CandleAggregator(symbols)
+    candles.restore(await load_open_candles(r, symbols))
+
+    # Publish every instrument once so markets that are closed still have a quote
+    try:
+        now = datetime.now(timezone.utc)
+        await publish_ticks(
+            r,
+            snapshots,
+            symbol_ids,
+            engine.prices.copy(),
+            calendar.session_keys(now),
+            symbol_table,
+            symbol_ids,
+            now,
+            volumes=np.zeros(len(engine)),
+        )
+    except Exception as e:
+        print(f"Error publishing initial quotes: {e}")
+
+    news_engine = NewsEngine(sector_index=build_sector_index(metadata, symbols))
     context = MarketContext(sentiment="neutral")
-    
-    last_pruning = time.time()
+    news_impact = NewsImpactModel(symbols)
 
-    # In a real daemon, this would be an infinite loop `while True:`
-    while True:
-        try:
-            # 1. Possibly Generate News
-            news_event = news_engine.generate_news_event(
-                context=context,
-                active_symbols=[inst["symbol"] for inst in MOCK_INSTRUMENTS],
-                active_sectors=["technology"],
-            )
+    last_metadata_refresh = time.time()
+    last_writer_stats = time.time()
+    scheduler = TickScheduler(TICK_INTERVAL_SECONDS)
+
+    # Ticks and candles are persisted write-behind so Postgres latency stays out of the tick period
+    tick_writer = TickWriter()
+    tick_writer.start()
+    candle_writer = CandleWriter()
+    candle_writer.start()
+    maintenance = asyncio.create_task(run_maintenance())
 
-            if news_event:
-                # Publish headline to clients
-                await r.publish("market:news:global", json.dumps(news_event))
-
-                # Save news event to PostgreSQL database
-                try:
-                    async with AsyncSessionLocal() as session:
-                        db_event = DbNewsEvent(
-                            headline=news_event["headline"],
-                            category=news_event["category"],
-                            subcategory=news_event["subcategory"],
-                            timestamp=datetime.now(timezone.utc),
-                            impact=news_event["impact"],
-                            duration_minutes=news_event["duration_minutes"],
-                            affected_scope=news_event["affected_scope"],
-                            affected_symbols=news_event["affected_symbols"],
-                        )
-                        session.add(db_event)
-                        await session.commit()
-                except Exception as e:
-                    print(f"Error saving news event to DB: {e}")
-
-                # Apply shock to math model
-                impact = news_event["impact"]
-                if news_event["affected_scope"] == "global":
-                    for eng in engines.values():
-                        eng.drift += impact / 10  # Temporary drift baseline shift
-                        eng.volatility *= 1.5  # Spike volatility on global news
-                elif (
-                    news_event["affected_scope"] == "symbol"
-                    and news_event["affected_symbols"]
-                ):
-                    for sym in news_event["affected_symbols"]:
-                        if sym in engines:
-                            engines[sym].price *= 1 + impact  # Immediate jump
-                            engines[sym].volatility *= 2.0  # Elevated volatility post-event
-
-            # 2. Tick Generation
-            current_ticks = []
-            for symbol, engine in engines.items():
-                inst_base = next(i for i in MOCK_INSTRUMENTS if i["symbol"] == symbol)
-                new_price = engine.generate_next_price()
-
-                # Create the Tick structure
-                bid = new_price * 0.9995
-                ask = new_price * 1.0005
-
-                tick = {
-                    "symbol": symbol,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "price": new_price,
-                    "bid": bid,
-                    "ask": ask,
-                    "volume": random.uniform(10, 1000),
-                    "change": new_price - inst_base["price"],  # mock relative to base
-                    "changePercent": ((new_price - inst_base["price"]) / inst_base["price"])
-                    * 100,
-                }
-                current_ticks.append(tick)
-
-                # Publish to redis for the WebSocket server
-                await r.publish(f"market:ticks:{symbol}", json.dumps(tick))
-                await r.publish("market:ticks:global", json.dumps(tick))  # Global feed
-
-                # Calculate dynamic valuation stats deterministically based on symbol name
-                symbol_seed = sum(ord(c) for c in symbol)
-                
-                # 1. EPS & P/E
-                pe_baseline = 15.0 + (symbol_seed % 20)
-                eps = inst_base["price"] / pe_baseline
-                pe_ratio = new_price / eps if eps > 0 else 0.0
-                
-                # 2. Book Value & P/B
-                pb_baseline = 1.5 + (symbol_seed % 5)
-                book_value = inst_base["price"] / pb_baseline
-                pb_ratio = new_price / book_value if book_value > 0 else 0.0
-                
-                # 3. ROE (between 8% and 25%)
-                roe = 8.0 + (symbol_seed % 18)
-                
-                # 4. Dividend Yield (payout ratio between 0% and 40% of EPS)
-                payout_ratio = (symbol_seed % 5) * 0.1
-                annual_dividend = eps * payout_ratio
-                div_yield = (annual_dividend / new_price * 100.0) if new_price > 0 else 0.0
-                
-                # 5. Outstanding shares & Market Cap
-                outstanding_shares = (10 + (symbol_seed % 90)) * 1_000_000
-                market_cap = new_price * outstanding_shares
-                
-                # 6. 52-week High/Low
-                fifty_two_week_high = max(new_price, inst_base["price"] * 1.3)
-                fifty_two_week_low = min(new_price, inst_base["price"] * 0.75)
-                
-                # 7. Avg Volume
-                avg_volume = tick["volume"] * 1.15
-
-                # Save latest state for REST API
-                snapshot = {
-                    "symbol": symbol,
-                    "name": symbol,
-                    "price": new_price,
-                    "open": inst_base["price"],
-                    "high": new_price * 1.05,
-                    "low": new_price * 0.95,
-                    "previousClose": inst_base["price"],
-                    "change": new_price - inst_base["price"],
-                    "changePercent": ((new_price - inst_base["price"]) / inst_base["price"])
-                    * 100,
-                    "volume": tick["volume"],
-                    "timestamp": tick["timestamp"],
-                    "fiftyTwoWeekHigh": fifty_two_week_high,
-                    "fiftyTwoWeekLow": fifty_two_week_low,
-                    "marketCap": market_cap,
-                    "avgVolume": avg_volume,
-                    "peRatio": pe_ratio,
-                    "pbRatio": pb_ratio,
-                    "roe": roe,
-                    "divYield": div_yield,
-                }
-                await r.set(f"market:quote:{symbol}", json.dumps(snapshot))
-
-            # Bulk save ticks to PostgreSQL database for historical charts
+    try:
+        # In a real daemon, this would be an infinite loop `while True:`
+        while True:
             try:
-                async with AsyncSessionLocal() as session:
-                    ticks_to_save = [
-                        DbPriceTick(
-                            symbol=t["symbol"],
-                            timestamp=datetime.fromisoformat(t["timestamp"]),
-                            price=t["price"],
-                            bid=t["bid"],
-                            ask=t["ask"],
-                            volume=t["volume"],
-                        )
-                        for t in current_ticks
-                    ]
-                    session.add_all(ticks_to_save)
-                    await session.commit()
-            except Exception as e:
-                print(f"Error saving ticks to DB: {e}")
-
-            # 3. Mean Reversion of Volatility over time
-            for engine in engines.values():
-                if engine.volatility > 0.30:
-                    engine.volatility *= (
-                        0.98  # Slowly decay spiked volatility back to normal
+                now = datetime.now(timezone.utc)
+
+                # 1. Publish news whose scheduled arrival is due
+                for news_event in news_engine.generate_news_events(context, now, symbols):
+                    await publish_news_event(r, news_event)
+
+                    # Apply shock to math model
+                    apply_news_shock(engine, news_impact, news_event, now)
+
+                # 2. Tick Generation, skipped entirely for closed markets
+                open_mask = calendar.open_mask(now) if ENFORCE_MARKET_HOURS else None
+                await shock_buffer.ready()
+                shocks = shock_buffer.next()
+                open_idx = symbol_ids if open_mask is None else np.flatnonzero(open_mask)
+
+                # Scenario schedules are precompiled; this is a row lookup
+                scenario.set(await scenario_poller.poll(r))
+                scenario_drifts, scenario_scales, jumps = scenario.parameters(now)
+                deferred_jumps = apply_scenario_jumps(engine, jumps, open_mask, deferred_jumps)
+                drift_offsets, volatility_scales = combine_overlays(
+                    (scenario_drifts, scenario_scales), news_impact.parameters(now)
+                )
+
+                # Buckets end on time, also while every market is closed
+                candle_writer.submit(await publish_ended_candles(r, candles, now))
+
+                if len(open_idx):
+                    new_prices = engine.step(
+                        shocks,
+                        active=open_mask,
+                        drift_offsets=drift_offsets,
+                        volatility_scales=volatility_scales,
+                    )
+                    current_ticks, closed_candles = await publish_ticks(
+                        r,
+                        snapshots,
+                        open_idx,
+                        new_prices[open_idx],
+                        calendar.session_keys(now)[open_idx],
+                        symbol_table,
+                        symbol_ids[open_idx],
+                        now,
+                        candles=candles,
                     )
+                    tick_writer.submit(current_ticks)
+                    candle_writer.submit(closed_candles)
+
+                # 3. Pick up instrument changes; a no-op unless the set changed. The
+                # timer advances even if the database is unreachable, so a failed
+                # refresh is retried next round and not on every tick.
+                if time.time() - last_metadata_refresh > INSTRUMENT_REFRESH_SECONDS:
+                    last_metadata_refresh = time.time()
+                    metadata = await load_instrument_metadata()
+                    await refresh_correlation(engine, correlation, shock_buffer, metadata)
+                    news_engine.set_sector_index(build_sector_index(metadata, symbols))
+
+                # 4. Report what the write-behind buffers wrote and dropped
+                if time.time() - last_writer_stats > WRITER_STATS_INTERVAL_SECONDS:
+                    last_writer_stats = time.time()
+                    log_writer_stats("Simulator", tick_writer, candle_writer)
+
+            except Exception as loop_err:
+                print(f"Error in simulator loop iteration: {loop_err}")
 
-            # 4. Prune old price ticks every 1 hour (3600 seconds) to avoid database bloat
-            if time.time() - last_pruning > 3600:
-                try:
-                    async with AsyncSessionLocal() as session:
-                        from sqlalchemy import text
-                        await session.execute(
-                            text("DELETE FROM price_ticks WHERE timestamp < NOW() - INTERVAL '24 hours'")
-                        )
-                        await session.execute(
-                            text("DELETE FROM notifications WHERE timestamp < NOW() - INTERVAL '30 days'")
-                        )
-                        await session.commit()
-                    last_pruning = time.time()
-                except Exception as prune_err:
-                    print(f"Error pruning old price ticks: {prune_err}")
-
-        except Exception as loop_err:
-            print(f"Error in simulator loop iteration: {loop_err}")
-
-        # sleep slightly to mock real time
-        await asyncio.sleep(3)
+            # Wait for the next tick on a fixed-rate schedule
+            await scheduler.wait_next()
+    finally:
+        # Flush on shutdown, including when the leader lease is lost
+        maintenance.cancel()
+        await asyncio.gather(maintenance, return_exceptions=True)
+        await tick_writer.close()
+        await candle_writer.close()
+        shock_buffer.close()
@@ -0,0 +1,195 @@
+"""
+Compact, versioned binary encoding for market ticks.
+
+JSON stays the default on every hop. When enabled, ticks are packed as
+fixed-size little-endian records behind a small header:
+
+    header: version (u8), kind (u8), record count (u16), symbol table id (u32)
+    record: symbol id (u16), epoch milliseconds (i64), price, bid, ask,
+            volume, change, changePercent (f64 each)
+
+Symbol ids index into a `SymbolTable` that the simulator stores in Redis
+under `market:symbols` and that binary WebSocket clients receive as JSON
+when they connect.
+"""
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import numpy as np
+
+WIRE_VERSION = 1
+KIND_TICKS = 1
+
+SYMBOL_TABLE_KEY = "market:symbols"
+
+HEADER_DTYPE = np.dtype(
+    [("version", "u1"), ("kind", "u1"), ("count", "<u2"), ("table_id", "<u4")]
+)
+TICK_DTYPE = np.dtype(
+    [
+        ("symbol_id", "<u2"),
+        ("timestamp_ms", "<i8"),
+        ("price", "<f8"),
+        ("bid", "<f8"),
+        ("ask", "<f8"),
+        ("volume", "<f8"),
+        ("change", "<f8"),
+        ("change_percent", "<f8"),
+    ]
+)
+
+MAX_RECORDS_PER_MESSAGE = np.iinfo(np.uint16).max
+
+
+class WireFormatError(ValueError):
+    """Raised when a binary message cannot be decoded with the given table."""
+
+
+class SymbolTable:
+    """Stable symbol <-> id mapping shared by the encoder and its consumers."""
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = list(symbols)
+        self.ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.table_id = zlib.crc32("\n".join(self.symbols).encode("utf-8"))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def to_message(self) -> dict:
+        """JSON message sent to binary clients before any binary frame."""
+        return {
+            "type": "symbols",
+            "version": WIRE_VERSION,
+            "tableId": self.table_id,
+            "symbols": self.symbols,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_message())
+
+    @classmethod
+    def from_json(cls, raw) -> "SymbolTable":
+        return cls(json.loads(raw)["symbols"])
+
+
+def is_binary(data) -> bool:
+    """JSON payloads always start with '{'; binary ones start with the version byte."""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:1]) != b"{"
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    return int(timestamp.timestamp() * 1000)
+
+
+def _header(table: SymbolTable, count: int) -> bytes:
+    if count > MAX_RECORDS_PER_MESSAGE:
+        raise WireFormatError(f"Too many records for one message: {count}")
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header[0] = (WIRE_VERSION, KIND_TICKS, count, table.table_id)
+    return header.tobytes()
+
+
+def pack_tick_records(
+    table: SymbolTable,
+    symbol_ids,
+    timestamp_ms,
+    prices,
+    bids,
+    asks,
+    volumes,
+    changes,
+    change_percents,
+) -> np.ndarray:
+    """Pack column arrays into tick records without building per-tick dicts."""
+    records = np.empty(len(symbol_ids), dtype=TICK_DTYPE)
+    records["symbol_id"] = symbol_ids
+    records["timestamp_ms"] = timestamp_ms
+    records["price"] = prices
+    records["bid"] = bids
+    records["ask"] = asks
+    records["volume"] = volumes
+    records["change"] = changes
+    records["change_percent"] = change_percents
+    return records
+
+
+def encode_records(table: SymbolTable, records: np.ndarray) -> bytes:
+    return _header(table, len(records)) + records.tobytes()
+
+
+def encode_single_records(table: SymbolTable, records: np.ndarray) -> List[bytes]:
+    """Encode each record as its own one-tick message (per-symbol channels)."""
+    header = _header(table, 1)
+    blob = records.tobytes()
+    size = TICK_DTYPE.itemsize
+    return [header + blob[i * size:(i + 1) * size] for i in range(len(records))]
+
+
+def encode_record_blobs(table: SymbolTable, blobs: List[bytes]) -> bytes:
+    """Encode already packed records (e.g. cached per tick) as one message."""
+    return _header(table, len(blobs)) + b"".join(blobs)
+
+
+def encode_tick_dicts(table: SymbolTable, ticks: List[dict]) -> bytes:
+    """Encode JSON-shaped tick dicts; ticks for unknown symbols are skipped."""
+    ticks = [t for t in ticks if t["symbol"] in table.ids]
+    records = pack_tick_records(
+        table,
+        [table.ids[t["symbol"]] for t in ticks],
+        [to_epoch_ms(datetime.fromisoformat(t["timestamp"])) for t in ticks],
+        [t["price"] for t in ticks],
+        [t["bid"] for t in ticks],
+        [t["ask"] for t in ticks],
+        [t["volume"] for t in ticks],
+        [t["change"] for t in ticks],
+        [t["changePercent"] for t in ticks],
+    )
+    return encode_records(table, records)
+
+
+def read_table_id(data: bytes) -> int:
+    return int(np.frombuffer(data, dtype=HEADER_DTYPE, count=1)[0]["table_id"])
+
+
+def decode_records(data: bytes, table: SymbolTable) -> np.ndarray:
+    """Decode a binary message into a read-only record array (zero-copy)."""
+    if len(data) < HEADER_DTYPE.itemsize:
+        raise WireFormatError("Message shorter than the header")
+    header = np.frombuffer(data, dtype=HEADER_DTYPE, count=1)[0]
+    if header["version"] != WIRE_VERSION or header["kind"] != KIND_TICKS:
+        raise WireFormatError(f"Unsupported wire version/kind {header['version']}/{header['kind']}")
+    if header["table_id"] != table.table_id:
+        raise WireFormatError("Symbol table mismatch")
+    return np.frombuffer(
+        data, dtype=TICK_DTYPE, count=int(header["count"]), offset=HEADER_DTYPE.itemsize
+    )
+
+
+def records_to_dicts(records: np.ndarray, table: SymbolTable) -> List[dict]:
+    """Expand records back into the JSON tick shape used by old app builds."""
+    symbols = table.symbols
+    return [
+        {
+            "symbol": symbols[symbol_id],
+            "timestamp": datetime.fromtimestamp(ts / 1000, tz=timezone.utc).isoformat(),
+            "price": price,
+            "bid": bid,
+            "ask": ask,
+            "volume": volume,
+            "change": change,
+            "changePercent": change_percent,
+        }
+        for symbol_id, ts, price, bid, ask, volume, change, change_percent in records.tolist()
+    ]
+
+
+async def publish_symbol_table(redis_client, table: SymbolTable) -> None:
+    await redis_client.set(SYMBOL_TABLE_KEY, table.to_json())
+
+
+async def load_symbol_table(redis_client) -> Optional[SymbolTable]:
+    raw = await redis_client.get(SYMBOL_TABLE_KEY)
+    return SymbolTable.from_json(raw) if raw else None
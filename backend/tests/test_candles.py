@@ -0,0 +1,137 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+from simulation.candles import CandleAggregator, CandleWriter, publish_ended_candles
+
+T0 = datetime(2026, 1, 5, 10, 0, 0, tzinfo=timezone.utc)
+
+def at(seconds):
+    return datetime.fromtimestamp(T0.timestamp() + seconds, tz=timezone.utc)
+
+def test_candles_fold_ticks_and_close_on_bucket_change():
+    agg = CandleAggregator(["AAA", "BBB"], {"1m": 60, "5m": 300})
+    both = np.array([0, 1])
+
+    assert agg.update(both, np.array([10.0, 20.0]), np.array([1.0, 2.0]), at(0)) == []
+    agg.update(both, np.array([12.0, 19.0]), np.array([1.0, 2.0]), at(20))
+    agg.update(np.array([0]), np.array([11.0]), np.array([1.0]), at(40))
+
+    closed = agg.update(np.array([0]), np.array([13.0]), np.array([5.0]), at(61))
+    # Both 1m candles close, even for the instrument that did not tick
+    assert [(c["symbol"], c["timeframe"]) for c in closed] == [("AAA", "1m"), ("BBB", "1m")]
+    aaa = closed[0]
+    assert aaa["timestamp"] == T0.isoformat()
+    assert (aaa["open"], aaa["high"], aaa["low"], aaa["close"], aaa["volume"]) == (10.0, 12.0, 10.0, 11.0, 3.0)
+
+    # The 5m candle keeps accumulating across the 1m boundary
+    five = json.loads(agg.open_candles(np.array([0]))["5m"]["AAA"])
+    assert (five["open"], five["high"], five["close"], five["volume"]) == (10.0, 13.0, 13.0, 8.0)
+    assert "BBB" not in agg.open_candles(np.array([0]))["5m"]
+
+def test_new_bucket_opens_at_first_tick_price():
+    agg = CandleAggregator(["AAA"], {"1m": 60})
+    idx = np.array([0])
+    agg.update(idx, np.array([10.0]), np.array([1.0]), at(0))
+    agg.update(idx, np.array([9.0]), np.array([1.0]), at(65))
+
+    candle = json.loads(agg.open_candles(idx)["1m"]["AAA"])
+    assert candle["timestamp"] == at(60).isoformat()
+    assert (candle["open"], candle["high"], candle["low"], candle["volume"]) == (9.0, 9.0, 9.0, 1.0)
+
+def test_restored_candles_continue_or_close():
+    agg = CandleAggregator(["AAA"], {"1m": 60, "1h": 3600})
+    agg.update(np.array([0]), np.array([10.0]), np.array([1.0]), at(0))
+    open_candles = [json.loads(c) for tf in agg.open_candles(np.array([0])).values() for c in tf.values()]
+
+    restored = CandleAggregator(["AAA"], {"1m": 60, "1h": 3600})
+    restored.restore(open_candles + [{"symbol": "ZZZ", "timeframe": "1m"}])
+    closed = restored.update(np.array([0]), np.array([11.0]), np.array([1.0]), at(90))
+
+    assert [c["timeframe"] for c in closed] == ["1m"]
+    hour = json.loads(restored.open_candles(np.array([0]))["1h"]["AAA"])
+    assert (hour["open"], hour["close"], hour["volume"]) == (10.0, 11.0, 2.0)
+
+class RecordingPipe:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args[0]))
+
+    async def execute(self):
+        self.calls.append(("execute", None))
+
+class RecordingRedis:
+    def __init__(self):
+        self.calls = []
+
+    def pipeline(self, transaction=True):
+        return RecordingPipe(self.calls)
+
+def test_buckets_close_on_time_without_ticks():
+    agg = CandleAggregator(["AAA"], {"1m": 60, "5m": 300})
+    agg.update(np.array([0]), np.array([10.0]), np.array([1.0]), at(0))
+    r = RecordingRedis()
+
+    assert asyncio.run(publish_ended_candles(r, agg, at(30))) == []
+    assert r.calls == [], "Nothing to write while the buckets are open"
+
+    # The market closed after the first tick; the 1m bucket still ends on time
+    closed = asyncio.run(publish_ended_candles(r, agg, at(61)))
+    assert [(c["timeframe"], c["close"]) for c in closed] == [("1m", 10.0)]
+    assert r.calls == [
+        ("hdel", "market:candles:open:1m"),
+        ("lpush", "market:candles:AAA:1m"),
+        ("ltrim", "market:candles:AAA:1m"),
+        ("execute", None),
+    ]
+    assert agg.close_ended(at(301))[0]["timeframe"] == "5m"
+
+def candle(symbol, close, timestamp="2026-01-05T10:00:00+00:00"):
+    return {"symbol": symbol, "timeframe": "1m", "timestamp": timestamp,
+            "open": 1.0, "high": close, "low": 1.0, "close": close, "volume": 5.0}
+
+def test_candle_writer_upserts_in_the_background():
+    saved = []
+
+    async def save(candles):
+        saved.append([(c["symbol"], c["close"]) for c in candles])
+
+    async def run():
+        writer = CandleWriter(interval=0.01, save=save)
+        writer.start()
+        writer.submit([candle("AAPL", 1.0), candle("MSFT", 2.0)])
+        writer.submit([candle("AAPL", 1.5)])
+        assert saved == [], "Submitting never waits on the database"
+        await asyncio.sleep(0.05)
+        writer.submit([candle("AAPL", 3.0, "2026-01-05T10:01:00+00:00")])
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert saved == [[("AAPL", 1.5), ("MSFT", 2.0)], [("AAPL", 3.0)]]
+    assert writer.stats()["written"] == 3
+
+def test_candle_writer_retries_transient_failures_a_bounded_number_of_times():
+    attempts = []
+
+    async def failing_save(candles):
+        attempts.append(len(candles))
+        raise ConnectionError("database is down")
+
+    async def run():
+        writer = CandleWriter(interval=60, max_candles=3, max_attempts=2, save=failing_save)
+        writer.submit([candle("AAPL", 1.0), candle("MSFT", 2.0)])
+        await writer.flush()
+        assert len(writer.pending) == 2, "Candles of a failed upsert are retried"
+        writer.submit([candle("XOM", 3.0), candle("TSLA", 4.0)])
+        await writer.flush()
+        return writer
+
+    writer = asyncio.run(run())
+    assert attempts == [2, 3]
+    assert writer.pending == {}
+    assert writer.dropped == 4
+    assert writer.failed_writes == 2
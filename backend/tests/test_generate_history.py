@@ -0,0 +1,84 @@
+import random
+from datetime import datetime, timezone
+
+import numpy as np
+from db.tick_archive import TickArchive
+from simulation.generate_history import HistoryGenerator, build_universe, write_archive
+
+START = datetime(2026, 1, 5, tzinfo=timezone.utc)  # Monday
+END = datetime(2026, 1, 6, 12, tzinfo=timezone.utc)
+
+def generate(seed, **kwargs):
+    generator = HistoryGenerator(build_universe(), START, END, interval=60, seed=seed, **kwargs)
+    try:
+        return list(generator.days())
+    finally:
+        generator.close()
+
+def test_generator_is_deterministic_per_seed():
+    state = random.getstate()
+    first, again, other = generate(7), generate(7), generate(8)
+    assert random.getstate() == state, "The global random state is left alone"
+
+    assert [len(block.timestamps_ms) for block in first] == [1440, 720]
+    for a, b in zip(first, again):
+        np.testing.assert_array_equal(a.prices, b.prices)
+        np.testing.assert_array_equal(a.volumes, b.volumes)
+    assert not np.array_equal(first[0].prices, other[0].prices)
+
+def test_generator_only_ticks_open_markets():
+    block = generate(1)[0]
+    universe = build_universe()
+    usa = [i for i, inst in enumerate(universe) if inst["market"] == "usa"]
+
+    # New York trades 14:30-21:00 UTC in January
+    assert not block.active[14 * 60 + 29, usa].any()
+    assert block.active[14 * 60 + 30, usa].all()
+
+    around_the_clock = generate(1, market_hours=False)[0]
+    assert around_the_clock.active.all()
+
+def test_generator_writes_archive(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    generator = HistoryGenerator(build_universe(), START, END, interval=300, seed=3)
+    try:
+        written = write_archive(generator, archive)
+    finally:
+        generator.close()
+
+    assert written > 0
+    # Mumbai opens at 03:45 UTC, New York only after the range ends on the 6th
+    assert [day.isoformat() for day in archive.days("NIFTY 50")] == ["2026-01-05", "2026-01-06"]
+    days = archive.days("AAPL")
+    assert [day.isoformat() for day in days] == ["2026-01-05"]
+    assert np.all(np.diff(archive.load_day("AAPL", days[0])["timestamp_ms"]) > 0)
+
+def test_news_does_not_pile_up_over_a_weekend():
+    # Friday afternoon to Monday morning, when Mumbai opens first
+    generator = HistoryGenerator(
+        build_universe(),
+        datetime(2026, 1, 2, 12, tzinfo=timezone.utc),
+        datetime(2026, 1, 5, 6, tzinfo=timezone.utc),
+        interval=60,
+        seed=1,
+    )
+    per_step = []
+    generate_news_events = generator.news_engine.generate_news_events
+
+    def counting(*args, **kwargs):
+        events = generate_news_events(*args, **kwargs)
+        per_step.append(len(events))
+        return events
+
+    generator.news_engine.generate_news_events = counting
+    try:
+        blocks = list(generator.days())
+    finally:
+        generator.close()
+
+    assert sum(per_step) > 100 and max(per_step) <= 5
+    prices = np.concatenate([block.prices for block in blocks])
+    active = np.concatenate([block.active for block in blocks])
+    for i in range(prices.shape[1]):
+        ticked = prices[active[:, i], i]
+        assert np.abs(np.diff(np.log(ticked))).max() < 0.1
@@ -0,0 +1,38 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from simulation.news_engine import MarketContext, NewsEngine, build_sector_index
+
+NOW = datetime(2026, 1, 5, 15, tzinfo=timezone.utc)
+METADATA = {"AAPL": ("technology", "usa"), "MSFT": ("technology", "usa"), "XOM": ("energy", "usa"), "FTSE 100": ("unknown", "uk")}
+
+def test_sector_index_from_metadata():
+    assert build_sector_index(METADATA) == {"technology": ["AAPL", "MSFT"], "energy": ["XOM"]}
+    assert build_sector_index(METADATA, ["AAPL", "XOM"]) == {"technology": ["AAPL"], "energy": ["XOM"]}
+
+def test_arrivals_follow_the_scheduled_rate():
+    engine = NewsEngine(events_per_hour=60, sector_index=build_sector_index(METADATA), rng=random.Random(1))
+    context = MarketContext()
+
+    assert engine.generate_news_events(context, NOW, ["AAPL"]) == [], "The first call only schedules"
+    assert engine.next_arrival > NOW
+
+    events = []
+    for minute in range(1, 24 * 60 + 1):
+        events += engine.generate_news_events(context, NOW + timedelta(minutes=minute), ["AAPL"])
+    assert 1200 < len(events) < 1700, "About one a minute"
+    timestamps = [event["timestamp"] for event in events]
+    assert timestamps == sorted(timestamps)
+
+    for event in events:
+        assert "{" not in event["headline"]
+        if event["affected_scope"] == "sector":
+            assert event["affected_symbols"] in (["AAPL", "MSFT"], ["XOM"])
+        elif event["affected_scope"] == "symbol":
+            assert event["affected_symbols"] == ["AAPL"]
+    assert any(event["affected_scope"] == "sector" for event in events)
+
+def test_no_news_at_zero_rate():
+    engine = NewsEngine(events_per_hour=0)
+    engine.generate_news_events(MarketContext(), NOW)
+    assert engine.generate_news_events(MarketContext(), NOW + timedelta(days=365)) == []
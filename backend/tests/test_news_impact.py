@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from simulation.news_impact import NewsImpactModel, combine_overlays, decay_weights
+from simulation.price_engine import VectorizedPriceEngine
+from simulation.tasks import apply_news_shock
+
+SYMBOLS = ["AAPL", "MSFT", "XOM"]
+NOW = datetime(2026, 1, 5, 15, tzinfo=timezone.utc)
+
+def event(scope, impact=0.01, symbols=(), minutes=10):
+    return {"impact": impact, "duration_minutes": minutes, "affected_scope": scope, "affected_symbols": list(symbols)}
+
+def test_decay_kernels_reach_zero_at_duration():
+    age = np.array([0.0, 30.0, 60.0, 90.0])
+    duration = np.full(4, 60.0)
+    np.testing.assert_allclose(decay_weights(age, duration, "linear"), [1.0, 0.5, 0.0, 0.0])
+    np.testing.assert_allclose(decay_weights(age, duration, "exponential"), [1.0, np.exp(-1.5), 0.0, 0.0])
+    with pytest.raises(ValueError):
+        NewsImpactModel(SYMBOLS, kernel="cubic")
+
+def test_shocks_combine_decay_and_expire():
+    model = NewsImpactModel(SYMBOLS, kernel="linear")
+    assert model.parameters(NOW) == (None, None)
+
+    model.add_event(event("global", impact=0.02), NOW)
+    model.add_event(event("symbol", symbols=["MSFT", "TSLA"], minutes=20), NOW)
+    drifts, scales = model.parameters(NOW)
+    np.testing.assert_allclose(drifts, [0.002] * 3)
+    np.testing.assert_allclose(scales, [1.5, 3.0, 1.5])
+
+    drifts, scales = model.parameters(NOW + timedelta(minutes=5))
+    np.testing.assert_allclose(drifts, [0.001] * 3)
+    np.testing.assert_allclose(scales, [1.5**0.5, 1.5**0.5 * 2**0.75, 1.5**0.5])
+
+    model.parameters(NOW + timedelta(minutes=10))
+    assert len(model) == 1, "The global shock expired"
+    assert model.parameters(NOW + timedelta(minutes=20)) == (None, None)
+    assert len(model) == 0
+
+def test_capacity_replaces_the_weakest_shock():
+    model = NewsImpactModel(SYMBOLS, capacity=2, kernel="linear")
+    model.add(NOW, 10, 0.1, 1.0)
+    model.add(NOW, 100, 0.2, 1.0)
+    model.add(NOW + timedelta(minutes=5), 10, 0.3, 1.0)
+    assert sorted(model.drifts.tolist()) == [0.2, 0.3]
+
+def test_news_no_longer_mutates_engine_parameters():
+    engine = VectorizedPriceEngine(SYMBOLS, [100.0] * 3, [0.05] * 3, [0.2] * 3)
+    model = NewsImpactModel(SYMBOLS)
+    for _ in range(100):
+        apply_news_shock(engine, model, event("global"), NOW)
+    apply_news_shock(engine, model, event("symbol", impact=0.01, symbols=["AAPL"]), NOW)
+
+    assert engine.drifts.tolist() == [0.05] * 3 and engine.volatilities.tolist() == [0.2] * 3
+    assert engine.prices[0] == pytest.approx(101.0), "Symbol news still jumps at once"
+    assert len(model) == 64, "Bounded by capacity"
+
+def test_combine_overlays():
+    assert combine_overlays((None, None), (None, None)) == (None, None)
+    drifts, scales = combine_overlays((np.ones(2), None), (np.ones(2), np.full(2, 2.0)), (None, np.full(2, 3.0)))
+    assert drifts.tolist() == [2.0, 2.0] and scales.tolist() == [6.0, 6.0]
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+import pytest
+from db.partitions import (
+    PRICE_TICK_PARTITIONS_AHEAD,
+    PRICE_TICK_RETENTION_HOURS,
+    is_expired,
+    parse_partition_name,
+    partition_name,
+    partition_start,
+    wanted_partitions,
+)
+
+NOW = datetime(2026, 1, 5, 10, 30, tzinfo=timezone.utc)
+
+def test_partition_names_round_trip():
+    start = partition_start(NOW, "hour")
+    assert partition_name(start, "hour") == "price_ticks_p2026010510"
+    assert parse_partition_name("price_ticks_p2026010510") == (start, "hour")
+
+    day = partition_start(NOW, "day")
+    assert partition_name(day, "day") == "price_ticks_p20260105"
+    assert parse_partition_name("price_ticks_p20260105") == (day, "day")
+
+    with pytest.raises(ValueError):
+        parse_partition_name("price_ticks_legacy")
+
+def test_wanted_partitions_span_retention_and_lookahead():
+    starts = wanted_partitions(NOW, "hour")
+    assert len(starts) == PRICE_TICK_RETENTION_HOURS + PRICE_TICK_PARTITIONS_AHEAD + 1
+    assert starts[-1] > NOW
+
+def test_partition_expires_once_all_rows_are_past_retention():
+    assert not is_expired("price_ticks_p2026010410", NOW)  # Holds ticks up to 11:00 yesterday
+    assert is_expired("price_ticks_p2026010409", NOW)
+    assert not is_expired("price_ticks_p20260104", NOW)
+    assert is_expired("price_ticks_p20260103", NOW)
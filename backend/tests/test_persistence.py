@@ -0,0 +1,82 @@
+import asyncio
+
+from simulation.persistence import TickWriter
+
+def ticks(n, ts="2026-01-05T10:00:00+00:00"):
+    return [
+        {"symbol": f"S{i}", "timestamp": ts, "price": 1.0, "bid": 0.9, "ask": 1.1, "volume": 5.0}
+        for i in range(n)
+    ]
+
+def test_writer_flushes_on_size_and_on_close():
+    written = []
+
+    async def copy(rows):
+        written.append(rows)
+
+    async def run():
+        writer = TickWriter(batch_rows=10, interval=60, max_rows=100, copy=copy)
+        writer.start()
+        writer.submit(ticks(6))
+        await asyncio.sleep(0)
+        assert written == []
+        writer.submit(ticks(6))
+        await asyncio.sleep(0.01)
+        assert [len(rows) for rows in written] == [12]
+
+        writer.submit(ticks(3))
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert [len(rows) for rows in written] == [12, 3]
+    assert written[0][0][0] == "S0"
+    assert written[0][0][1].isoformat() == "2026-01-05T10:00:00+00:00"
+    assert writer.stats()["written"] == 15
+
+def test_writer_drops_when_full_and_keeps_rows_after_failed_flush():
+    async def failing_copy(rows):
+        raise ConnectionError("database is down")
+
+    async def run():
+        writer = TickWriter(batch_rows=1000, interval=60, max_rows=10, copy=failing_copy)
+        writer.submit(ticks(8))
+        await writer.flush()
+        assert len(writer.rows) == 8, "Rows of a failed flush are retried"
+
+        writer.submit(ticks(5))
+        return writer
+
+    writer = asyncio.run(run())
+    assert len(writer.rows) == 10
+    assert writer.dropped == 3
+    assert writer.failed_flushes == 1
+
+def test_writer_discards_rows_that_cannot_be_written():
+    import asyncpg
+
+    async def rejecting_copy(rows):
+        raise asyncpg.ForeignKeyViolationError("symbol is not in instruments")
+
+    async def failing_copy(rows):
+        raise ConnectionError("database is down")
+
+    async def run():
+        writer = TickWriter(batch_rows=1000, interval=60, max_rows=10, copy=rejecting_copy)
+        writer.submit(ticks(4))
+        await writer.flush()
+        assert writer.rows == [] and writer.dropped == 4, "Permanent errors are not retried"
+
+        writer.copy = failing_copy
+        writer.max_attempts = 3
+        writer.submit(ticks(4))
+        for _ in range(2):
+            await writer.flush()
+        assert len(writer.rows) == 4
+        await writer.flush()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.rows == []
+    assert writer.dropped == 8
+    assert writer.failed_flushes == 4
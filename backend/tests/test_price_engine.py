@@ -1,5 +1,16 @@
+import asyncio
 import pytest
-from simulation.price_engine import GBMPriceModel, JumpDiffusionModel, GBMWithGARCH
+import numpy as np
+from simulation.price_engine import (
+    GBMPriceModel,
+    JumpDiffusionModel,
+    GBMWithGARCH,
+    VectorizedPriceEngine,
+    CorrelationEngine,
+    FactorShockModel,
+    ShockBuffer,
+    build_correlation_matrix,
+)
 
 def test_gbm_price_model():
     model = GBMPriceModel(initial_price=100.0, drift=0.08, volatility=0.20)
@@ -25,3 +36,144 @@ def test_gbm_with_garch():
     assert len(prices) == 100
     assert all(p > 0 for p in prices)
     assert all(v > 0 for v in volatilities), "Volatility must remain positive"
+
+def _make_vectorized_engine(model, n=500):
+    return VectorizedPriceEngine(
+        symbols=[f"SYM{i}" for i in range(n)],
+        initial_prices=np.linspace(10.0, 1000.0, n),
+        drifts=np.full(n, 0.08),
+        volatilities=np.full(n, 0.25),
+        model=model,
+        seed=42,
+    )
+
+@pytest.mark.parametrize("model", VectorizedPriceEngine.MODELS)
+def test_vectorized_engine_steps_whole_universe(model):
+    engine = _make_vectorized_engine(model)
+    for _ in range(100):
+        prices = engine.step()
+
+    assert prices.shape == (500,)
+    assert np.all(prices > 0), "Prices should stay positive"
+    assert np.all(engine.current_volatilities > 0)
+
+def test_vectorized_engine_is_deterministic_for_seed():
+    a = _make_vectorized_engine("jump_diffusion")
+    b = _make_vectorized_engine("jump_diffusion")
+    for _ in range(20):
+        np.testing.assert_array_equal(a.step(), b.step())
+
+def test_vectorized_engine_rejects_unknown_model():
+    with pytest.raises(ValueError):
+        _make_vectorized_engine("heston")
+
+def test_correlation_matrix_groups_by_market_and_sector():
+    sectors = ["unknown", "energy", "energy", "technology"]
+    markets = ["india", "india", "uk", "usa"]
+    matrix = build_correlation_matrix(sectors, markets)
+
+    np.testing.assert_allclose(np.diag(matrix), 1.0)
+    np.testing.assert_allclose(matrix, matrix.T)
+    assert matrix[0, 1] > matrix[0, 3], "Same-market pairs should co-move more"
+    assert matrix[1, 2] > matrix[2, 3], "Same-sector pairs should co-move more"
+    assert np.all(np.linalg.eigvalsh(matrix) > 0)
+
+def test_correlation_engine_caches_factor_until_universe_changes():
+    correlation = CorrelationEngine()
+    assert correlation.update(["A", "B"], ["energy", "energy"], ["uk", "uk"])
+    factor = correlation.cholesky_matrix
+    assert not correlation.update(["A", "B"], ["energy", "energy"], ["uk", "uk"])
+    assert correlation.cholesky_matrix is factor
+    assert correlation.update(["A", "B", "C"], ["energy", "energy", "unknown"], ["uk", "uk", "usa"])
+
+def test_correlated_shocks_reproduce_target_matrix():
+    sectors = ["technology"] * 3 + ["energy"] * 3
+    markets = ["usa"] * 3 + ["uk"] * 3
+    correlation = CorrelationEngine()
+    correlation.update([f"S{i}" for i in range(6)], sectors, markets)
+
+    rng = np.random.default_rng(7)
+    shocks = correlation.correlate(rng.standard_normal((50_000, 6)))
+    np.testing.assert_allclose(np.corrcoef(shocks.T), correlation.correlation_matrix, atol=0.02)
+
+def test_shock_buffer_wraps_across_blocks():
+    buffer = ShockBuffer(n_assets=4, block_steps=8, seed=3)
+    try:
+        rows = np.array([buffer.next() for _ in range(40)])
+    finally:
+        buffer.close()
+
+    assert rows.shape == (40, 4)
+    assert len(np.unique(rows[:, 0])) == 40, "Each tick should get fresh shocks"
+
+def test_shock_buffer_refills_without_blocking_the_loop():
+    async def run():
+        buffer = ShockBuffer(n_assets=3, block_steps=4, seed=3)
+        try:
+            rows = []
+            for _ in range(10):
+                await buffer.ready()
+                rows.append(buffer.next())
+            buffer.reset()
+            await buffer.ready()
+            rows.append(buffer.next())
+            return np.array(rows)
+        finally:
+            buffer.close()
+
+    rows = asyncio.run(run())
+    sync = ShockBuffer(n_assets=3, block_steps=4, seed=3)
+    try:
+        np.testing.assert_array_equal(rows[:10], [sync.next() for _ in range(10)])
+    finally:
+        sync.close()
+    assert len(np.unique(rows[:, 0])) == 11
+
+def test_shock_buffer_applies_correlation():
+    correlation = CorrelationEngine()
+    correlation.update(["A", "B"], ["energy", "energy"], ["uk", "uk"])
+    buffer = ShockBuffer(n_assets=2, block_steps=5_000, correlation=correlation, seed=11)
+    try:
+        rows = np.array([buffer.next() for _ in range(20_000)])
+    finally:
+        buffer.close()
+
+    assert abs(np.corrcoef(rows.T)[0, 1] - correlation.correlation_matrix[0, 1]) < 0.03
+
+@pytest.mark.parametrize("model", [
+    GBMPriceModel(initial_price=100.0, drift=0.08, volatility=0.20),
+    JumpDiffusionModel(initial_price=150.0, drift=0.10, volatility=0.25, jump_intensity=500.0),
+    GBMWithGARCH(initial_price=50.0, drift=0.12, base_volatility=0.30),
+])
+def test_simulate_paths_is_stateless_and_seeded(model):
+    start_price = model.price
+    paths = model.simulate_paths(n_steps=250, n_paths=1_000, seed=5)
+
+    assert paths.shape == (1_000, 250)
+    assert np.all(paths > 0), "Prices should stay positive"
+    assert model.price == start_price, "simulate_paths must not mutate the model"
+    np.testing.assert_array_equal(paths, model.simulate_paths(n_steps=250, n_paths=1_000, seed=5))
+
+def test_simulate_paths_matches_step_distribution():
+    model = GBMPriceModel(initial_price=100.0, drift=0.0, volatility=0.20, dt=1 / 252)
+    final = model.simulate_paths(n_steps=252, n_paths=20_000, seed=9)[:, -1]
+
+    # One year of driftless GBM: mean stays at the start price, log-vol ~ 20%
+    assert abs(final.mean() - 100.0) < 1.0
+    assert abs(np.log(final).std() - 0.20) < 0.01
+
+def test_factor_shocks_match_cholesky_correlation():
+    sectors = ["technology", "technology", "energy", "unknown", "energy"]
+    markets = ["usa", "usa", "uk", "uk", "india"]
+    model = FactorShockModel(sectors, markets)
+
+    rng = np.random.default_rng(13)
+    draws = 50_000
+    shocks = np.array([
+        model.shocks(model.draw_factors(rng), rng.standard_normal(5)) for _ in range(draws)
+    ])
+    np.testing.assert_allclose(np.corrcoef(shocks.T), build_correlation_matrix(sectors, markets), atol=0.02)
+
+    # A slice sees exactly the shocks of the full universe for the same draws
+    factors, noise = model.draw_factors(rng), rng.standard_normal(5)
+    np.testing.assert_allclose(model.shocks(factors, noise[[1, 3]], [1, 3]), model.shocks(factors, noise)[[1, 3]])
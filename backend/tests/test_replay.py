@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from db.tick_archive import ARCHIVE_DTYPE, TickArchive
+from simulation.replay import (
+    ReplayClock,
+    TickBatch,
+    archive_batches,
+    replay_range,
+    split_by_timestamp,
+    ticks_by_timestamp,
+)
+
+DAY = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+def records(*ticks):
+    out = np.zeros(len(ticks), dtype=ARCHIVE_DTYPE)
+    for i, (offset, price) in enumerate(ticks):
+        out[i] = (int((DAY + offset).timestamp() * 1000), price, price, price, 1.0)
+    return out
+
+def test_archive_batches_merge_symbols_in_time_order(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    m = timedelta(minutes=1)
+    archive.write("AAPL", records((0 * m, 1.0), (2 * m, 2.0), (timedelta(days=1), 3.0)))
+    archive.write("MSFT", records((0 * m, 10.0), (1 * m, 11.0), (2 * m, 12.0)))
+    index = {"AAPL": 0, "MSFT": 1, "TSLA": 2}
+
+    batches = list(archive_batches(archive, index, DAY, DAY + timedelta(days=2), fetch_rows=4))
+    assert [len(batch.indices) for batch in batches] == [4, 1, 1], "Chunked, one day at a time"
+    indices = np.concatenate([batch.indices for batch in batches])
+    prices = np.concatenate([batch.prices for batch in batches])
+    assert indices.tolist() == [0, 1, 1, 0, 1, 0]
+    assert prices.tolist() == [1.0, 10.0, 11.0, 2.0, 12.0, 3.0]
+
+    ticks = split_by_timestamp(batches[0])
+    assert [tick.indices.tolist() for tick in ticks] == [[0, 1], [1], [0]]
+
+    later = list(archive_batches(archive, index, DAY + m, DAY + 2 * m))
+    assert [batch.prices.tolist() for batch in later] == [[11.0]], "End is exclusive"
+
+def test_replay_clock_paces_at_speed():
+    now = [100.0]
+    clock = ReplayClock(speed=60, clock=lambda: now[0])
+
+    assert clock.delay(0) == 0
+    assert clock.delay(60_000) == 1.0, "A minute of data takes a second"
+    now[0] = 102.0
+    assert clock.delay(60_000) == -1.0, "Running late publishes at once"
+
+def test_ticks_split_across_fetches_are_joined():
+    def batch(*rows):
+        indices, timestamps = zip(*rows)
+        return TickBatch(np.array(indices), np.array(timestamps), np.ones(len(rows)), np.ones(len(rows)))
+
+    async def fetched():
+        yield batch((0, 1000), (0, 2000), (1, 2000))
+        yield batch((2, 2000), (0, 3000))
+        yield batch((1, 3000))
+
+    async def run():
+        return [tick.indices.tolist() async for tick in ticks_by_timestamp(fetched())]
+
+    assert asyncio.run(run()) == [[0], [0, 1, 2], [0, 1]]
+
+def test_replay_range_is_validated():
+    assert replay_range("2026-01-05T14:30", "2026-01-06") == (
+        datetime(2026, 1, 5, 14, 30, tzinfo=timezone.utc),
+        datetime(2026, 1, 6, tzinfo=timezone.utc),
+    )
+    for start, end in (("", "2026-01-06"), ("yesterday", "2026-01-06"), ("2026-01-06", "2026-01-05")):
+        with pytest.raises(ValueError):
+            replay_range(start, end)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from simulation.price_engine import VectorizedPriceEngine
+from simulation.scenarios import BUILT_IN_SCENARIOS, ActiveScenario, apply_scenario_jumps, compile_scenario
+
+SYMBOLS = ["AAPL", "XOM", "HSBA"]
+SECTORS = ["technology", "energy", "financialServices"]
+MARKETS = ["usa", "usa", "uk"]
+START = datetime(2026, 1, 5, 15, tzinfo=timezone.utc)
+
+def test_compile_resolves_targets_per_phase():
+    schedule = compile_scenario(
+        {
+            "phases": [
+                {"minutes": 1, "drift": {"*": 0.1, "sector:technology": 0.5}, "volatility": {"market:uk": 2.0}},
+                {"minutes": 2, "volatility": {"*": 2.0, "symbol:XOM": 1.5}, "jump": {"*": -0.1}},
+            ]
+        },
+        SYMBOLS, SECTORS, MARKETS,
+    )
+    assert schedule.ends.tolist() == [60.0, 180.0]
+    np.testing.assert_allclose(schedule.drift_offsets, [[0.6, 0.1, 0.1], [0, 0, 0]])
+    np.testing.assert_allclose(schedule.volatility_scales, [[1, 1, 2], [2, 3, 2]])
+    np.testing.assert_allclose(schedule.jumps, [[0, 0, 0], [-0.1, -0.1, -0.1]])
+    assert [schedule.phase(s) for s in (0, 59, 60, 179, 180)] == [0, 0, 1, 1, 2]
+
+    with pytest.raises(ValueError):
+        compile_scenario({"phases": [{"minutes": 1, "drift": {"planet:mars": 1}}]}, SYMBOLS, SECTORS, MARKETS)
+
+def test_built_in_scenarios_compile():
+    for definition in BUILT_IN_SCENARIOS.values():
+        compile_scenario(definition, SYMBOLS, SECTORS, MARKETS)
+
+def test_active_scenario_jumps_once_per_phase_and_ends():
+    scenario = ActiveScenario(SYMBOLS, SECTORS, MARKETS)
+    assert scenario.parameters(START) == (None, None, None)
+
+    scenario.set({"scenario": "market_crash", "started_at": START.isoformat()})
+    drift, vol, jumps = scenario.parameters(START + timedelta(seconds=1))
+    assert (drift == -0.5).all() and (vol == 3.0).all() and (jumps == -0.05).all()
+    assert scenario.parameters(START + timedelta(seconds=2))[2] is None, "Jumps apply on phase entry only"
+    assert scenario.parameters(START + timedelta(minutes=25))[2].tolist() == [0.02] * 3
+    assert scenario.parameters(START + timedelta(minutes=31)) == (None, None, None)
+
+    scenario.set(None)
+    assert scenario.schedule is None
+
+def test_engine_applies_scenario_overlays_for_one_step():
+    engine = VectorizedPriceEngine(SYMBOLS, [100.0] * 3, [0.0] * 3, [0.2] * 3, dt=1.0)
+    shocks = np.ones(3)
+    prices = engine.step(shocks, drift_offsets=np.array([0.1, 0.0, 0.0]), volatility_scales=np.array([1.0, 2.0, 0.0]))
+    np.testing.assert_allclose(prices, [130.0, 140.0, 100.0])
+    assert engine.drifts.tolist() == [0.0] * 3 and engine.volatilities.tolist() == [0.2] * 3
+
+    owed = apply_scenario_jumps(engine, np.array([-0.5, -0.5, -0.5]), active=np.array([True, False, True]))
+    np.testing.assert_allclose(engine.prices, [65.0, 140.0, 50.0])
+    np.testing.assert_allclose(owed, [0.0, -0.5, 0.0])
+
+    # The closed instrument takes its jump, on top of a new one, when it opens
+    owed = apply_scenario_jumps(engine, np.array([0.0, 1.0, 0.0]), active=np.array([True, True, True]), deferred=owed)
+    np.testing.assert_allclose(engine.prices, [65.0, 140.0, 50.0])
+    assert owed is None
+
+def test_resumed_scenario_does_not_jump_again():
+    spec = {"scenario": "market_crash", "started_at": START.isoformat()}
+
+    # A new leader resuming from quotes published after the crash began
+    resumed = ActiveScenario(SYMBOLS, SECTORS, MARKETS, prices_as_of=START + timedelta(seconds=3))
+    resumed.set(spec)
+    assert resumed.parameters(START + timedelta(seconds=6))[2] is None
+    assert resumed.parameters(START + timedelta(minutes=20, seconds=1))[2].tolist() == [0.02] * 3
+
+    # Quotes from before the scenario started do not include its jump yet
+    fresh = ActiveScenario(SYMBOLS, SECTORS, MARKETS, prices_as_of=START - timedelta(seconds=3))
+    fresh.set(spec)
+    assert fresh.parameters(START + timedelta(seconds=6))[2].tolist() == [-0.05] * 3
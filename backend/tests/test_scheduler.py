@@ -0,0 +1,68 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from simulation.market_hours import MarketCalendar, is_market_open, session_date
+from simulation.scheduler import TickScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_scheduler_absorbs_work_time_without_drift():
+    clock = FakeClock()
+    scheduler = TickScheduler(3.0, clock=clock, sleep=clock.sleep)
+
+    async def run():
+        for _ in range(10):
+            clock.now += 1.2  # The tick's own work
+            await scheduler.wait_next()
+
+    asyncio.run(run())
+    assert clock.now == 130.0
+    assert scheduler.overruns == 0
+
+def test_scheduler_reports_and_skips_overruns():
+    clock = FakeClock()
+    scheduler = TickScheduler(1.0, clock=clock, sleep=clock.sleep)
+
+    async def run():
+        clock.now += 3.5  # Late for the 101 deadline, and 102 and 103 have passed too
+        lateness = await scheduler.wait_next()
+        clock.now += 0.1
+        await scheduler.wait_next()
+        return lateness
+
+    assert asyncio.run(run()) == 2.5
+    assert scheduler.overruns == 1
+    assert scheduler.skipped_ticks == 2
+    assert clock.now == 104.0, "The next tick should land back on the original grid"
+
+def test_market_sessions():
+    # Monday 2026-01-05 15:00 UTC: London and New York open, Mumbai closed
+    monday = datetime(2026, 1, 5, 15, 0, tzinfo=timezone.utc)
+    assert is_market_open("uk", monday)
+    assert is_market_open("usa", monday)
+    assert not is_market_open("india", monday)
+    assert not is_market_open("usa", datetime(2026, 1, 10, 15, 0, tzinfo=timezone.utc))
+    assert is_market_open("unknown", datetime(2026, 1, 10, 15, 0, tzinfo=timezone.utc))
+
+    calendar = MarketCalendar(["india", "usa", "uk", "usa"])
+    np.testing.assert_array_equal(calendar.open_mask(monday), [False, True, True, True])
+
+def test_session_date_rolls_over_at_the_open():
+    # 2026-01-05 is a Monday; New York opens at 14:30 UTC
+    assert session_date("usa", datetime(2026, 1, 5, 14, 0, tzinfo=timezone.utc)) == date(2026, 1, 2)
+    assert session_date("usa", datetime(2026, 1, 5, 14, 30, tzinfo=timezone.utc)) == date(2026, 1, 5)
+    # Weekends belong to Friday's session
+    assert session_date("uk", datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)) == date(2026, 1, 9)
+    assert session_date("unknown", datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)) == date(2026, 1, 10)
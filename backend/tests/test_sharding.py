@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+import pytest
+from simulation.sharding import _Shard, build_shard_map
+
+INSTRUMENTS = [
+    {"symbol": f"{market.upper()}{i}", "market": market}
+    for market, count in (("india", 14), ("usa", 14), ("uk", 14))
+    for i in range(count)
+]
+
+@pytest.mark.parametrize("by", ["market", "hash"])
+def test_shard_map_covers_every_instrument_once(by):
+    shards = build_shard_map(INSTRUMENTS, 3, by)
+
+    symbols = [inst["symbol"] for shard in shards for inst in shard]
+    assert sorted(symbols) == sorted(inst["symbol"] for inst in INSTRUMENTS)
+    assert all(shards), "Empty shards should be dropped"
+
+def test_market_shards_keep_markets_together():
+    shards = build_shard_map(INSTRUMENTS, 3, "market")
+
+    assert len(shards) == 3
+    assert all(len({inst["market"] for inst in shard}) == 1 for shard in shards)
+    assert len(build_shard_map(INSTRUMENTS, 8, "market")) == 3
+
+def test_hash_shards_are_stable():
+    assert build_shard_map(INSTRUMENTS, 4, "hash") == build_shard_map(list(INSTRUMENTS), 4, "hash")
+
+class StuckConnection:
+    """A pipe end whose reader stopped reading: writes block until released."""
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.sent = []
+
+    def send(self, message):
+        self.released.wait()
+        self.sent.append(message)
+
+def test_backed_up_shard_drops_ticks_without_blocking_the_loop():
+    async def run():
+        shard = _Shard(0, [], [])
+        shard.conn = StuckConnection()
+        assert shard.send(1, "factors 1", [], None)
+        # The loop keeps running while the first write is stuck
+        await asyncio.sleep(0.05)
+        assert not shard.send(2, "factors 2", [], None) and not shard.send(3, "factors 3", [], None)
+        shard.conn.released.set()
+        await shard.sending
+        assert shard.send(4, "factors 4", [], None)
+        await shard.sending
+        return shard
+
+    shard = asyncio.run(run())
+    assert [message[:2] for message in shard.conn.sent] == [(1, "factors 1"), (4, "factors 4")]
+    assert shard.dropped == 0, "Reset once the shard caught up"
+
+def test_backed_up_shard_still_gets_every_news_event():
+    async def run():
+        shard = _Shard(0, [], [])
+        shard.conn = StuckConnection()
+        shard.send(1, "factors 1", ["news a"], None)
+        assert not shard.send(2, "factors 2", ["news b", "news c"], None)
+        assert not shard.send(3, "factors 3", [], None)
+        shard.conn.released.set()
+        await shard.sending
+        shard.send(4, "factors 4", ["news d"], "crash")
+        await shard.sending
+        return shard
+
+    shard = asyncio.run(run())
+    assert shard.conn.sent == [
+        (1, "factors 1", ["news a"], None),
+        (4, "factors 4", ["news b", "news c", "news d"], "crash"),
+    ]
+    assert shard.undelivered_news == []
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from simulation.sessions import SessionState
+from simulation.snapshots import QuoteSnapshotBuilder
+
+INSTRUMENTS = [
+    {"symbol": "AAPL", "price": 185.0},
+    {"symbol": "RELIANCE", "price": 2500.0},
+    {"symbol": "TSLA", "price": 240.0},
+]
+
+def test_snapshot_matches_per_symbol_formulas():
+    builder = QuoteSnapshotBuilder(INSTRUMENTS)
+    indices = np.array([0, 2])
+    prices = np.array([190.0, 200.0])
+    volumes = np.array([100.0, 500.0])
+
+    columns = builder.tick_columns(indices, prices, volumes)
+    ticks, quotes = builder.build(indices, columns, "2024-01-02T10:00:00+00:00")
+
+    # No session update yet, so the base price is both open and previous close
+    assert [t["symbol"] for t in ticks] == ["AAPL", "TSLA"]
+    for inst, price, volume, tick, quote in zip(
+        [INSTRUMENTS[0], INSTRUMENTS[2]], prices, volumes, ticks, quotes
+    ):
+        base = inst["price"]
+        seed = sum(ord(c) for c in inst["symbol"])
+        eps = base / (15.0 + seed % 20)
+        book_value = base / (1.5 + seed % 5)
+
+        assert tick["bid"] == pytest.approx(price * 0.9995)
+        assert tick["changePercent"] == pytest.approx((price - base) / base * 100)
+        assert quote["open"] == base
+        assert quote["peRatio"] == pytest.approx(price / eps)
+        assert quote["pbRatio"] == pytest.approx(price / book_value)
+        assert quote["roe"] == 8.0 + seed % 18
+        assert quote["divYield"] == pytest.approx(eps * (seed % 5) * 0.1 / price * 100)
+        assert quote["marketCap"] == pytest.approx(price * (10 + seed % 90) * 1_000_000)
+        assert quote["fiftyTwoWeekLow"] == pytest.approx(min(base, base * 0.75))
+
+def test_snapshot_values_are_plain_floats():
+    builder = QuoteSnapshotBuilder(INSTRUMENTS)
+    builder.sessions.update(np.array([1]), np.array([2600.0]), np.array([10.0]), np.array([738000]))
+    columns = builder.tick_columns(np.array([1]), np.array([2600.0]), np.array([10.0]))
+    _, quotes = builder.build(np.array([1]), columns, "2024-01-02T10:00:00+00:00")
+
+    assert all(type(v) in (str, float) for v in quotes[0].values())
+
+def test_session_state_tracks_ohlc_and_rolls_over():
+    sessions = SessionState([100.0, 50.0])
+    both = np.array([0, 1])
+
+    sessions.update(both, np.array([101.0, 50.0]), np.array([10.0, 0.0]), np.array([1, 1]))
+    sessions.update(both, np.array([99.0, 52.0]), np.array([30.0, 5.0]), np.array([1, 1]))
+    sessions.update(np.array([0]), np.array([100.0]), np.array([60.0]), np.array([1]))
+
+    assert sessions.open.tolist() == [101.0, 50.0]
+    assert sessions.high.tolist() == [101.0, 52.0]
+    assert sessions.low.tolist() == [99.0, 50.0]
+    assert sessions.volume.tolist() == [100.0, 5.0]
+    assert sessions.vwap(both) == pytest.approx([(1010 + 2970 + 6000) / 100, 52.0])
+    assert sessions.previous_close.tolist() == [100.0, 50.0]
+
+    # Only the first instrument's market opens a new session
+    sessions.update(both, np.array([102.0, 51.0]), np.array([1.0, 1.0]), np.array([2, 1]))
+    assert sessions.previous_close.tolist() == [100.0, 50.0]
+    assert sessions.open.tolist() == [102.0, 50.0]
+    assert sessions.volume.tolist() == [1.0, 6.0]
+    sessions.update(np.array([0]), np.array([103.0]), np.array([1.0]), np.array([3]))
+    assert sessions.previous_close[0] == 102.0
+    assert sessions.low[0] == 103.0
+
+def test_session_state_restores_from_quotes():
+    builder = QuoteSnapshotBuilder(INSTRUMENTS)
+    idx = np.array([0, 1, 2])
+    builder.sessions.update(idx, np.array([186.0, 2490.0, 241.0]), np.array([5.0, 5.0, 5.0]), np.array([738000] * 3))
+    _, quotes = builder.build(idx, builder.tick_columns(idx, np.array([186.0, 2490.0, 241.0]), np.ones(3)), "t")
+
+    restored = SessionState([0.0, 0.0, 0.0])
+    restored.restore({0: quotes[0], 2: {"price": 1.0}})
+    assert restored.session[0] == 738000
+    assert restored.open[0] == 186.0
+    assert restored.vwap(np.array([0]))[0] == pytest.approx(186.0)
+    assert restored.session[2] == -1, "Quotes without session fields are ignored"
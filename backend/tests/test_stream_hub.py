@@ -0,0 +1,282 @@
+import asyncio
+import json
+
+from api.websockets.hub import ConnectionManager, SubscriptionError
+from simulation import wire_format
+
+def tick(symbol, price):
+    return {"symbol": symbol, "timestamp": "2026-01-05T15:00:00+00:00", "price": price, "bid": price, "ask": price,
+            "volume": 1.0, "change": 0.0, "changePercent": 0.0}
+
+class FakeWebSocket:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed = None
+
+    async def close(self, code=1000):
+        self.closed = code
+
+    async def send_text(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        await asyncio.sleep(self.delay)
+        self.sent.append(data)
+
+class FakeRedis:
+    def __init__(self, table):
+        self.table = table
+        self.loads = 0
+
+    async def get(self, key):
+        self.loads += 1
+        return self.table.to_json()
+
+def test_one_decode_fans_out_to_every_client():
+    async def run():
+        manager = ConnectionManager(redis_client=object())
+        manager.start = lambda: None  # No Redis subscriber in tests
+        clients = [await manager.connect(FakeWebSocket()) for _ in range(3)]
+
+        decoded = []
+        decode = manager.decode
+        async def counting_decode(data):
+            decoded.append(data)
+            return await decode(data)
+        manager.decode = counting_decode
+
+        await manager.broadcast(json.dumps(tick("AAPL", 1.0)).encode())
+        await manager.broadcast(json.dumps({"type": "ticks", "ticks": [tick("AAPL", 2.0), tick("MSFT", 3.0)]}).encode())
+        await asyncio.sleep(0.01)
+        stats = manager.stats()
+        await manager.stop()
+        return decoded, clients, stats
+
+    decoded, clients, stats = asyncio.run(run())
+    assert len(decoded) == 2
+    for client in clients:
+        assert [json.loads(frame)["price"] for frame in client.websocket.sent] == [2.0, 3.0], "Conflated per symbol"
+    assert stats["conflated"] == 3
+
+def test_batch_clients_get_one_columnar_frame_per_flush():
+    async def run():
+        manager = ConnectionManager(redis_client=object())
+        manager.start = lambda: None
+        clients = [await manager.connect(FakeWebSocket(), "batch") for _ in range(2)]
+        await manager.broadcast(json.dumps({"type": "ticks", "ticks": [tick("AAPL", 1.0), tick("MSFT", 2.0)]}).encode())
+        await manager.broadcast(json.dumps(tick("AAPL", 3.0)).encode())
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        return clients
+
+    first, second = asyncio.run(run())
+    assert len(first.websocket.sent) == 1
+    assert first.websocket.sent[0] is second.websocket.sent[0], "Encoded once for both clients"
+    frame = json.loads(first.websocket.sent[0])
+    assert frame["type"] == "batch"
+    assert frame["symbols"] == ["MSFT", "AAPL"]
+    assert frame["prices"] == [2.0, 3.0] and frame["bids"] == [2.0, 3.0] and frame["asks"] == [2.0, 3.0]
+
+def test_binary_clients_get_one_frame_per_flush():
+    table = wire_format.SymbolTable(["AAPL", "MSFT"])
+
+    async def run():
+        manager = ConnectionManager(redis_client=FakeRedis(table))
+        manager.start = lambda: None
+        clients = [await manager.connect(FakeWebSocket(), "binary", table) for _ in range(2)]
+        await manager.broadcast(json.dumps(tick("MSFT", 5.0)).encode())
+        await manager.broadcast(json.dumps(tick("AAPL", 6.0)).encode())
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        return clients
+
+    first, second = asyncio.run(run())
+    assert len(first.websocket.sent) == 1 and first.websocket.sent == second.websocket.sent
+    records = wire_format.decode_records(first.websocket.sent[0], table)
+    assert records["price"].tolist() == [5.0, 6.0]
+
+def test_flushes_respect_the_negotiated_rate():
+    async def run():
+        manager = ConnectionManager(redis_client=object())
+        manager.start = lambda: None
+        client = await manager.connect(FakeWebSocket(), max_rate=2)
+        for i in range(30):
+            await manager.broadcast(json.dumps(tick("AAPL", float(i))).encode())
+            await asyncio.sleep(0.01)
+        sent = list(client.websocket.sent)
+        await manager.stop()
+        return client, sent
+
+    client, sent = asyncio.run(run())
+    assert client.max_rate == 2
+    assert [json.loads(frame)["price"] for frame in sent] == [0.0], "One flush per half second"
+    assert client.pending["AAPL"].tick["price"] == 29.0, "Only the latest tick is kept"
+
+def test_slow_consumer_is_downgraded_then_disconnected(monkeypatch):
+    from api.websockets import hub
+
+    monkeypatch.setattr(hub, "STREAM_MAX_RATE", 100.0)
+    monkeypatch.setattr(hub, "STREAM_MIN_RATE", 25.0)
+    monkeypatch.setattr(hub, "STREAM_SLOW_FLUSHES", 2)
+
+    async def run():
+        manager = ConnectionManager(redis_client=object())
+        manager.start = lambda: None
+        slow = await manager.connect(FakeWebSocket(delay=0.05), max_rate=100)
+        fast = await manager.connect(FakeWebSocket())
+        for i in range(100):
+            await manager.broadcast(json.dumps(tick("AAPL", float(i))).encode())
+            await asyncio.sleep(0.01)
+            if slow not in manager.active_connections:
+                break
+        stats = manager.stats()
+        await manager.stop()
+        return slow, fast, stats
+
+    slow, fast, stats = asyncio.run(run())
+    downgrades = [json.loads(frame) for frame in slow.websocket.sent if "downgraded" in frame]
+    assert [d["maxRate"] for d in downgrades] == [50.0, 25.0]
+    assert slow.websocket.closed == 1013
+    assert stats["slow_consumers"] == 1
+    assert len(fast.websocket.sent) > len(slow.websocket.sent), "A slow client does not hold up the others"
+
+def test_stalled_send_disconnects(monkeypatch):
+    from api.websockets import hub
+
+    monkeypatch.setattr(hub, "STREAM_SEND_TIMEOUT_SECONDS", 0.05)
+
+    async def run():
+        manager = ConnectionManager(redis_client=object())
+        manager.start = lambda: None
+        stalled = await manager.connect(FakeWebSocket(delay=10))
+        await manager.broadcast(json.dumps(tick("AAPL", 1.0)).encode())
+        await asyncio.sleep(0.1)
+        connected = stalled in manager.active_connections
+        await manager.stop()
+        return stalled, connected
+
+    stalled, connected = asyncio.run(run())
+    assert not connected and stalled.websocket.closed == 1013
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = set()
+
+    async def subscribe(self, *channels):
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+def test_symbol_subscriptions_drive_upstream_channels():
+    table = wire_format.SymbolTable(["AAPL", "MSFT", "XOM"])
+
+    async def run():
+        manager = ConnectionManager(redis_client=FakeRedis(table), max_subscriptions=2, quote_cache=False)
+        manager.start = lambda: None
+        pubsub = manager._pubsub = FakePubSub()
+
+        legacy = await manager.connect(FakeWebSocket())
+        watcher = await manager.connect(FakeWebSocket())
+        assert pubsub.channels == {"market:ticks:global"}
+
+        assert await manager.subscribe(watcher, ["AAPL"]) == {"AAPL"}
+        other = await manager.connect(FakeWebSocket())
+        await manager.subscribe(other, ["AAPL", "MSFT"])
+        assert pubsub.channels == {"market:ticks:global", "market:ticks:AAPL", "market:ticks:MSFT"}
+
+        for channel, symbol in (("market:ticks:global", "XOM"), ("market:ticks:AAPL", "AAPL"), ("market:ticks:MSFT", "MSFT")):
+            await manager.broadcast(json.dumps(tick(symbol, 1.0)).encode(), channel)
+        await asyncio.sleep(0.01)
+        received = [[json.loads(frame)["symbol"] for frame in c.websocket.sent] for c in (legacy, watcher, other)]
+
+        for symbols in (["TSLA"], ["XOM"]):
+            try:
+                await manager.subscribe(other, symbols)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"Subscribing to {symbols} should fail")
+
+        await manager.unsubscribe(other, ["MSFT"])
+        await manager.disconnect(legacy)
+        assert pubsub.channels == {"market:ticks:AAPL"}
+        assert manager.subscribers == {"AAPL": {watcher, other}}
+
+        await manager.subscribe(watcher, ["*"])
+        await manager.unsubscribe(other, ["*"])
+        assert pubsub.channels == {"market:ticks:global"}
+        await manager.stop()
+        assert pubsub.channels == set()
+        return received
+
+    legacy, watcher, other = asyncio.run(run())
+    assert legacy == ["XOM"]
+    assert watcher == ["AAPL"]
+    assert other == ["AAPL", "MSFT"]
+
+def test_cached_quotes_are_sent_on_connect_and_subscribe():
+    table = wire_format.SymbolTable(["AAPL", "MSFT", "XOM"])
+
+    async def run():
+        manager = ConnectionManager(redis_client=FakeRedis(table))
+        manager.start = lambda: None
+        pubsub = manager._pubsub = FakePubSub()
+        await manager._sync_upstream()
+        assert pubsub.channels == {"market:ticks:global"}, "Listens before any client connects"
+
+        ticks = [tick("AAPL", 1.0), tick("MSFT", 2.0), tick("XOM", 3.0)]
+        await manager.broadcast(json.dumps({"type": "ticks", "ticks": ticks}).encode())
+        loads = manager.redis.loads
+
+        legacy = await manager.connect(FakeWebSocket())
+        watcher = await manager.connect(FakeWebSocket())
+        await asyncio.sleep(0.01)
+        assert len(legacy.websocket.sent) == 3
+
+        await manager.subscribe(watcher, ["MSFT"])
+        await asyncio.sleep(0.2)
+        snapshot = [json.loads(frame) for frame in watcher.websocket.sent[3:]]
+
+        # Symbol subscribers are fed from the global channel
+        await manager.broadcast(json.dumps(tick("MSFT", 4.0)).encode())
+        await manager.broadcast(json.dumps(tick("XOM", 5.0)).encode())
+        await asyncio.sleep(0.2)
+        after = [json.loads(frame)["price"] for frame in watcher.websocket.sent[3 + len(snapshot):]]
+        assert pubsub.channels == {"market:ticks:global"}
+        await manager.stop()
+        return snapshot, after, manager.redis.loads - loads
+
+    snapshot, after, loads = asyncio.run(run())
+    assert [(quote["symbol"], quote["price"]) for quote in snapshot] == [("MSFT", 2.0)]
+    assert after == [4.0]
+    assert loads == 1, "Only the symbol table for validation is read from Redis"
+
+def test_whole_feed_client_cannot_unsubscribe_single_symbols():
+    table = wire_format.SymbolTable(["AAPL", "MSFT"])
+
+    async def run():
+        manager = ConnectionManager(redis_client=FakeRedis(table), quote_cache=False)
+        manager.start = lambda: None
+        pubsub = manager._pubsub = FakePubSub()
+        client = await manager.connect(FakeWebSocket())
+
+        try:
+            await manager.unsubscribe(client, ["AAPL"])
+        except SubscriptionError:
+            pass
+        else:
+            raise AssertionError("Unsubscribing one symbol from the whole feed should fail")
+        still_on_feed = client.symbols is None and client in manager.firehose
+        channels = set(pubsub.channels)
+
+        left = await manager.unsubscribe(client, ["*"])
+        await manager.stop()
+        return still_on_feed, channels, left
+
+    still_on_feed, channels, left = asyncio.run(run())
+    assert still_on_feed
+    assert channels == {"market:ticks:global"}
+    assert left == set()
@@ -0,0 +1,22 @@
+import pytest
+
+from api.websockets.hub import SubscriptionError
+from api.websockets.stream import requested_symbols
+
+def test_requested_symbols_accepts_one_symbol_or_a_list():
+    assert requested_symbols({"action": "subscribe", "symbol": "AAPL"}) == ["AAPL"]
+    assert requested_symbols({"action": "subscribe", "symbols": ["AAPL", "MSFT"]}) == ["AAPL", "MSFT"]
+
+@pytest.mark.parametrize("request_", [
+    {"action": "subscribe"},
+    {"action": "subscribe", "symbols": []},
+    {"action": "subscribe", "symbols": "AAPL"},
+    {"action": "subscribe", "symbol": ["AAPL"]},
+    {"action": "subscribe", "symbols": [["AAPL"]]},
+    {"action": "subscribe", "symbols": [{"symbol": "AAPL"}]},
+    {"action": "unsubscribe", "symbols": ["AAPL", 1]},
+    {"action": "unsubscribe", "symbol": ""},
+])
+def test_malformed_symbols_are_a_subscription_error(request_):
+    with pytest.raises(SubscriptionError):
+        requested_symbols(request_)
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from db.tick_archive import ARCHIVE_DTYPE, TickArchive, archive_partition
+
+DAY = datetime(2026, 1, 5, tzinfo=timezone.utc)
+
+def records(*ticks):
+    out = np.zeros(len(ticks), dtype=ARCHIVE_DTYPE)
+    for i, (offset, price) in enumerate(ticks):
+        out[i] = (int((DAY + offset).timestamp() * 1000), price, price - 0.1, price + 0.1, 10.0)
+    return out
+
+def test_archive_splits_by_day_and_merges_sorted(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    h = timedelta(hours=1)
+    archive.write("S&P 500", records((25 * h, 7.0), (2 * h, 5.0), (1 * h, 4.0)))
+    archive.write("S&P 500", records((3 * h, 6.0), (1 * h, 4.0)))
+
+    assert archive.symbols() == ["S&P 500"]
+    assert archive.days("S&P 500") == [date(2026, 1, 5), date(2026, 1, 6)]
+    first = archive.load_day("S&P 500", date(2026, 1, 5))
+    assert isinstance(first, np.memmap)
+    assert first["price"].tolist() == [4.0, 5.0, 6.0], "Merged, sorted and deduplicated"
+
+    candles = archive.daily_candles("S&P 500", limit=10)
+    assert [(c["open"], c["high"], c["low"], c["close"], c["volume"]) for c in candles] == [
+        (4.0, 6.0, 4.0, 6.0, 30.0),
+        (7.0, 7.0, 7.0, 7.0, 10.0),
+    ]
+    assert archive.daily_candles("S&P 500", limit=10, before=DAY + 24 * h) == candles[:1]
+
+def test_archive_time_range_slices(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    m = timedelta(minutes=1)
+    archive.write("AAPL", records(*[(i * m, float(i)) for i in range(10)]))
+    archive.write("AAPL", records((timedelta(days=1), 99.0)))
+
+    slices = list(archive.ticks("AAPL", DAY + 3 * m, DAY + timedelta(days=2)))
+    assert [s["price"].tolist() for s in slices] == [[3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0], [99.0]]
+    assert list(archive.ticks("MSFT", DAY, DAY + m)) == []
+
+class StreamedResult:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetches = []
+
+    async def partitions(self, size):
+        for lo in range(0, len(self.rows), size):
+            self.fetches.append(size)
+            yield self.rows[lo:lo + size]
+
+class StreamingConnection:
+    def __init__(self, rows):
+        self.result = StreamedResult(rows)
+
+    async def stream(self, statement):
+        return self.result
+
+def test_partition_is_archived_in_fetched_chunks(tmp_path):
+    archive = TickArchive(str(tmp_path))
+    m = timedelta(minutes=1)
+    rows = [("AAPL", DAY + i * m, 1.0 + i, 1.0, 2.0, 5.0) for i in range(5)]
+    rows += [("MSFT", DAY + i * m, 10.0 + i, 10.0, 11.0, 5.0) for i in range(3)]
+    conn = StreamingConnection(rows)
+
+    count = asyncio.run(archive_partition(conn, "price_ticks_p2026010500", archive, fetch_rows=3))
+
+    assert count == 8
+    assert conn.result.fetches == [3, 3, 3], "Read through the cursor, not fetched at once"
+    assert archive.load_day("AAPL", DAY.date())["price"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert archive.load_day("MSFT", DAY.date())["price"].tolist() == [10.0, 11.0, 12.0]
@@ -0,0 +1,32 @@
+import pytest
+from simulation import wire_format
+from simulation.wire_format import SymbolTable, WireFormatError
+
+TICKS = [
+    {"symbol": "AAPL", "timestamp": "2026-01-05T14:30:00.123000+00:00", "price": 192.5, "bid": 192.4, "ask": 192.6, "volume": 120.0, "change": 1.5, "changePercent": 0.78},
+    {"symbol": "S&P 500", "timestamp": "2026-01-05T14:30:00.123000+00:00", "price": 4780.2, "bid": 4777.8, "ask": 4782.6, "volume": 640.0, "change": -3.1, "changePercent": -0.06},
+]
+
+def test_binary_ticks_round_trip_to_json_shape():
+    table = SymbolTable(["AAPL", "MSFT", "S&P 500"])
+    data = wire_format.encode_tick_dicts(table, TICKS)
+
+    assert wire_format.is_binary(data)
+    assert len(data) == wire_format.HEADER_DTYPE.itemsize + 2 * wire_format.TICK_DTYPE.itemsize
+    assert wire_format.records_to_dicts(wire_format.decode_records(data, table), table) == TICKS
+
+def test_single_record_messages_match_batch():
+    table = SymbolTable(["AAPL", "S&P 500"])
+    records = wire_format.decode_records(wire_format.encode_tick_dicts(table, TICKS), table)
+    singles = wire_format.encode_single_records(table, records)
+
+    assert [wire_format.records_to_dicts(wire_format.decode_records(m, table), table)[0] for m in singles] == TICKS
+
+def test_decode_rejects_other_symbol_table():
+    data = wire_format.encode_tick_dicts(SymbolTable(["AAPL", "S&P 500"]), TICKS)
+    with pytest.raises(WireFormatError):
+        wire_format.decode_records(data, SymbolTable(["AAPL", "S&P 500", "MSFT"]))
+
+def test_json_is_not_mistaken_for_binary():
+    assert not wire_format.is_binary(b'{"symbol": "AAPL"}')
+    assert SymbolTable.from_json(SymbolTable(["AAPL"]).to_json()).symbols == ["AAPL"]